@@ -8,6 +8,12 @@ class UniversalAdapter:
       feed(x)  -> (vals, scores, flags) όταν κλείσει batch ή άμεσα στο single
                   ή (None, None, None) αν δεν έχει κλείσει batch ακόμη
       flush()  -> επιστρέφει τυχόν υπόλοιπα στο batch mode
+
+    Ένα batch μοντέλο μπορεί να κρατήσει σημεία (π.χ. όσο εκπαιδεύεται) και να
+    επιστρέψει τα scores τους σε επόμενη κλήση: τα scores αντιστοιχούν πάντα στα
+    παλαιότερα σημεία που δεν έχουν βαθμολογηθεί, με τη σειρά άφιξης. Αν το
+    μοντέλο ορίζει drain() -> (scores, flags), το flush() παίρνει από εκεί όσα
+    σημεία κρατά ακόμη.
     """
     def __init__(self, model, batch_size: int | None = None):
         self.model = model
@@ -18,6 +24,7 @@ class UniversalAdapter:
             self.mode = "batch"
             self.batch_size = int(batch_size)
             self.buf: list[float] = []
+            self.pending: list[float] = []  # δόθηκαν στο handleBatch, χωρίς score ακόμη
         elif hasattr(model, "handle_one"):
             self.mode = "single"
         else:
@@ -51,27 +58,34 @@ class UniversalAdapter:
         vals = list(self.buf)
         self.buf.clear()
 
-        scores, flags = self.model.handleBatch(vals)
-        scores, flags = self._normalize_pair(scores, flags)
-
-        if len(vals) != len(scores) or len(vals) != len(flags):
-            raise ValueError("handleBatch outputs must match input length")
+        return self._scored(vals, *self.model.handleBatch(vals))
 
+    def _scored(self, vals, scores, flags):
+        # Τα scores ανήκουν στα παλαιότερα σημεία του pending.
+        scores, flags = self._normalize_pair(scores, flags)
+        self.pending.extend(vals)
+        n = len(scores)
+        if n > len(self.pending):
+            raise ValueError("handleBatch returned more scores than values")
+        vals = self.pending[:n]
+        del self.pending[:n]
         return vals, scores, flags
 
     def flush(self):
         """Κλείσε τυχόν υπόλοιπα στο batch mode. Στο single δεν κάνει τίποτα."""
-        if getattr(self, "mode", None) != "batch" or not self.buf:
+        if getattr(self, "mode", None) != "batch" or not (self.buf or self.pending):
             return None, None, None
 
-        vals = list(self.buf)
-        self.buf.clear()
-
-        scores, flags = self.model.handleBatch(vals)
-        scores, flags = self._normalize_pair(scores, flags)
-
-        if len(vals) != len(scores) or len(vals) != len(flags):
-            raise ValueError("handleBatch outputs must match input length")
+        vals, scores, flags = [], [], []
+        if self.buf:
+            batch = list(self.buf)
+            self.buf.clear()
+            vals, scores, flags = self._scored(batch, *self.model.handleBatch(batch))
+        if self.pending and hasattr(self.model, "drain"):
+            held_vals, held_scores, held_flags = self._scored([], *self.model.drain())
+            vals, scores, flags = vals + held_vals, scores + held_scores, flags + held_flags
 
+        if not vals:
+            return None, None, None
         return vals, scores, flags
 
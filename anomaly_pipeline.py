@@ -1,237 +1,288 @@
-# -*- coding: utf-8 -*-
-
-
+import argparse
+import os
 import time
+import types
 import paho.mqtt.client as mqtt
-from river import anomaly, compose, preprocessing, time_series, linear_model, optim,feature_extraction
-from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score,accuracy_score
-import numpy as np
-import pandas as pd
-import json
 
+from runtime.routing import TopicRouter, make_mqtt_client
+from runtime.writers import LineWriter
+
+
+from runtime.engine import SpecPipeline
+
+
+from runtime.redis_sink import RedisSink, connect as redis_connect
 
-# MQTT and model parameters from DSL
-mqtt_host = "localhost"
-mqtt_port = 1883
-mqtt_topic = "machine/temperature"
-attribute = "value"
 
 
-    
-mqtt_username = ""
-mqtt_password = ""
-    
 
+from runtime.evaluation import StreamingEvaluator
+
+
+
+from runtime.river_detectors import QuantileDetector
 
-mqtt_ssl = False
 
-mqtt_webPath = ""
-mqtt_webPort = 0
 
-threshold = 0.8
-start_index = 1000
 
 evaluation = {
     "name": "Eval",
+    "data_file": "input.csv",
     "labels_file": "labels.csv",
     "anomalies_file": "alerts.csv",
     "scores_file": "results.csv",
-    "metrics": ['F1Score', 'Precision', 'Recall', 'Accuracy', 'ROCAUC']
+    "metrics": ['F1Score', 'Precision', 'Recall', 'Accuracy', 'ROCAUC'],
+    "labels_topic": None,
+    "report_every": 0,
+    "roc_bins": None
 }
 
 
 
-import redis
 
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
-    db=0
+
+
+# Scores of 'detectTemp' are evaluated against the labels while streaming.
+evaluator = StreamingEvaluator(evaluation)
+
+
+
+
+
+# ---- Outputs shared by all specs ----
+file_writers = {}
+
+file_writers["results.csv"] = LineWriter(
+    "results.csv",
+    buffer_lines=1,
+    flush_interval_ms=None,
+    fsync=False
 )
-redis_scores_key = "anomaly_scores"
-redis_alerts_key = "anomaly_alerts"
 
+file_writers["alerts.csv"] = LineWriter(
+    "alerts.csv",
+    buffer_lines=1,
+    flush_interval_ms=None,
+    fsync=False
+)
 
 
-output_path = "results.csv"
-def write_score(value, score):
-    with open(output_path, "a") as f:
-        flat_scores = np.array(score).flatten()
-        for s in flat_scores:
-            f.write(f"{s}\n")
+# A broker that is also subscribed to publishes on the same connection (see __main__).
+output_clients = {}
 
-       
 
+def start_outputs():
+    for client in output_clients.values():
+        client.loop_start()
+    
 
+redis_sinks = {}
+
+redis_sinks["my_redis"] = RedisSink(
+    redis_connect(
+        host="localhost",
+        port=6379,
+        db=0,
+        max_connections=None
+    ),
+    "anomaly_scores",
+    "anomaly_alerts",
+    flush_size=1,
+    flush_interval_ms=None,
+    max_len=None
+)
 
 
-alerts_path = "alerts.csv"
-def write_anomalies(value, is_anomaly):
-    with open(alerts_path, "a") as f:
-        flat_alerts=np.array(is_anomaly).flatten()
-        for s in flat_alerts:
-            f.write(f"{int(s)}\n")
-        
+# The outputs the pipelines' sinks are looked up in (see runtime.engine.Resources).
+resources = types.SimpleNamespace(file_writers=file_writers, mqtt_clients=output_clients, redis_sinks=redis_sinks)
 
+def close_outputs():
+    for writer in file_writers.values():
+        writer.close()
+    for sink in redis_sinks.values():
+        sink.close()
 
 
-start_index = int(start_index)
 
 
-preproc_instance = preprocessing.StandardScaler()
+# ---- AnomalySpec 'detectTemp' ----
 
+class DetectTempDetector(QuantileDetector):
+    """Model state of AnomalySpec 'detectTemp' (StandardAbsoluteDeviation, see runtime.river_detectors)."""
+    __slots__ = ()
+    config = {'model': 'StandardAbsoluteDeviation', 'params': {'model': 'StandardAbsoluteDeviation'}, 'preprocessor': 'StandardScaler', 'threshold': 0.8, 'start_index': 1000, 'retune_threshold': False}
+    
 
+    def __init__(self):
+        super().__init__(self.config)
 
 
-anomaly_model = anomaly.StandardAbsoluteDeviation()
-quantile_filter = anomaly.QuantileFilter(anomaly_model, q=0.8)
+class DetectTempPipeline(SpecPipeline):
+    """AnomalySpec 'detectTemp': scores 'value' received on 'machine/temperature' (see runtime.engine)."""
+    detector_class = DetectTempDetector
+    state_version = "276575b3aef054c5"
+    spec = {
+        'name': 'detectTemp',
+        'topic': 'machine/temperature',
+        'attributes': ['value'],
+        'decoder': 'json',
+        'ingest': None,
+        'queue': None,
+        'keyed': None,
+        'shards': None,
+        'output': {'type': 'file', 'path': 'results.csv', 'format': 'csv', 'buffer_lines': 1, 'flush_ms': None, 'fsync': False},
+        'alerts': {'type': 'file', 'path': 'alerts.csv', 'format': 'csv', 'buffer_lines': 1, 'flush_ms': None, 'fsync': False},
+        'redis': {'name': 'my_redis'},
+    }
 
+    def __init__(self):
+        super().__init__(self.spec, resources)
 
 
 
+pipelines = {
 
-cnt = 0
-training_buffer = []
+    "detectTemp": DetectTempPipeline(),
 
+}
 
-def handle_standard_model(x_val):
-    global cnt
-    cnt += 1
+pipelines["detectTemp"].evaluator = evaluator
 
-    # Learn preprocessor incrementally
-    if preproc_instance:
-        preproc_instance.learn_one({'x': x_val})
-        x_val_scaled = preproc_instance.transform_one({'x': x_val})['x']
-    else:
-        x_val_scaled = x_val
-
-    # During training phase
-    if cnt <= start_index:
-        anomaly_model.learn_one(None,x_val_scaled)
-        score = anomaly_model.score_one(None,x_val_scaled)
-        quantile_filter.learn_one(None,score)
-        return 0.0, 0  # No detection yet
-
-    # After training: detection
-    score = anomaly_model.score_one(None,x_val_scaled)
-    is_anomaly = quantile_filter.classify(score)
-    #anomaly_model.learn_one(None,x_val_scaled)
-
-    return score, is_anomaly
-
-def handle_custom_model(batch_values):
-    return anomaly_model.handleBatch(batch_values)
-
-def handle_svm_hs(x_val):
-    global cnt
-    cnt += 1
-    # Wrap input for consistency with River format
-    x_dict = {'x': x_val}
-
-    # Preprocessing
-    if preproc_instance:
-        preproc_instance.learn_one(x_dict)
-        x_val_scaled = preproc_instance.transform_one(x_dict)['x']
-    else:
-        x_val_scaled = x_val
-    x_dict = {'x': x_val_scaled}
-
-    # Training phase
-    if cnt <= start_index:
-        anomaly_model.learn_one(x_dict)
-        return 0.0, 0  # Still warming up
-
-    # Detection phase
-    score = anomaly_model.score_one(x_dict)
-    is_anomaly = anomaly_model.classify(score)
-    return score, is_anomaly   
-    
-def handle_arima_model(x_val):
-    global cnt
-    cnt += 1
 
-    if preproc_instance:
-        preproc_instance.learn_one({'x': x_val})
-        x_val = preproc_instance.transform_one({'x': x_val})['x']
-    else:
-        x_val = x_val
 
-    if cnt <= start_index:
-        anomaly_model.learn_one(None,x_val)
-        return 0.0, 0   # score=0, no alert
 
-    score = anomaly_model.score_one(None,x_val)
-    
-    if score is None or np.isnan(score) or np.isinf(score):
-        return 0.0, 0
-    score = np.clip(score, -1e6, 1e6)
 
-    is_anomaly = anomaly_model.classify(score)
-    
-    return score, is_anomaly
 
-def load_values(path):
-    df = pd.read_csv(path, header=None)
-    return df.iloc[:, 0]
+# One subscriber connection per input broker; messages are routed by topic.
+routers = {
+
+    "local": TopicRouter(),
+
+}
+
+routers["local"].add("machine/temperature", pipelines["detectTemp"].receive)
+
+
 
 def on_message(client, userdata, message):
+    
+    for receive in userdata.route(message.topic):
+        receive(message.topic, message.payload)
+    
+
+def run_replay(path, chunk_size, topic=None):
+    """Score a CSV of historical values through the pipelines, without MQTT."""
+    from runtime.replay import replay_file
+
+    if topic is None:
+        targets = [(pipeline, None) for pipeline in pipelines.values()]
+    else:
+        targets = [
+            (pipeline, pipeline.topic_key(topic) if pipeline.keyed else None)
+            for pipeline in pipelines.values()
+            if mqtt.topic_matches_sub(pipeline.topic, topic)
+        ]
+        if not targets:
+            print(f"No AnomalySpec subscribes to topic '{topic}'.")
+            return
+    
+    for pipeline, _ in targets:
+        if pipeline.sharder is not None:
+            # Fork scoring processes while this process is still single-threaded.
+            pipeline.sharder.start_workers()
+    start_outputs()
+    for pipeline, _ in targets:
+        pipeline.echo = False
+        pipeline.start()
+    started = time.perf_counter()
     try:
-        payload = json.loads(message.payload.decode())
-        x_val = float(payload.get(attribute))
+        rows, _ = replay_file(path, targets, chunk_size, progress_every=100 * chunk_size)
+    finally:
+        for pipeline, _ in targets:
+            pipeline.stop()
+        close_outputs()
+    # Sharded specs finish scoring in stop(): the time runs until every output is closed.
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {rows} rows from '{path}' in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+    
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AnomalyDSL generated pipeline")
+    parser.add_argument(
+        "--replay", nargs="?", const="", metavar="CSV",
+        help="score a CSV of historical values without MQTT (default: the Evaluation data_file)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows read per replay chunk")
+    parser.add_argument("--topic", help="replay as if the values were received on this topic")
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        path = args.replay or (evaluation or {}).get("data_file")
+        if not path:
+            parser.error("--replay needs a CSV path when the DSL has no Evaluation block")
         
-        # ---- RIVER path ----
-        
-        score, is_anomaly = handle_standard_model(x_val)
+        labelled = path == evaluation["data_file"] and os.path.exists(evaluation["labels_file"])
+        if labelled:
+            evaluator.open_labels_file()
         
-
-        write_score(x_val, score)
-        write_anomalies(x_val, is_anomaly)
+        run_replay(path, args.chunk_size, args.topic)
         
-        redis_client.rpush(redis_scores_key, json.dumps({"value": x_val, "score": score}))
-        if is_anomaly:
-            redis_client.rpush(redis_alerts_key, json.dumps({"value": x_val, "score": score}))
+        if labelled:
+            evaluator.report()
         
-        print(f"Received value: {x_val}, Score: {score}")
-        if is_anomaly:
-            print(f"ALERT: Anomaly detected for value: {x_val}, Score: {score}")
+        exit(0)
 
-        
-    except Exception as e:
-        print(f"Error handling message: {e}")
+    input_clients = []
 
-if __name__ == "__main__":
-    use_websockets =True if mqtt_webPath !="" else False
 
-    if use_websockets:
-        client = mqtt.Client(transport="websockets")
-    else:
-        client = mqtt.Client()
+    client = make_mqtt_client(
+        False, "", "", None,
+        max_inflight=None, queue_size=None
+    )
 
+    client.user_data_set(routers["local"])
     client.on_message = on_message
+    input_clients.append((client, "localhost", 1883, ['machine/temperature']))
 
-    use_tls = mqtt_ssl
-
-    if use_tls:
-        client.tls_set()
-        client.tls_insecure_set(True)
-
-
-    if mqtt_username or mqtt_password:
-        client.username_pw_set(mqtt_username, mqtt_password or None)
 
+    
+    # Labels are read from the labels file as scores are produced.
+    evaluator.open_labels_file()
+    
     try:
-        client.connect("localhost", 1883)
-        client.subscribe("machine/temperature")
-        print(f"Subscribed to topic 'machine/temperature'")
-        client.loop_forever()
+        
+        
+        start_outputs()
+        for pipeline in pipelines.values():
+            pipeline.start()
+        
+        for client, host, port, topics in input_clients:
+            if client not in output_clients.values():
+                client.connect(host, port)
+                client.loop_start()
+            for topic in topics:
+                client.subscribe(topic)
+                print(f"Subscribed to topic '{topic}'")
+        # Every connection runs its own network loop; this thread only waits for Ctrl+C.
+        while True:
+            time.sleep(1)
 
     except KeyboardInterrupt:
 
         print("Streaming stopped by user.")
+        # Stop receiving, then score and write what is pending before asking.
+        for client, *_ in input_clients:
+            if client in output_clients.values():
+                client.on_message = None  # the loop keeps running to publish the last results
+            else:
+                client.loop_stop()
+        
+        for pipeline in pipelines.values():
+            pipeline.stop()
+        close_outputs()
+        
         print(" Do you want to continue with the evaluation so far? (y/n)")
         user_input = input().strip().lower()
-        
 
         if user_input == "y":
             if evaluation is None:
@@ -239,37 +290,10 @@ if __name__ == "__main__":
                 exit(0)
               	
             print("Continuing with evaluation...")
-            eval = evaluation
-
-            y_true_full = load_values(eval["labels_file"])
-            y_pred = load_values(eval["anomalies_file"])
-            if len(y_true_full) != len(y_pred):
-                print(f"[Warning] Labels and predictions have different lengths "
-                      f"({len(y_true_full)} vs {len(y_pred)}). Truncating to shortest.")
-
-            min_len = min(len(y_true_full), len(y_pred))
-            y_true = y_true_full[:min_len]
-            y_pred = y_pred[:min_len]
-            for metric in eval["metrics"]:
-                if metric == "F1Score":
-                    print("F1Score:", f1_score(y_true, y_pred))
-                elif metric == "Precision":
-                    print("Precision:", precision_score(y_true, y_pred))
-                elif metric == "Recall":
-                    print("Recall:", recall_score(y_true, y_pred))
-                elif metric == "Accuracy":
-                    print("Accuracy:", accuracy_score(y_true, y_pred))
-                elif metric == "ROCAUC":
-                    y_scores = load_values(eval["scores_file"])
-                    min_len = min(len(y_true_full), len(y_scores))
-                    y_true_roc = y_true_full[:min_len]
-                    y_scores = y_scores[:min_len]
-
-                    if len(set(y_true_roc)) < 2:
-                        print("ROCAUC: Cannot compute ROC AUC — only one class present in y_true.")
-                    else:
-                        print("ROCAUC:", roc_auc_score(y_true_roc, y_scores))
+            
+            evaluator.report()
+            
 
         else:
             print("Exiting without evaluation.")
-            exit(0)
+            exit(0)
\ No newline at end of file
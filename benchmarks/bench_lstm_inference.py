@@ -0,0 +1,84 @@
+"""
+Per-batch inference latency of the CUSTOM LSTM: Keras predict vs NumpyLSTM.
+
+Builds the architecture of models/LSTM_MODEL.py (LSTM 150 -> Dropout ->
+LSTM 75 -> Dense 1, time_step 10) with random weights, exports it with
+NumpyLSTM.from_keras and reports the latency of both backends and their
+largest output difference. Without TensorFlow only the NumPy backend is
+timed, with random weights.
+
+    python benchmarks/bench_lstm_inference.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from models.numpy_lstm import NumpyLSTM  # noqa: E402
+
+BATCH_SIZES = (288, 1_000, 10_000)
+TIME_STEP = 10
+
+
+def keras_model():
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return None
+    keras = tf.keras
+    model = keras.models.Sequential([
+        keras.layers.LSTM(150, return_sequences=True, input_shape=(TIME_STEP, 1)),
+        keras.layers.Dropout(0.2),
+        keras.layers.LSTM(75, return_sequences=False),
+        keras.layers.Dense(1),
+    ])
+    model.compile(optimizer="adam", loss="mean_squared_error")
+    return model
+
+
+def random_numpy_model(rng):
+    def lstm(inputs, units, return_sequences):
+        weights = [rng.normal(0, 0.1, (inputs, 4 * units)), rng.normal(0, 0.1, (units, 4 * units)), np.zeros(4 * units)]
+        config = {"units": units, "return_sequences": return_sequences, "activation": "tanh", "recurrent_activation": "sigmoid"}
+        return "lstm", config, [w.astype(np.float32) for w in weights]
+    dense = ("dense", {"activation": "linear"}, [rng.normal(0, 0.1, (75, 1)).astype(np.float32), np.zeros(1, np.float32)])
+    return NumpyLSTM([lstm(1, 150, True), lstm(150, 75, False), dense])
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    model = keras_model()
+    exported = NumpyLSTM.from_keras(model) if model is not None else random_numpy_model(rng)
+    if model is None:
+        print("TensorFlow not installed: timing the NumPy backend only")
+
+    print(f"{'batch':>8} | {'keras ms':>9} {'numpy ms':>9} {'x':>6} | {'max |diff|':>10}")
+    for size in BATCH_SIZES:
+        X = rng.normal(0, 1, (size, TIME_STEP, 1)).astype(np.float32)
+        t_np = best_of(lambda: exported.predict(X, verbose=0), args.repeat)
+        if model is None:
+            print(f"{size:>8} | {'-':>9} {t_np * 1e3:9.1f} {'-':>6} | {'-':>10}")
+            continue
+        t_k = best_of(lambda: model.predict(X, verbose=0), args.repeat)
+        diff = np.max(np.abs(model.predict(X, verbose=0) - exported.predict(X)))
+        print(f"{size:>8} | {t_k * 1e3:9.1f} {t_np * 1e3:9.1f} {t_k / t_np:6.1f} | {diff:10.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Windowing / context-buffer cost of the CUSTOM LSTM detector.
+
+Compares the former list-based create_dataset and handleBatch with the
+strided-view + carry-buffer versions in models/LSTM_MODEL.py, for batch
+sizes from 288 to 100k. Inference is replaced by a cheap linear predictor so
+only the per-batch data handling is measured.
+
+    python benchmarks/bench_lstm_windowing.py [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from models.LSTM_MODEL import CUSTOM_Detector, create_dataset  # noqa: E402
+
+BATCH_SIZES = (288, 1_000, 10_000, 100_000)
+TIME_STEP = 10
+
+
+def legacy_create_dataset(data, time_step=28):
+    X, y = [], []
+    for i in range(len(data) - time_step):
+        X.append(data[i:i + time_step])
+        y.append(data[i + time_step])
+    return np.array(X), np.array(y)
+
+
+class LinearPredictor:
+    """Stand-in for the Keras model: mean of the window."""
+    def predict(self, X, verbose=0):
+        return np.asarray(X).mean(axis=1).reshape(-1, 1)
+
+
+class LegacyDetector:
+    """handleBatch scoring path as it was before the carry buffer."""
+    def __init__(self, model, scaler, threshold, buffer, time_step):
+        self.model, self.scaler, self.threshold = model, scaler, threshold
+        self.buffer, self.time_step = buffer, time_step
+
+    def handleBatch(self, batch):
+        values = []
+        for val in batch:
+            values.append(val)
+        data_scaled = self.scaler.transform(np.array(batch).reshape(-1, 1))
+        self.buffer = np.array(self.buffer).reshape(-1, 1)
+        combined_scaled = np.concatenate([self.buffer, data_scaled], axis=0)
+        X_batch, y_batch = legacy_create_dataset(combined_scaled, self.time_step)
+        X_batch = X_batch.reshape((X_batch.shape[0], self.time_step, 1))
+        predictions = self.model.predict(X_batch, verbose=0)
+        anomaly_scores = np.abs(predictions - y_batch).flatten().tolist()
+        is_anomaly = [int(score > self.threshold) for score in anomaly_scores]
+        self.buffer = combined_scaled[-self.time_step:].reshape(-1, 1)
+        return anomaly_scores, is_anomaly
+
+
+def trained_detectors(history):
+    scaler = StandardScaler().fit(history.reshape(-1, 1))
+    buffer = scaler.transform(history[-TIME_STEP:].reshape(-1, 1))
+    legacy = LegacyDetector(LinearPredictor(), scaler, 1.0, buffer, TIME_STEP)
+    current = CUSTOM_Detector(batch_size=288, start_index=len(history), threshold=0.99)
+    current.model, current.scaler, current.threshold = LinearPredictor(), scaler, 1.0
+    current._append_context(buffer.ravel())
+    return legacy, current
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    history = rng.normal(75.0, 3.0, 2_000)
+    print(f"{'batch':>8} | {'create_dataset ms':>23} | {'handleBatch ms':>23}")
+    print(f"{'':>8} | {'legacy':>7} {'new':>7} {'x':>7} | {'legacy':>7} {'new':>7} {'x':>7}")
+    for size in BATCH_SIZES:
+        batch = rng.normal(75.0, 3.0, size).tolist()
+        column = np.asarray(batch).reshape(-1, 1)
+        cd_old = best_of(lambda: legacy_create_dataset(column, TIME_STEP), args.repeat)
+        cd_new = best_of(lambda: create_dataset(column, TIME_STEP), args.repeat)
+
+        legacy, current = trained_detectors(history)
+        assert np.allclose(legacy.handleBatch(batch)[0], current.handleBatch(batch)[0])
+        hb_old = best_of(lambda: legacy.handleBatch(batch), args.repeat)
+        hb_new = best_of(lambda: current.handleBatch(batch), args.repeat)
+        print(f"{size:>8} | {cd_old * 1e3:7.2f} {cd_new * 1e3:7.3f} {cd_old / cd_new:7.0f} | "
+              f"{hb_old * 1e3:7.2f} {hb_new * 1e3:7.2f} {hb_old / hb_new:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
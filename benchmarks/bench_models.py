@@ -0,0 +1,398 @@
+"""
+Per-message cost of every DSL model as the generated pipeline wires it up.
+
+For each model (StandardAbsoluteDeviation, GaussianScorer, OneClassSVM,
+HalfSpaceTrees, SNARIMAX, CUSTOM) a one-spec .anomaly file is generated in
+a scratch copy of the repository and run in a fresh interpreter. Values are
+published as JSON messages through an in-process fake MQTT broker into the
+pipeline's on_message, scores and alerts go to real files and to an
+in-memory fake Redis. Each value is timed from publish to return, so the
+latency includes decoding, scoring, sinks and the per-message prints
+(written to /dev/null; --no-echo turns them off).
+
+Inputs are publishers/data.csv and, with --synthetic N, a seeded sine wave
+with noise and injected spikes of N points. Results (msgs/sec, p50/p99/max
+latency, peak RSS) are printed as a table, or as JSON with --json / --out;
+--compare reports the change against an earlier JSON result.
+
+    python benchmarks/bench_models.py [--models SAD,HST] [--synthetic 100000] [--engine] [--out run.json] [--compare base.json]
+
+Without TensorFlow the CUSTOM variant runs models/simple_batch.py instead
+of models/CUSTOM_MODEL.py (see --custom-model); the result records which.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+COPY = ("anomaly.tx", "generate_pipeline.py", "pipeline_template.j2", "runtime", "models", "adapters")
+TOPIC = "machine/temperature"
+
+MODELS = {
+    "SAD": "model StandardAbsoluteDeviation",
+    "Gaussian": "model GaussianScorer(100)",
+    "OCSVM": "model OneClassSVM(0.1)",
+    "HST": "model HalfSpaceTrees",
+    "SNARIMAX": "model SNARIMAX",
+    "CUSTOM": "model CUSTOM(288)",
+}
+
+SPEC = """Preprocessing standard
+    method:StandardScaler
+end
+Profile default
+    start_index {start_index}
+    threshold 0.95
+end
+Broker<MQTT> local
+    host: 'localhost'
+    port: 1883
+end
+redis_db bench_redis
+    host "localhost"
+    port 6379
+    db 0
+end
+
+AnomalySpec bench
+    broker local
+    topic "{topic}"
+    attribute "value"
+    {preprocessor}
+    {model}
+    profile default
+    output "results.csv"
+    alerts "alerts.csv"
+    redis bench_redis
+end
+"""
+
+
+# ---- child process: fake broker / Redis and the timed run ----
+
+class FakeMessage:
+    __slots__ = ("topic", "payload")
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class FakeBroker:
+    """Delivers every publish synchronously to the subscribed fake clients."""
+    def __init__(self):
+        self.subscriptions = []  # (topic filter, client)
+        self.published = 0
+
+    def publish(self, topic, payload):
+        import paho.mqtt.client as mqtt
+
+        self.published += 1
+        for topic_filter, client in self.subscriptions:
+            if client.on_message is not None and mqtt.topic_matches_sub(topic_filter, topic):
+                client.on_message(client, client.userdata, FakeMessage(topic, payload))
+
+
+BROKER = FakeBroker()
+
+
+class FakeClient:
+    """The part of paho's Client the pipelines use, bound to the in-process broker."""
+    def __init__(self, *args, **kwargs):
+        self.userdata = None
+        self.on_message = None
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        BROKER.publish(topic, payload)
+
+    def subscribe(self, topic, qos=0):
+        BROKER.subscriptions.append((topic, self))
+
+    def unsubscribe(self, topic):
+        BROKER.subscriptions = [(t, c) for t, c in BROKER.subscriptions if not (t == topic and c is self)]
+
+    def user_data_set(self, userdata):
+        self.userdata = userdata
+
+    def connect(self, *args, **kwargs):
+        pass
+
+    def disconnect(self):
+        pass
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def tls_set(self, *args, **kwargs):
+        pass
+
+    def tls_insecure_set(self, value):
+        pass
+
+    def username_pw_set(self, username, password=None):
+        pass
+
+
+class FakeRedis:
+    """In-memory lists with the pipeline calls RedisSink makes."""
+    def __init__(self):
+        self.lists = {}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def ltrim(self, key, start, end):
+        items = self.lists.get(key, [])
+        self.lists[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    def execute(self):
+        return []
+
+
+def _rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_child(args):
+    import contextlib
+
+    import numpy as np
+    import paho.mqtt.client as mqtt
+
+    os.chdir(args.workdir)
+    sys.path.insert(0, args.workdir)
+    mqtt.Client = FakeClient
+    import runtime.redis_sink
+
+    runtime.redis_sink.connect = lambda **kwargs: FakeRedis()
+
+    with open(args.input) as f:
+        payloads = [json.dumps({"value": float(line)}).encode() for line in f if line.strip()]
+
+    devnull = open(os.devnull, "w")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(devnull):
+        if args.engine:
+            from runtime.engine import Engine
+
+            engine = Engine("example.anomaly")
+            engine.load()
+            pipelines = list(engine.pipelines.values())
+            inputs = [(name, engine.on_message) for name in engine.routers]
+            engine.resources.start()
+            close_outputs = engine.resources.close_all
+        else:
+            import anomaly_pipeline as ap
+
+            pipelines = list(ap.pipelines.values())
+            inputs = [(router, ap.on_message) for router in ap.routers.values()]
+            ap.start_outputs()
+            close_outputs = ap.close_outputs
+        for pipeline in pipelines:
+            pipeline.echo = not args.no_echo
+            pipeline.start()
+        for userdata, on_message in inputs:
+            client = FakeClient()
+            client.user_data_set(userdata)
+            client.on_message = on_message
+            client.subscribe(TOPIC)
+    setup = time.perf_counter() - started
+    baseline_rss = _rss_mb()
+
+    publisher = FakeClient()
+    latencies = np.empty(len(payloads), dtype=np.int64)
+    clock = time.perf_counter_ns
+    with contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        for i, payload in enumerate(payloads):
+            t0 = clock()
+            publisher.publish(TOPIC, payload)
+            latencies[i] = clock() - t0
+        for pipeline in pipelines:
+            pipeline.stop()
+        close_outputs()
+        elapsed = time.perf_counter() - started
+
+    with open("alerts.csv") as f:
+        alerts = sum(1 for line in f if line.strip() == "1")
+    us = latencies / 1000.0
+    print(json.dumps({
+        "messages": len(payloads),
+        "seconds": elapsed,
+        "msgs_per_sec": len(payloads) / elapsed,
+        "latency_us": {
+            "p50": float(np.percentile(us, 50)), "p99": float(np.percentile(us, 99)),
+            "max": float(us.max()), "mean": float(us.mean()),
+        },
+        "setup_seconds": setup,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": _rss_mb(),
+        "alerts": alerts,
+    }))
+
+
+# ---- parent process: variants, datasets and the report ----
+
+def synthetic_series(n, seed=7):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    values = 80 + 5 * np.sin(2 * np.pi * t / 288) + rng.normal(0, 0.5, n)
+    spikes = rng.choice(n, size=max(n // 1000, 1), replace=False)
+    values[spikes] += rng.choice([-1, 1], size=len(spikes)) * rng.uniform(8, 15, len(spikes))
+    return values
+
+
+def prepare(model, custom_model, start_index, workdir):
+    for name in COPY:
+        src = os.path.join(ROOT, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(workdir, name), ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy(src, workdir)
+    if model == "CUSTOM" and custom_model:
+        shutil.copy(os.path.join(ROOT, custom_model), os.path.join(workdir, "models", "CUSTOM_MODEL.py"))
+    spec = SPEC.format(
+        start_index=start_index, topic=TOPIC, model=MODELS[model],
+        preprocessor="" if model == "CUSTOM" else "preprocessor standard",
+    )
+    with open(os.path.join(workdir, "example.anomaly"), "w") as f:
+        f.write(spec)
+    result = subprocess.run([sys.executable, "generate_pipeline.py", "--no-cache"], cwd=workdir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "generation failed")
+
+
+def run_variant(model, dataset_path, args, custom_model):
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare(model, custom_model, args.start_index, workdir)
+        command = [sys.executable, os.path.abspath(__file__), "--child", "--workdir", workdir, "--input", dataset_path]
+        if args.engine:
+            command.append("--engine")
+        if args.no_echo:
+            command.append("--no-echo")
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "run failed")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def default_custom_model():
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        return "models/simple_batch.py"
+    return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(r["model"], r["dataset"], r["runtime"]): r for r in json.load(f)["results"] if "error" not in r}
+    print(f"\nagainst {baseline_path}:")
+    for r in results:
+        base = baseline.get((r["model"], r["dataset"], r["runtime"]))
+        if base is None or "error" in r:
+            continue
+        speed = r["msgs_per_sec"] / base["msgs_per_sec"] - 1
+        p99 = r["latency_us"]["p99"] / base["latency_us"]["p99"] - 1
+        print(f"  {r['model']:>9} {r['dataset']:>16}: msgs/sec {speed:+.1%}, p99 {p99:+.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default=",".join(MODELS), help=f"comma-separated subset of {', '.join(MODELS)}")
+    parser.add_argument("--synthetic", type=int, action="append", default=[], metavar="N", help="add a synthetic series of N points")
+    parser.add_argument("--no-data", action="store_true", help="skip publishers/data.csv")
+    parser.add_argument("--start-index", type=int, default=1000, help="warm-up length of the profile")
+    parser.add_argument("--custom-model", help="file installed as models/CUSTOM_MODEL.py for the CUSTOM variant")
+    parser.add_argument("--engine", action="store_true", help="run the specs with runtime.engine instead of generated code")
+    parser.add_argument("--no-echo", action="store_true", help="disable the per-message prints")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--out", help="also write the JSON results to this file")
+    parser.add_argument("--compare", metavar="JSON", help="earlier --out file to compare against")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--input", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(unknown)}")
+    custom_model = args.custom_model or default_custom_model()
+
+    with tempfile.TemporaryDirectory() as datadir:
+        datasets = [] if args.no_data else [("data.csv", os.path.join(ROOT, "publishers", "data.csv"))]
+        for n in args.synthetic:
+            path = os.path.join(datadir, f"synthetic_{n}.csv")
+            with open(path, "w") as f:
+                f.writelines(f"{v}\n" for v in synthetic_series(n))
+            datasets.append((f"synthetic-{n}", path))
+
+        results = []
+        for model in models:
+            for dataset, path in datasets:
+                entry = {"model": model, "dataset": dataset, "runtime": "engine" if args.engine else "generated"}
+                if model == "CUSTOM":
+                    entry["custom_model"] = custom_model or "models/CUSTOM_MODEL.py"
+                try:
+                    entry.update(run_variant(model, path, args, custom_model))
+                except RuntimeError as e:
+                    entry["error"] = str(e)
+                results.append(entry)
+                if not args.json:
+                    print(format_row(entry), flush=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(), "python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "start_index": args.start_index, "echo": not args.no_echo,
+        },
+        "results": results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+def format_row(r):
+    name = f"{r['model']:>9} {r['dataset']:>16}"
+    if "error" in r:
+        return f"{name}: failed ({r['error']})"
+    lat = r["latency_us"]
+    return (f"{name}: {r['msgs_per_sec']:>9.0f} msgs/s  p50 {lat['p50']:>7.1f} us  p99 {lat['p99']:>8.1f} us  "
+            f"max {lat['max'] / 1000:>7.1f} ms  peak RSS {r['peak_rss_mb']:>6.0f} MB  alerts {r['alerts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Cold-start cost of generated pipelines.
+
+For every .anomaly file, generates anomaly_pipeline.py in a scratch copy of
+the repository and imports it in a fresh interpreter with ``-X importtime``.
+Reports the median cumulative import time of the pipeline module, the wall
+time of the interpreter and the slowest imported packages. With --max-ms the
+script exits with status 1 when a spec's median import time exceeds the
+budget, so it can guard against import regressions in CI.
+
+    python benchmarks/bench_startup.py [spec.anomaly ...] [--runs 5] [--max-ms 400] [--json]
+"""
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+COPY = ("anomaly.tx", "generate_pipeline.py", "pipeline_template.j2", "runtime", "models", "adapters")
+
+
+def generate(spec_path, workdir):
+    for name in COPY:
+        src = os.path.join(ROOT, name)
+        if os.path.isdir(src):
+            shutil.copytree(src, os.path.join(workdir, name), ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            shutil.copy(src, workdir)
+    shutil.copy(spec_path, os.path.join(workdir, "example.anomaly"))
+    result = subprocess.run([sys.executable, "generate_pipeline.py"], cwd=workdir, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "generation failed")
+
+
+def import_once(workdir):
+    """Returns (pipeline import µs, wall seconds, {package: µs spent importing it})."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import anomaly_pipeline"],
+        cwd=workdir, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    total, packages = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            cumulative = int(cumulative)
+        except ValueError:  # header line
+            continue
+        stripped = name.strip()
+        if stripped == "anomaly_pipeline":
+            total = cumulative
+        elif len(name) - len(name.lstrip()) == 3:
+            # direct import of the pipeline module, grouped by top-level package
+            package = stripped.split(".")[0]
+            packages[package] = packages.get(package, 0) + cumulative
+    return total, wall, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("specs", nargs="*", help="default: example.anomaly and examples/*.anomaly")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="slowest top-level imports to list")
+    parser.add_argument("--max-ms", type=float, help="fail if a median import time exceeds this budget")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    specs = args.specs or [os.path.join(ROOT, "example.anomaly")] + sorted(glob.glob(os.path.join(ROOT, "examples", "*.anomaly")))
+    results, over_budget = [], False
+    for spec in specs:
+        entry = {"spec": os.path.relpath(spec)}
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                generate(spec, workdir)
+                runs = [import_once(workdir) for _ in range(args.runs)]
+            except RuntimeError as e:
+                entry["error"] = str(e)
+                results.append(entry)
+                continue
+        entry["import_ms"] = statistics.median(r[0] for r in runs) / 1000
+        entry["wall_ms"] = statistics.median(r[1] for r in runs) * 1000
+        packages = runs[-1][2]
+        entry["top"] = {k: packages[k] / 1000 for k in sorted(packages, key=packages.get, reverse=True)[:args.top]}
+        if args.max_ms is not None and entry["import_ms"] > args.max_ms:
+            entry["over_budget"] = over_budget = True
+        results.append(entry)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for entry in results:
+            if "error" in entry:
+                print(f"{entry['spec']}: skipped ({entry['error']})")
+                continue
+            flag = "  OVER BUDGET" if entry.get("over_budget") else ""
+            top = ", ".join(f"{k} {v:.0f}ms" for k, v in entry["top"].items())
+            print(f"{entry['spec']}: import {entry['import_ms']:.0f} ms, interpreter {entry['wall_ms']:.0f} ms{flag}")
+            print(f"    slowest: {top}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
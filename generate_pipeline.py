@@ -1,52 +1,122 @@
 # -*- coding: utf-8 -*-
 
+import argparse
+import functools
 import os
+import sys
+import hashlib
 import jinja2
+from concurrent.futures import ProcessPoolExecutor
 from textx import metamodel_from_file
 
-from pprint import pprint
+from runtime.detectors import detector_config, detector_path
 
-# Load metamodel and model
-mm = metamodel_from_file('anomaly.tx', auto_init_attributes=True)
-model = mm.model_from_file('example.anomaly')
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GRAMMAR = os.path.join(BASE_DIR, "anomaly.tx")
+TEMPLATE = "pipeline_template.j2"
+DEFAULT_CACHE_DIR = ".anomaly_cache"
+# Models that score a feature dict, and so accept several attributes.
+MULTIVARIATE_MODELS = ("OneClassSVM", "HalfSpaceTrees")
+# Decoders whose messages carry several samples (see runtime/decoders.py).
+BATCHED_DECODERS = ("float32", "msgpack")
+RUNTIMES = ("threads", "asyncio")
+# Models scored in a worker thread by the asyncio runtime: a point costs them
+# more than the hop to the executor (tens of microseconds vs about 20).
+EXECUTOR_MODELS = ("HalfSpaceTrees", "SNARIMAX", "CUSTOM")
+# Longest wait of an ingest group when the spec gives no max_latency_ms, so a
+# partial group on a quiet topic is still scored.
+DEFAULT_MAX_LATENCY_MS = 50
+# Fields of a parsed spec read by runtime.engine.SpecPipeline; generated
+# pipelines carry them as a literal.
+PIPELINE_SPEC_FIELDS = ("name", "topic", "attributes", "decoder", "ingest", "queue", "keyed", "shards", "output", "alerts", "redis")
 
-preprocessing_map = {p.name: p for p in model.preprocesses}
 
-# Assuming one AnomalySpec; loop over all if multiple
-spec = model.spec  # Use model.spec if there are multiple
+@functools.lru_cache(maxsize=None)
+def get_metamodel():
+    # Built once per process and reused for every spec.
+    return metamodel_from_file(GRAMMAR, auto_init_attributes=True)
 
-preprocessing_map = {p.name: p for p in model.preprocesses}
-# Extract scaler details safely
-preprocessor_name = spec.preprocessor.name if spec.preprocessor else None
-preprocessor_method = preprocessing_map[preprocessor_name].method if preprocessor_name in preprocessing_map else None
 
-# Map profiles by name
-profile_map = {p.name: p for p in model.profiles}
+def dict_literal(value):
+    # Python source of a dict, one key per line.
+    return "{\n" + "".join(f"    {key!r}: {item!r},\n" for key, item in value.items()) + "}"
 
-# Extract profile
-profile = profile_map[spec.profile.name] if spec.profile and spec.profile.name in profile_map else None
-# Extract broker details
-# Map brokers by name
-broker_map = {b.name: b for b in model.brokers}
-broker = broker_map[spec.broker.name] if spec.broker and spec.broker.name in broker_map else None
 
-redis_map = {r.name: r for r in model.redis_dbs}
-redis = redis_map[spec.redis.name] if spec.redis and spec.redis.name in redis_map else None
+@functools.lru_cache(maxsize=None)
+def get_template():
+    template_loader = jinja2.FileSystemLoader(searchpath=BASE_DIR)
+    template_env = jinja2.Environment(loader=template_loader)
+    template_env.filters["literal"] = dict_literal
+    return template_env.get_template(TEMPLATE)
 
-if model.evaluation:
-    eval_block = model.evaluation
-    evaluation = {
-            "name": eval_block.name,
-             "data_file": eval_block.data_file,
-             "scores_file": eval_block.scores_file,
-             "labels_file": eval_block.labels_file,
-             "anomalies_file": eval_block.anomalies_file,
-             "metrics": [m for m in eval_block.metrics]
+
+@functools.lru_cache(maxsize=None)
+def generator_fingerprint():
+    # Anything that changes the generated code invalidates cached results.
+    digest = hashlib.sha256()
+    paths = (GRAMMAR, os.path.join(BASE_DIR, TEMPLATE), os.path.join(BASE_DIR, "runtime", "detectors.py"), os.path.abspath(__file__))
+    for path in paths:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def parse_broker(broker):
+    # Extract auth if present
+    auth = getattr(broker, "auth", None)
+
+    # Determine auth fields based on type
+    auth_type = type(auth).__name__ if auth else None
+    auth_data = {}
+    username, password = "", ""
+    if auth_type == "AuthPlain":
+        auth_data = {
+            "username": auth.username,
+            "password": auth.password
+        }
+        username, password = auth.username, auth.password
+    elif auth_type == "AuthApiKey":
+        auth_data = {
+            "key": auth.key
+        }
+        username = auth.key
+    elif auth_type == "AuthCert":
+        auth_data = {
+            "cert": getattr(auth, "cert", None),
+            "certPath": getattr(auth, "certPath", None)
+        }
+    return {
+        "name": broker.name,
+        "host": broker.host,
+        "port": broker.port,
+        "ssl": getattr(broker, "ssl", False),
+        "basePath": getattr(broker, "basePath", None),
+        "webPath": getattr(broker, "webPath", ""),
+        "webPort": getattr(broker, "webPort", 0),
+        "auth_type": auth_type,
+        "auth": auth_data,
+        "username": username,
+        "password": password,
+        # paho client limits (None: its defaults of 20 unacknowledged messages and an unbounded queue)
+        "max_inflight": broker.max_inflight or None,
+        "queue_size": broker.queue_size or None
     }
-else:
-    evaluation = None
 
 
+def parse_redis(redis):
+    return {
+        "name": redis.name,
+        "host": redis.host,
+        "port": redis.port,
+        "db": redis.db,
+        "key_scores": redis.key_scores or "anomaly_scores",
+        "key_alerts": redis.key_alerts or "anomaly_alerts",
+        "flush_size": redis.flush_size or 1,
+        "flush_ms": redis.flush_ms or None,
+        "max_len": redis.max_len or None,
+        "pool_size": redis.pool_size or None
+    }
+
 
 def parse_output(output_block):
     block_type = output_block.__class__.__name__
@@ -54,111 +124,321 @@ def parse_output(output_block):
     if block_type in ("OutputFile", "AlertFile"):
         return {
             "type": "file",
-            "path": output_block.path
+            "path": output_block.path,
+            # binary: runtime.records (timestamp, value, score, flag); alerts are always CSV
+            "format": getattr(output_block, "format", "") or "csv",
+            "buffer_lines": output_block.buffer_lines or 1,
+            "flush_ms": output_block.flush_ms or None,
+            "fsync": output_block.durability == "fsync"
         }
 
     elif block_type in ("OutputMQTT", "AlertMQTT"):
         topic_block = output_block.topicBlock
-        broker = topic_block.broker
-        auth = getattr(broker, "auth", None)
-        auth_type = type(auth).__name__ if auth else None
-        auth_data = {}
-
-        if auth_type == "AuthPlain":
-            auth_data = {
-                "username": auth.username,
-                "password": auth.password
-            }
-        elif auth_type == "AuthApiKey":
-            auth_data = {
-                "key": auth.key
-            }
-        elif auth_type == "AuthCert":
-            auth_data = {
-                "cert": getattr(auth, "cert", None),
-                "certPath": getattr(auth, "certPath", None)
-            }
+        if topic_block.qos not in (0, 1, 2):
+            raise ValueError(f"topic '{topic_block.topic}': qos must be 0, 1 or 2")
         return {
             "type": "mqtt",
             "topic": topic_block.topic,
-            "broker": {
-                "host": topic_block.broker.host,
-                "port": topic_block.broker.port,
-                "ssl": getattr(broker, "ssl", False),
-                "webPath": getattr(broker, "webPath", ""),
-                "webPort": getattr(broker, "webPort", 0),
-                "auth": auth_data
-	   }
+            "broker": parse_broker(topic_block.broker),
+            "qos": topic_block.qos,
+            # results per message: 1 publishes JSON objects, more pack them into JSON arrays
+            "batch_size": topic_block.batch_size or 1,
+            "flush_ms": topic_block.flush_ms or None
         }
 
     return None
 
 
-# Extract auth if present
-auth = getattr(broker, "auth", None) if broker else None
+def state_version(spec, preprocessor_method, profile, detector):
+    # Fingerprint of everything that shapes a spec's model state; checkpoints
+    # taken with a different configuration are not restored.
+    params = {k: getattr(getattr(spec.model, k), "name", getattr(spec.model, k)) for k in type(spec.model)._tx_attrs}
+    fingerprint = repr((
+        type(spec.model).__name__, detector, sorted(params.items()), preprocessor_method,
+        profile.start_index if profile else None, profile.threshold if profile else None,
+        spec.attribute[0] if len(spec.attribute) == 1 else tuple(spec.attribute), bool(spec.keyed)
+    ))
+    return hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
 
-# Determine auth fields based on type
-auth_type = type(auth).__name__ if auth else None
-auth_data = {}
-if auth_type == "AuthPlain":
-    auth_data = {
-        "username": auth.username,
-        "password": auth.password
-    }
-elif auth_type == "AuthApiKey":
-    auth_data = {
-        "key": auth.key
-    }
-elif auth_type == "AuthCert":
-    auth_data = {
-        "cert": getattr(auth, "cert", None),
-        "certPath": getattr(auth, "certPath", None)
-    }
-context = {
-    "spec": {
-        "attribute": spec.attribute,
-        "topic":spec.topic,
+
+def parse_spec(spec):
+    # References (preprocessor, profile, broker, redis) are resolved by textX.
+    preprocessor_name = spec.preprocessor.name if spec.preprocessor else None
+    preprocessor_method = spec.preprocessor.method if spec.preprocessor else None
+    profile = spec.profile or None
+    broker = spec.broker or None
+    redis = spec.redis or None
+    if spec.shards and spec.queue:
+        raise ValueError(f"AnomalySpec '{spec.name}': 'queue' cannot be combined with 'shards'")
+    if spec.shards > 1 and not spec.keyed:
+        # Shards partition streams by key; one unkeyed stream would leave all but one worker idle.
+        raise ValueError(f"AnomalySpec '{spec.name}': 'shards' needs 'key_by_topic' to spread the streams over workers")
+    model_name = type(spec.model).__name__
+    if len(set(spec.attribute)) != len(spec.attribute):
+        raise ValueError(f"AnomalySpec '{spec.name}': an attribute is listed twice")
+    if len(spec.attribute) > 1 and model_name not in MULTIVARIATE_MODELS:
+        raise ValueError(
+            f"AnomalySpec '{spec.name}': {model_name} scores a single attribute "
+            f"(several are supported by {' and '.join(MULTIVARIATE_MODELS)})"
+        )
+    decoder = spec.decoder or "json"
+    if decoder == "fields" and any("." in attribute for attribute in spec.attribute):
+        raise ValueError(f"AnomalySpec '{spec.name}': decoder 'fields' reads top-level attributes only")
+    output = parse_output(spec.output)
+    if output["type"] == "file" and output["format"] == "binary":
+        output["features"] = len(spec.attribute)  # width of the record value field
+    # Generated detectors subclass the runtime class (module, name) of the model.
+    detector = detector_path(model_name, len(spec.attribute))
+
+    parsed = {
+        "name": spec.name,
+        "class_name": spec.name[:1].upper() + spec.name[1:],
+        "state_version": state_version(spec, preprocessor_method, profile, detector),
+        # One attribute is scored as a float; several as a {attribute: float} feature dict.
+        "attributes": list(spec.attribute),
+        "decoder": decoder,
+        "batched": decoder in BATCHED_DECODERS,
+        "topic": spec.topic,
         "profile": {
             "threshold": profile.threshold if profile else None,
             "start_index": profile.start_index if profile else None
         },
-        "output": parse_output(spec.output),
+        "output": output,
         "alerts": parse_output(spec.alerts),
         "preprocessor_name": preprocessor_name,
         "preprocessor_method": preprocessor_method,
         "model": spec.model,
-        "model_name": type(spec.model).__name__,
-        "broker": {
-            "host": broker.host if broker else None,
-            "port": broker.port if broker else None,
-            "ssl": getattr(broker, "ssl", None),
-            "basePath": getattr(broker, "basePath", None),
-            "webPath": getattr(broker, "webPath", None),
-            "webPort": getattr(broker, "webPort", None),
-            "auth_type": auth_type,
-            "auth": auth_data
-        },
-        "redis": {
-            "host": redis.host if redis else None,
-            "port": redis.port if redis else None,
-            "db": redis.db if redis else None,
-            "key_scores": getattr(redis, "key_scores", "anomaly_scores") if redis else None,
-             "key_alerts": getattr(redis, "key_alerts", "anomaly_alerts") if redis else None
+        "model_name": model_name,
+        "detector": detector,
+        "broker": parse_broker(broker) if broker else None,
+        "redis": parse_redis(redis) if redis else None,
+        "ingest": {
+            "batch_size": spec.ingest.batch_size,
+            "max_latency_ms": spec.ingest.max_latency_ms or DEFAULT_MAX_LATENCY_MS
+        } if spec.ingest else None,
+        "queue": {
+            "size": spec.queue.size,
+            "overflow": spec.queue.overflow or "block"
+        } if spec.queue else None,
+        "keyed": {
+            "max_keys": spec.max_keys or None,
+            "idle_ttl": spec.idle_ttl or None
+        } if spec.keyed else None,
+        "shards": spec.shards or None,
+        "executor": model_name in EXECUTOR_MODELS
     }
+    parsed["detector_config"] = detector_config(parsed)
+    parsed["pipeline_spec"] = pipeline_spec(parsed)
+    return parsed
+
+
+def pipeline_spec(parsed):
+    # Outputs only name their broker and Redis DB; those are built once for all specs.
+    spec = {field: parsed[field] for field in PIPELINE_SPEC_FIELDS}
+    for field in ("output", "alerts"):
+        if spec[field]["type"] == "mqtt":
+            spec[field] = dict(spec[field], broker={"name": spec[field]["broker"]["name"]})
+    if spec["redis"]:
+        spec["redis"] = {"name": spec["redis"]["name"]}
+    return spec
+
+
+def build_context(model, runtime="threads"):
+    if runtime not in RUNTIMES:
+        raise ValueError(f"unknown runtime '{runtime}' (expected one of {', '.join(RUNTIMES)})")
+    if model.evaluation:
+        eval_block = model.evaluation
+        evaluation = {
+                "name": eval_block.name,
+                 "data_file": eval_block.data_file,
+                 "scores_file": eval_block.scores_file,
+                 "labels_file": eval_block.labels_file,
+                 "anomalies_file": eval_block.anomalies_file,
+                 "metrics": [m for m in eval_block.metrics],
+                 "labels_topic": eval_block.labels_topic or None,
+                 "report_every": eval_block.report_every or 0,
+                 "roc_bins": eval_block.roc_bins or None
+        }
+    else:
+        evaluation = None
+
+    checkpoint = {
+        "path": model.checkpoint.path,
+        "interval": model.checkpoint.interval
+    } if model.checkpoint else None
+
+    # Without a Metrics block every scored value is printed, as before.
+    metrics = {
+        "host": model.metrics.host or "127.0.0.1",
+        "port": model.metrics.port,
+        "print_every": model.metrics.print_every or 0
+    } if model.metrics else None
+
+    specs = [parse_spec(spec) for spec in model.specs]
+    if runtime == "asyncio":
+        for spec in specs:
+            if spec["shards"]:
+                raise ValueError(f"AnomalySpec '{spec['name']}': 'shards' is not supported by the asyncio runtime")
+
+    if evaluation:
+        # The spec evaluated while streaming: the one writing the Evaluation files, else the first.
+        evaluated = next(
+            (spec for spec in specs
+             if (spec["alerts"]["type"] == "file" and spec["alerts"]["path"] == evaluation["anomalies_file"])
+             or (spec["output"]["type"] == "file" and spec["output"]["path"] == evaluation["scores_file"])),
+            specs[0]
+        )
+        evaluation["spec"] = evaluated["name"]
+        evaluation["broker"] = evaluated["broker"]["name"]
+
+    # Resources shared between specs: one connection per broker (results are
+    # published on the subscriber connection when a broker is used for both),
+    # one writer per file and one sink per Redis DB.
+    input_brokers = {}
+    output_brokers = {}
+    file_outputs = {}
+    redis_dbs = {}
+    for spec in specs:
+        broker = input_brokers.setdefault(spec["broker"]["name"], dict(spec["broker"], topics=[]))
+        if spec["topic"] not in broker["topics"]:
+            broker["topics"].append(spec["topic"])
+        if evaluation and evaluation["labels_topic"] and evaluation["spec"] == spec["name"]:
+            if evaluation["labels_topic"] not in broker["topics"]:
+                broker["topics"].append(evaluation["labels_topic"])
+        for out in (spec["output"], spec["alerts"]):
+            if out["type"] == "file":
+                shared = file_outputs.setdefault(out["path"], out)
+                if shared.get("features") != out.get("features") and shared.get("format") == out.get("format") == "binary":
+                    raise ValueError(f"'{out['path']}' is written by specs with different attribute counts")
+            elif out["type"] == "mqtt":
+                output_brokers.setdefault(out["broker"]["name"], out["broker"])
+        if spec["redis"]:
+            redis_dbs.setdefault(spec["redis"]["name"], spec["redis"])
+
+    return {
+        "specs": specs,
+        "input_brokers": list(input_brokers.values()),
+        "output_brokers": list(output_brokers.values()),
+        "file_outputs": list(file_outputs.values()),
+        "redis_dbs": list(redis_dbs.values()),
+        "evaluation": evaluation,
+        "checkpoint": checkpoint,
+        "metrics": metrics,
+        "asyncio": runtime == "asyncio"
+    }
+
+
+def render(source, file_name=None, runtime="threads"):
+    """Generate the pipeline code for the DSL text ``source``."""
+    model = get_metamodel().model_from_str(source, file_name=file_name)
+    return get_template().render(build_context(model, runtime))
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def generate(spec_path, output_path, cache_dir=DEFAULT_CACHE_DIR, runtime="threads"):
+    """
+    Generate ``output_path`` from the DSL file ``spec_path``.
+
+    Rendered code is cached in ``cache_dir`` under a hash of the spec content
+    and of the grammar, template and generator, so unchanged specs are
+    neither parsed nor rendered again (pass cache_dir=None to disable).
+    ``runtime`` selects the threaded runtime or the asyncio one.
+    Returns "generated", "cached" or "unchanged" (the output was already
+    up to date and has not been rewritten).
+    """
+    with open(spec_path, "r", encoding="utf-8") as f:
+        source = f.read()
+
+    cache_path = None
+    code = None
+    status = "generated"
+    if cache_dir:
+        key = hashlib.sha256(f"{generator_fingerprint()}\0{runtime}\0{source}".encode()).hexdigest()
+        cache_path = os.path.join(cache_dir, f"{key}.py")
+        if os.path.exists(cache_path):
+            with open(cache_path, "r") as f:
+                code = f.read()
+            status = "cached"
+    if code is None:
+        code = render(source, file_name=spec_path, runtime=runtime)
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            _write_atomic(cache_path, code)
+
+    if os.path.exists(output_path):
+        with open(output_path, "r") as f:
+            if f.read() == code:
+                return "unchanged"
+    _write_atomic(output_path, code)
+    return status
+
+
+def _generate_job(job):
+    spec_path, output_path, cache_dir, runtime = job
+    try:
+        return spec_path, output_path, generate(spec_path, output_path, cache_dir, runtime), None
+    except Exception as e:
+        return spec_path, output_path, None, f"{type(e).__name__}: {e}"
+
+
+def generate_many(jobs, cache_dir=DEFAULT_CACHE_DIR, workers=1, runtime="threads"):
+    """
+    Generate several (spec_path, output_path) pairs.
+
+    With workers > 1 the jobs are spread over worker processes; each builds
+    the metamodel and template once. Yields (spec_path, output_path, status,
+    error) in job order; a failing spec does not stop the others.
+    """
+    jobs = [(spec_path, output_path, cache_dir, runtime) for spec_path, output_path in jobs]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(_generate_job, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+    else:
+        for job in jobs:
+            yield _generate_job(job)
+
+
+def output_path_for(spec_path, out_dir):
+    name = os.path.splitext(os.path.basename(spec_path))[0]
+    return os.path.join(out_dir, f"{name}_pipeline.py")
 
-    },
-    "evaluation": evaluation
-}
 
-template_loader = jinja2.FileSystemLoader(searchpath=".")
-template_env = jinja2.Environment(loader=template_loader)
-template = template_env.get_template("pipeline_template.j2")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Python pipelines from AnomalyDSL specifications.")
+    parser.add_argument("specs", nargs="*", default=["example.anomaly"], help="DSL files (default: example.anomaly)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("-o", "--output", help="output file (single spec only; default: anomaly_pipeline.py)")
+    target.add_argument("--out-dir", help="write <spec name>_pipeline.py for every spec into this directory")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (default: 1)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help=f"rendered-code cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--no-cache", action="store_true", help="always parse and render")
+    parser.add_argument("--runtime", choices=RUNTIMES, default="threads",
+                        help="threads (paho network threads, default) or asyncio (one event loop for every spec and broker)")
+    args = parser.parse_args(argv)
 
-# Render and write to file
-output_code = template.render(context)
-with open("anomaly_pipeline.py", "w") as f:
-        f.write(output_code)
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+        jobs = [(spec, output_path_for(spec, args.out_dir)) for spec in args.specs]
+    elif len(args.specs) == 1:
+        jobs = [(args.specs[0], args.output or "anomaly_pipeline.py")]
+    else:
+        parser.error("several specs need --out-dir")
 
-        print("Generated 'anomaly_pipeline.py' from DSL and template.") 
+    failed = 0
+    for spec_path, output_path, status, error in generate_many(jobs, None if args.no_cache else args.cache_dir, args.jobs, args.runtime):
+        if error:
+            failed += 1
+            print(f"Failed to generate '{output_path}' from '{spec_path}': {error}", file=sys.stderr)
+        else:
+            print(f"Generated '{output_path}' from '{spec_path}' ({status}).")
+    return 1 if failed else 0
 
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,44 @@
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
-from sklearn.preprocessing import StandardScaler
-from tensorflow.keras.layers import Dropout
 import numpy as np
-import tensorflow as tf
+from numpy.lib.stride_tricks import sliding_window_view
+from collections import deque
+import os
+import threading
 import random
 
+from models.numpy_lstm import NumpyLSTM
+
 seed = 42
 random.seed(seed)
 np.random.seed(seed)
-tf.random.set_seed(seed)
+_tf_seeded = False
+
+
+def _keras():
+    # TensorFlow (like sklearn) is only imported when a model is trained or a
+    # Keras model is restored, so importing this module stays cheap and scoring
+    # with the NumPy backend never loads it.
+    global _tf_seeded
+    import tensorflow as tf
+    if not _tf_seeded:
+        tf.random.set_seed(seed)
+        _tf_seeded = True
+    return tf.keras
+
+
+
+def _pack(model):
+    # Keras models do not pickle reliably; keep architecture + weights instead.
+    if model is None or isinstance(model, NumpyLSTM):
+        return model
+    return {"config": model.get_config(), "weights": model.get_weights()}
+
 
+def _unpack(model):
+    if not isinstance(model, dict):
+        return model
+    restored = _keras().models.Sequential.from_config(model["config"])
+    restored.set_weights(model["weights"])
+    return restored
 
 
 class AnomalyDetector:
@@ -18,13 +46,19 @@ class AnomalyDetector:
         pass
 
 def create_dataset(data, time_step=28):
-    X, y = [], []
-    for i in range(len(data) - time_step):
-        X.append(data[i:i + time_step])
-        y.append(data[i + time_step])
-    return np.array(X), np.array(y)
+    # X[i] = data[i:i + time_step], y[i] = data[i + time_step].
+    # X is a strided read-only view on data, no window is copied.
+    data = np.asarray(data)
+    n = len(data) - time_step
+    if n <= 0:
+        return np.empty((0, time_step) + data.shape[1:], dtype=data.dtype), data[:0]
+    X = sliding_window_view(data[:-1], time_step, axis=0)
+    if data.ndim > 1:
+        X = np.moveaxis(X, -1, 1)
+    return X, data[time_step:]
 
 def profile_stream(data, time_step=288,threshold_percentile=0.99):
+    from sklearn.preprocessing import StandardScaler
     scaler = StandardScaler()
     data_scaled = scaler.fit_transform(data.reshape(-1, 1))
 
@@ -32,7 +66,9 @@ def profile_stream(data, time_step=288,threshold_percentile=0.99):
 
     X = X.reshape((X.shape[0], X.shape[1], 1))
 
-
+    keras = _keras()
+    Sequential = keras.models.Sequential
+    LSTM, Dense, Dropout = keras.layers.LSTM, keras.layers.Dense, keras.layers.Dropout
     model = Sequential([
         LSTM(150, return_sequences=True, input_shape=(time_step, 1)),
         Dropout(0.2),
@@ -57,58 +93,229 @@ def profile_stream(data, time_step=288,threshold_percentile=0.99):
     return model, scaler, threshold, buffer
 
 class CUSTOM_Detector(AnomalyDetector):
+    # Fit the LSTM in a background thread so ingest never waits for Keras
+    # (DSL: model CUSTOM(288, training=background)). Points that arrive before
+    # the first model is ready are held back and scored once it is installed,
+    # so the scores do not depend on how long the fit takes.
+    train_in_background = False
+    # Refit on the latest start_index points every N points (None: train once).
+    # Scoring continues with the current model until the new one is swapped in.
+    retrain_every = None
+    # "keras" predicts with the trained Keras model, "numpy" exports its weights
+    # after training and predicts with NumpyLSTM (no TensorFlow in the scoring path).
+    inference_backend = "keras"
+    # .npz with exported weights, scaler and threshold. Written after every fit;
+    # if it exists at startup the model is loaded from it and warm-up is skipped.
+    weights_path = None
+
     def __init__(self, batch_size=288, start_index=1152, threshold=0.99):
         super().__init__()
         self.batch_size = batch_size
         self.start_index = start_index  # how many points to train on
         self.threshold = threshold # overrideable or computed during training
+        self.threshold_percentile = threshold
         self.model = None
         self.scaler = None
-        self.buffer = []
         self.time_step = 10
-        self._hist = []
+        self.unscored = 0  # points released with score 0 after a failed first fit
+        self._hist = deque(maxlen=start_index or None)  # rolling training window
+        self._seen = 0
+        self._next_train_at = start_index + 1
+        self._training = False
+        self._worker = None
+        self._ready = None  # (result, seen) handed over by the training thread
+        self._held = []  # batches that arrived while the first model was fitted
+        self._lock = threading.Lock()
+        if self.weights_path and os.path.exists(self.weights_path):
+            self._load_weights(self.weights_path)
+        # Scaled context (last time_step values) followed by the current batch.
+        # Allocated once and only grown when a larger batch arrives.
+        self._work = np.empty(0, dtype=np.float64)
+        self._ctx_len = 0
+
+    def __getstate__(self):
+        # Keras models are stored as architecture + weights (see _pack).
+        if self._training:
+            # wait for the running fit: its model scores the held points after restore
+            self._worker.join()
+        state = self.__dict__.copy()
+        del state["_lock"], state["_worker"]
+        state["model"] = _pack(self.model)
+        if self._ready is not None and self._ready[0] is not None:
+            (model, *rest), seen = self._ready
+            state["_ready"] = ((_pack(model), *rest), seen)
+        return state
+
+    def __setstate__(self, state):
+        state["model"] = _unpack(state["model"])
+        if state["_ready"] is not None and state["_ready"][0] is not None:
+            (model, *rest), seen = state["_ready"]
+            state["_ready"] = ((_unpack(model), *rest), seen)
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._worker = None
+
     def handleBatch(self, batch):
-        values = []
-        for val in batch:
-            values.append(val)
-        if len(values) == 0:
+        values = np.asarray(batch, dtype=np.float64).ravel()
+        n = len(values)
+        if n == 0:
             return [],[]
-        if self.model is None:
-            self._hist.extend(values)
-            if len(self._hist) <= self.start_index:
-                return [0.0]*len(values), [0]*len(values)
+        held_scores, held_flags = self._install_ready() if self._ready is not None else ([], [])
+        self._seen += n
+        if self.model is None or self.retrain_every:
+            self._hist.extend(values.tolist())
 
-            train_data = np.array(self._hist[-self.start_index:], dtype=np.float32)
-            self.model, self.scaler, self.threshold, self.buffer = profile_stream(train_data, time_step=self.time_step, threshold_percentile=self.threshold)
+        if self.model is None:
+            if self._training:
+                # scored by the model being fitted, see _install_ready
+                self._held.append(values)
+                return [], []
+            scores, flags = [0.0]*n, [0]*n
+        else:
+            scores, flags = self._score(values)
 
-            return [0.0]*len(values), [0]*len(values)
-        
+        if not self._training and self._seen >= self._next_train_at and (self.model is None or self.retrain_every):
+            self._start_training()
+        return held_scores + scores, held_flags + flags
 
-        data_scaled = self.scaler.transform(np.array(batch).reshape(-1, 1))
+    def drain(self):
+        """Wait for a running fit and return the scores of the points held back meanwhile."""
+        if self._training:
+            self._worker.join()
+        if self._ready is None:
+            return [], []
+        return self._install_ready()
 
-        if len(self.buffer) > 0:
-            self.buffer = np.array(self.buffer).reshape(-1, 1)
-            combined_scaled = np.concatenate([self.buffer, data_scaled], axis=0)
-        else:
-            combined_scaled = data_scaled
+    def _score(self, values):
+        n = len(values)
+        # scale the batch straight into the work buffer, behind the carried context
+        ctx = self._ctx_len
+        end = ctx + n
+        self._reserve(end)
+        dst = self._work[ctx:end]
+        np.subtract(values, self.scaler.mean_[0], out=dst)
+        dst /= self.scaler.scale_[0]
+        combined = self._work[:end]
 
         # guard: not enough samples to form a window
-        if combined_scaled.shape[0] <= self.time_step:
-            self.buffer = combined_scaled[-self.time_step:].reshape(-1, 1)
-            return [0.0]*len(values), [0]*len(values)
-        
+        if end <= self.time_step:
+            self._ctx_len = end
+            return [0.0]*n, [0]*n
 
-        X_batch, y_batch = create_dataset(combined_scaled, self.time_step)
-        if len(X_batch) == 0:
-            return [0.0] * len(batch), [0] * len(batch)
-        X_batch = X_batch.reshape((X_batch.shape[0], self.time_step, 1))
+        X_batch, y_batch = create_dataset(combined, self.time_step)
 
-        predictions = self.model.predict(X_batch, verbose=0)
-        prediction_error=np.abs(predictions - y_batch)
-        #prediction_error=np.abs(predictions.ravel() - y_batch.ravel())
-        anomaly_scores = prediction_error.flatten().tolist()
+        predictions = self.model.predict(X_batch[..., np.newaxis], verbose=0)
+        prediction_error = np.abs(predictions.ravel() - y_batch)
+        anomaly_scores = prediction_error.tolist()
 
-        is_anomaly = [int(score > self.threshold) for score in anomaly_scores]
-        self.buffer = combined_scaled[-self.time_step:].reshape(-1, 1)
+        is_anomaly = (prediction_error > self.threshold).astype(int).tolist()
+        self._carry(end)
 
+        # without a full context (model loaded from weights_path) the first points have no window
+        pad = n - len(anomaly_scores)
+        if pad > 0:
+            return [0.0]*pad + anomaly_scores, [0]*pad + is_anomaly
         return anomaly_scores, is_anomaly
+
+    def _fit(self, train_data):
+        model, scaler, threshold, buffer = profile_stream(train_data, time_step=self.time_step, threshold_percentile=self.threshold_percentile)
+        if self.inference_backend == "numpy" or self.weights_path:
+            # check the export on the newest training windows
+            scaled = scaler.transform(train_data[-(256 + self.time_step):].reshape(-1, 1))
+            exported = NumpyLSTM.from_keras(model, check=create_dataset(scaled, self.time_step)[0])
+            if self.weights_path:
+                self._save_weights(self.weights_path, exported, scaler, threshold)
+            if self.inference_backend == "numpy":
+                model = exported
+        return model, scaler, threshold, buffer
+
+    def _save_weights(self, path, exported, scaler, threshold):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            exported.save(f, scaler_mean=scaler.mean_, scaler_scale=scaler.scale_,
+                          threshold=np.float64(threshold), time_step=np.int64(self.time_step))
+        os.replace(tmp_path, path)
+
+    def _load_weights(self, path):
+        from sklearn.preprocessing import StandardScaler
+        model, extra = NumpyLSTM.load(path)
+        scaler = StandardScaler()
+        scaler.mean_, scaler.scale_ = extra["scaler_mean"], extra["scaler_scale"]
+        scaler.var_, scaler.n_features_in_ = scaler.scale_ ** 2, len(scaler.mean_)
+        self.model, self.scaler = model, scaler
+        self.threshold = float(extra["threshold"])
+        self.time_step = int(extra["time_step"])
+        self._hist.clear()
+        if self.retrain_every:
+            self._next_train_at = self._seen + self.retrain_every
+
+    def _start_training(self):
+        train_data = np.array(self._hist, dtype=np.float32)
+        # a failed first fit is retried after another start_index points
+        self._next_train_at = self._seen + (self.retrain_every or self.start_index)
+        if not self.train_in_background:
+            self._install(self._fit(train_data), stale=False)
+            return
+        self._training = True
+        self._worker = threading.Thread(target=self._train_worker, args=(train_data, self._seen), name="custom-train", daemon=True)
+        self._worker.start()
+
+    def _train_worker(self, train_data, seen):
+        try:
+            result = self._fit(train_data)
+        except Exception as e:
+            print(f"CUSTOM_Detector training failed: {e}")
+            result = None
+        with self._lock:
+            self._ready = (result, seen)
+
+    def _install_ready(self):
+        with self._lock:
+            result, seen = self._ready
+            self._ready = None
+        self._training = False
+        self._worker = None
+        held = np.concatenate(self._held) if self._held else np.empty(0)
+        self._held = []
+        if result is None:
+            # nothing can score the held points: release them like warm-up points
+            self.unscored += len(held)
+            return [0.0]*len(held), [0]*len(held)
+        # held points follow the training data, so they continue from its context
+        self._install(result, stale=seen != self._seen - len(held))
+        if len(held) == 0:
+            return [], []
+        return self._score(held)
+
+    def _install(self, result, stale):
+        # Called from the scoring path only, so model, scaler, threshold and
+        # context always change together between two batches.
+        self.model, self.scaler, self.threshold, buffer = result
+        if not stale:
+            context = np.asarray(buffer, dtype=np.float64).ravel()
+        else:
+            # the previous model scored points while fitting: rebuild the context from the newest raw values
+            recent = np.array(list(self._hist)[-self.time_step:], dtype=np.float64)
+            context = (recent - self.scaler.mean_[0]) / self.scaler.scale_[0]
+        self._ctx_len = 0
+        self._append_context(context)
+        if not self.retrain_every:
+            self._hist.clear()
+
+    def _reserve(self, size):
+        if len(self._work) < size:
+            grown = np.empty(max(size, 2 * len(self._work)), dtype=np.float64)
+            grown[:self._ctx_len] = self._work[:self._ctx_len]
+            self._work = grown
+
+    def _append_context(self, scaled):
+        end = self._ctx_len + len(scaled)
+        self._reserve(end)
+        self._work[self._ctx_len:end] = scaled
+        self._carry(end)
+
+    def _carry(self, end):
+        # keep the last time_step scaled values at the front for the next batch
+        keep = min(end, self.time_step)
+        self._work[:keep] = self._work[end - keep:end]
+        self._ctx_len = keep
@@ -0,0 +1,127 @@
+import json
+
+import numpy as np
+
+_ACTIVATIONS = {
+    "linear": lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": lambda x: 0.5 * (np.tanh(0.5 * x) + 1.0),  # no overflow for large |x|
+    "hard_sigmoid": lambda x: np.clip(x / 6.0 + 0.5, 0.0, 1.0),  # Keras 3 definition
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+def _activation(name):
+    try:
+        return _ACTIVATIONS[name or "linear"]
+    except KeyError:
+        raise ValueError(f"unsupported activation '{name}'") from None
+
+
+class NumpyLSTM:
+    """
+    Inference-only NumPy version of a Keras Sequential made of LSTM, Dense
+    and Dropout layers (Dropout is a no-op at inference).
+
+    predict(X, verbose=0) has the same signature and output shape as
+    ``keras.Model.predict`` and computes in float32, so it can stand in
+    for the Keras model in CUSTOM_Detector. Weights are exported with
+    ``from_keras(model)`` and stored with ``save(path)`` / ``load(path)``
+    (a single .npz file); neither loading nor predicting imports TensorFlow.
+    """
+    def __init__(self, layers, batch_size: int = 2048):
+        # layers: list of (kind, config, [weights]) with kind "lstm" or "dense"
+        self.layers = layers
+        self.batch_size = int(batch_size)
+
+    @classmethod
+    def from_keras(cls, model, check=None, atol: float = 1e-4):
+        """Copy the weights of a trained Keras model; optionally verify it on the ``check`` inputs."""
+        layers = []
+        for layer in model.layers:
+            kind = type(layer).__name__
+            config = layer.get_config()
+            weights = [np.asarray(w, dtype=np.float32) for w in layer.get_weights()]
+            if kind == "LSTM":
+                if config.get("go_backwards") or config.get("stateful"):
+                    raise ValueError("go_backwards/stateful LSTM layers are not supported")
+                if not config.get("use_bias", True):
+                    weights.append(np.zeros(weights[0].shape[1], dtype=np.float32))
+                layers.append(("lstm", {
+                    "units": int(config["units"]),
+                    "return_sequences": bool(config.get("return_sequences", False)),
+                    "activation": config.get("activation", "tanh"),
+                    "recurrent_activation": config.get("recurrent_activation", "sigmoid"),
+                }, weights))
+            elif kind == "Dense":
+                if not config.get("use_bias", True):
+                    weights.append(np.zeros(weights[0].shape[1], dtype=np.float32))
+                layers.append(("dense", {"activation": config.get("activation", "linear")}, weights))
+            elif kind in ("Dropout", "InputLayer"):
+                continue
+            else:
+                raise ValueError(f"unsupported layer type '{kind}'")
+        exported = cls(layers)
+        if check is not None and len(check):
+            expected = model.predict(check, verbose=0)
+            diff = float(np.max(np.abs(exported.predict(check) - expected)))
+            if diff > atol:
+                raise ValueError(f"NumPy LSTM differs from Keras by {diff:.3g} (> {atol})")
+        return exported
+
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) <= self.batch_size:
+            return self._forward(X)
+        # bounded temporaries: (batch, time_step, 4 * units) per LSTM layer
+        return np.concatenate([self._forward(X[i:i + self.batch_size]) for i in range(0, len(X), self.batch_size)])
+
+    def _forward(self, out):
+        for kind, config, weights in self.layers:
+            if kind == "lstm":
+                out = self._lstm(out, config, *weights)
+            else:
+                kernel, bias = weights
+                out = _activation(config["activation"])(out @ kernel + bias)
+        return out
+
+    @staticmethod
+    def _lstm(X, config, kernel, recurrent_kernel, bias):
+        # Keras gate order: input, forget, cell candidate, output
+        units = config["units"]
+        act = _activation(config["activation"])
+        rec_act = _activation(config["recurrent_activation"])
+        batch, steps = X.shape[0], X.shape[1]
+        xw = X @ kernel + bias  # all input projections at once
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        seq = np.empty((batch, steps, units), dtype=np.float32) if config["return_sequences"] else None
+        for t in range(steps):
+            z = xw[:, t] + h @ recurrent_kernel
+            i = rec_act(z[:, :units])
+            f = rec_act(z[:, units:2 * units])
+            g = act(z[:, 2 * units:3 * units])
+            o = rec_act(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * act(c)
+            if seq is not None:
+                seq[:, t] = h
+        return seq if seq is not None else h
+
+    def save(self, path: str, **extra):
+        """Write the layers (and any extra arrays, e.g. scaler statistics) to one .npz file."""
+        arrays = {f"__w{n}_{k}": w for n, (_, _, weights) in enumerate(self.layers) for k, w in enumerate(weights)}
+        spec = [[kind, config, len(weights)] for kind, config, weights in self.layers]
+        np.savez(path, __layers__=np.array(json.dumps(spec)), **arrays, **extra)
+
+    @classmethod
+    def load(cls, path: str):
+        """Returns (model, extra arrays saved alongside it)."""
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data["__layers__"]))
+            layers = [
+                (kind, config, [data[f"__w{n}_{k}"] for k in range(count)])
+                for n, (kind, config, count) in enumerate(spec)
+            ]
+            extra = {k: data[k] for k in data.files if not k.startswith("__")}
+        return cls(layers), extra
@@ -0,0 +1,60 @@
+"""
+Payload encoders matching the ``decoder`` options of an AnomalySpec
+(runtime/decoders.py).
+
+A sample is a number, or a tuple with one number per attribute.
+encode() returns the messages that carry ``samples``: one JSON object per
+sample for json / fastjson / fields, a single message holding every sample
+for float32 and msgpack.
+"""
+import array
+import json
+import sys
+
+FORMATS = ("json", "fastjson", "fields", "float32", "msgpack")
+
+
+def encode_json(sample, attributes=("value",)) -> bytes:
+    """{"value": v}; a dotted attribute becomes nested objects ({"machine": {"rms": v}})."""
+    values = sample if isinstance(sample, (tuple, list)) else (sample,)
+    payload = {}
+    for attribute, value in zip(attributes, values):
+        *parents, leaf = attribute.split(".")
+        target = payload
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = value
+    return json.dumps(payload).encode()
+
+
+def _flatten(samples):
+    for sample in samples:
+        if isinstance(sample, (tuple, list)):
+            yield from sample
+        else:
+            yield sample
+
+
+def encode_float32(samples) -> bytes:
+    """Packed little-endian float32, one float per attribute for every sample."""
+    values = array.array("f", _flatten(samples))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_msgpack(samples) -> bytes:
+    """MessagePack array of samples (arrays of attribute values for several attributes)."""
+    import msgpack  # optional dependency, only needed for this format
+
+    return msgpack.packb([list(s) if isinstance(s, tuple) else s for s in samples])
+
+
+def encode(payload_format: str, samples, attributes=("value",)) -> list:
+    if payload_format in ("json", "fastjson", "fields"):
+        return [encode_json(sample, attributes) for sample in samples]
+    if payload_format == "float32":
+        return [encode_float32(samples)]
+    if payload_format == "msgpack":
+        return [encode_msgpack(samples)]
+    raise ValueError(f"unknown payload format '{payload_format}' (expected one of {', '.join(FORMATS)})")
@@ -0,0 +1,254 @@
+"""
+Publishes a CSV series to an MQTT broker, to feed or stress-test a pipeline.
+
+    python load_generator.py                                          # localhost:1883, 100 msg/s, JSON
+    python load_generator.py --rate 0 --format float32 --samples 100  # unthrottled, 100 samples per message
+    python load_generator.py --rate 5000 --burst 50                   # 5000 msg/s, sent in bursts of 50
+    python load_generator.py --topic "plant/{device}/temperature" --devices 200 --clients 4 --rate 20000 --loop
+    python load_generator.py --host <cluster>.hivemq.cloud --port 8883 --tls --username USER --password PASS
+    python load_generator.py --host mqtt.flespi.io --username API_TOKEN
+    python load_generator.py --host mqtt-dashboard.com --port 8884 --websockets --tls
+
+Every device topic receives the whole series. Devices are spread over
+``--clients`` connections, each publishing from its own thread. The rate
+is the total number of messages per second over all clients; 0 sends as
+fast as the client accepts them. Payloads are encoded before the run
+(publishers/encoders.py, matching the AnomalySpec ``decoder``), so the
+measured throughput is the client's and the broker's, not the encoder's.
+
+Throughput is reported every ``--report-every`` seconds and at the end.
+A message counts as published once paho reports it: written to the socket
+for QoS 0, acknowledged by the broker for QoS 1 and 2.
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from publishers.encoders import FORMATS, encode  # noqa: E402
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data.csv")
+
+
+def read_samples(path: str, attributes) -> list:
+    """
+    Values of ``path``: floats for one attribute, tuples for several. Columns
+    are matched by name when the file has a header row, otherwise the first
+    columns are used in order. Rows that do not hold numbers are skipped.
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    columns = list(range(len(attributes)))
+    if rows:
+        try:
+            float(rows[0][0])
+        except (ValueError, IndexError):
+            header = [name.strip() for name in rows.pop(0)]
+            if len(attributes) > 1 or attributes[0] in header:
+                missing = [a for a in attributes if a not in header]
+                if missing:
+                    raise SystemExit(f"{path}: no column named {', '.join(missing)}")
+                columns = [header.index(a) for a in attributes]
+    samples = []
+    for row in rows:
+        try:
+            values = tuple(float(row[c]) for c in columns)
+        except (ValueError, IndexError):
+            continue
+        samples.append(values[0] if len(values) == 1 else values)
+    return samples
+
+
+class PublisherThread(threading.Thread):
+    """One connection publishing every payload to its device topics, paced to ``rate`` messages/s."""
+
+    def __init__(self, index, args, topics, payloads, rate, stop):
+        super().__init__(name=f"publisher-{index}", daemon=True)
+        self.topics = topics
+        self.payloads = payloads
+        self.rate = rate
+        self.burst = max(args.burst, 1)
+        self.qos = args.qos
+        self.max_pending = args.max_pending
+        self.loop = args.loop
+        self.limit = args.count // args.clients if args.count else None
+        self.stop = stop
+        self.sent = self.published = self.failed = self.bytes = 0
+        self.last_published = None
+        self.connected = threading.Event()
+
+        if args.websockets:
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"{args.client_id}-{index}", transport="websockets")
+            self.client.ws_set_options(path=args.web_path)
+        else:
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"{args.client_id}-{index}")
+        if args.tls:
+            self.client.tls_set()
+            self.client.tls_insecure_set(args.insecure)
+        if args.username or args.password:
+            self.client.username_pw_set(args.username, args.password)
+        self.client.max_inflight_messages_set(args.max_inflight)
+        self.client.on_connect = lambda client, userdata, flags, reason, properties: self.connected.set()
+        self.client.on_publish = self._on_publish
+        self.client.connect(args.host, args.port, keepalive=60)
+        self.client.loop_start()
+
+    def _on_publish(self, client, userdata, mid, reason, properties):
+        # Called from the network thread; the counter has a single writer.
+        self.published += 1
+        self.last_published = time.perf_counter()
+
+    def messages(self):
+        series = itertools.cycle(self.payloads) if self.loop else self.payloads
+        for payload in series:
+            for topic in self.topics:
+                yield topic, payload
+
+    def run(self):
+        interval = self.burst / self.rate if self.rate else 0.0
+        next_tick = time.perf_counter()
+        in_burst = 0
+        for topic, payload in self.messages():
+            if self.stop.is_set() or (self.limit is not None and self.sent >= self.limit):
+                break
+            while self.sent - self.published >= self.max_pending and not self.stop.is_set():
+                time.sleep(0.0005)  # client queue full: wait for the broker
+            info = self.client.publish(topic, payload, qos=self.qos)
+            if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                self.failed += 1
+                continue
+            self.sent += 1
+            self.bytes += len(payload)
+            if not interval:
+                continue
+            in_burst += 1
+            if in_burst >= self.burst:
+                in_burst = 0
+                next_tick += interval
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -1.0:
+                    next_tick = time.perf_counter()  # more than a second behind: do not try to catch up
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def report(threads, started, samples_per_message):
+    now = time.perf_counter()
+    sent = sum(t.sent for t in threads)
+    published = sum(t.published for t in threads)
+    elapsed = max(now - started, 1e-9)
+    return (f"{elapsed:7.1f}s  sent {sent} ({sent / elapsed:.0f} msg/s)  "
+            f"published {published} ({published / elapsed:.0f} msg/s, {published * samples_per_message / elapsed:.0f} samples/s)  "
+            f"pending {sent - published}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a CSV series to MQTT at a controlled rate and report the throughput.")
+    broker = parser.add_argument_group("broker")
+    broker.add_argument("--host", default="localhost")
+    broker.add_argument("--port", type=int, default=1883)
+    broker.add_argument("--tls", action="store_true", help="connect over TLS")
+    broker.add_argument("--insecure", action="store_true", help="do not verify the broker certificate")
+    broker.add_argument("--websockets", action="store_true", help="MQTT over websockets")
+    broker.add_argument("--web-path", default="/mqtt", help="websocket path (default: /mqtt)")
+    broker.add_argument("--username", default="", help="user name, or the API token for flespi")
+    broker.add_argument("--password", default="")
+    broker.add_argument("--client-id", default=f"loadgen-{os.getpid()}", help="client id prefix")
+
+    data = parser.add_argument_group("payloads")
+    data.add_argument("--csv", default=DEFAULT_CSV, help="series to publish (default: data.csv)")
+    data.add_argument("--attribute", default="value", help="comma-separated attributes (JSON fields and CSV columns)")
+    data.add_argument("--format", choices=FORMATS, default="json", help="payload layout, as the spec's decoder")
+    data.add_argument("--samples", type=int, default=1, help="samples per message (float32 and msgpack)")
+    data.add_argument("--topic", default="machine/temperature", help="topic; '{device}' is replaced by the device number")
+    data.add_argument("--devices", type=int, default=1, help="device topics, each receiving the whole series")
+
+    load = parser.add_argument_group("load")
+    load.add_argument("--rate", type=float, default=100, help="messages per second over all clients (0: unthrottled)")
+    load.add_argument("--burst", type=int, default=1, help="messages sent back to back before pausing")
+    load.add_argument("--count", type=int, default=0, help="stop after this many messages (0: the whole series)")
+    load.add_argument("--duration", type=float, default=0, help="stop after this many seconds")
+    load.add_argument("--loop", action="store_true", help="repeat the series until --count or --duration")
+    load.add_argument("--clients", type=int, default=1, help="concurrent connections")
+    load.add_argument("--qos", type=int, choices=(0, 1, 2), default=0)
+    load.add_argument("--max-inflight", type=int, default=20, help="unacknowledged QoS 1/2 messages per connection")
+    load.add_argument("--max-pending", type=int, default=10000, help="messages queued in a client before the sender waits")
+    load.add_argument("--report-every", type=float, default=5, help="seconds between reports (0: only at the end)")
+    load.add_argument("--wait", type=float, default=10, help="seconds to wait for pending messages at the end")
+    args = parser.parse_args(argv)
+
+    attributes = tuple(a.strip() for a in args.attribute.split(","))
+    if args.devices > 1 and "{device}" not in args.topic:
+        parser.error("--devices needs a '{device}' placeholder in --topic")
+    if args.samples > 1 and args.format not in ("float32", "msgpack"):
+        parser.error("--samples > 1 needs --format float32 or msgpack")
+    if args.loop and not (args.count or args.duration):
+        parser.error("--loop needs --count or --duration")
+    args.clients = max(1, min(args.clients, args.devices))
+
+    samples = read_samples(args.csv, attributes)
+    payloads = [p for i in range(0, len(samples), args.samples) for p in encode(args.format, samples[i:i + args.samples], attributes)]
+    topics = [args.topic.format(device=d) for d in range(args.devices)]
+    print(f"{len(payloads)} {args.format} messages of {args.samples} sample(s) to {len(topics)} topic(s) "
+          f"on {args.host}:{args.port}, {args.clients} client(s), qos {args.qos}, "
+          f"{'unthrottled' if not args.rate else f'{args.rate:g} msg/s'}")
+
+    stop = threading.Event()
+    threads = [
+        PublisherThread(i, args, topics[i::args.clients], payloads, args.rate / args.clients, stop)
+        for i in range(args.clients)
+    ]
+    for t in threads:
+        if not t.connected.wait(10):
+            raise SystemExit(f"could not connect to {args.host}:{args.port}")
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    try:
+        next_report = started + args.report_every if args.report_every else None
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.1)
+            now = time.perf_counter()
+            if args.duration and now - started >= args.duration:
+                stop.set()
+            if next_report is not None and now >= next_report:
+                print(report(threads, started, args.samples))
+                next_report += args.report_every
+    except KeyboardInterrupt:
+        stop.set()
+    for t in threads:
+        t.join()
+    sending = time.perf_counter() - started
+
+    deadline = time.perf_counter() + args.wait
+    while any(t.sent > t.published for t in threads) and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    for t in threads:
+        t.close()
+
+    sent = sum(t.sent for t in threads)
+    published = sum(t.published for t in threads)
+    failed = sum(t.failed for t in threads)
+    finished = max((t.last_published for t in threads if t.last_published), default=started)
+    elapsed = max(finished - started, sending, 1e-9)
+    size = sum(t.bytes for t in threads)
+    print(f"sent {sent} messages ({size / 1e6:.1f} MB) in {sending:.2f}s: {sent / max(sending, 1e-9):.0f} msg/s")
+    print(f"published {published} in {elapsed:.2f}s: {published / elapsed:.0f} msg/s, "
+          f"{published * args.samples / elapsed:.0f} samples/s"
+          + (f", {failed} failed" if failed else "") + (f", {sent - published} unconfirmed" if sent > published else ""))
+    return 0 if published == sent and not failed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,409 @@
+"""
+asyncio runtime of generated pipelines (generate_pipeline.py --runtime asyncio).
+
+Broker connections, spec consumers, MQTT batch timers and Redis pushes all
+run on one event loop, without network threads:
+
+    AsyncMqttClient --dispatch()--> spec inbox --consume()--> score --> outputs
+
+Backpressure is carried back to the broker at every step: consume() waits
+for the MQTT clients and Redis sinks a spec writes to (``drain()``) before
+taking the next group of messages; dispatch() waits while a spec inbox is
+full (overflow "block"); and a client stops reading from its socket while
+its received messages are not dispatched.
+
+A pipeline run by consume() provides ``inbox`` (Inbox), ``executor`` (None
+to score on the event loop), ``outputs`` (objects with an async drain()),
+``score_payloads(messages)`` and ``score_runs(runs)``, which return
+(key, vals, scores, flags) tuples, and ``emit_runs(results)``;
+AsyncSpecPipeline is the one generated scripts subclass.
+"""
+import asyncio
+import time
+from collections import deque
+
+import paho.mqtt.client as mqtt
+
+from .engine import SpecPipeline
+from .ingest import OVERFLOW_POLICIES
+from .mqtt_publisher import MqttPublisher
+from .routing import make_mqtt_client
+
+DEFAULT_INBOX_SIZE = 10_000
+# Without an ingest block a consumer takes what is queued, up to this many
+# messages, without waiting for more.
+DEFAULT_BATCH_SIZE = 256
+
+
+class AsyncMqttClient:
+    """
+    paho client for one Broker<MQTT> block, driven by the running event loop.
+
+    Received messages wait until get() takes them; reading from the socket
+    pauses while ``max_messages`` are waiting. publish() returns paho's
+    MQTTMessageInfo, and drain() waits until at most ``max_pending``
+    published messages are still unsent (QoS 0) or unacknowledged (QoS 1/2).
+    The connection is re-established when it drops, and the subscriptions
+    are renewed on every connect.
+    """
+    def __init__(self, host: str, port: int, ssl: bool = False, web_path: str = "", username: str = "",
+                 password: str | None = None, max_inflight: int | None = None, queue_size: int | None = None,
+                 max_messages: int = 1000, max_pending: int | None = None):
+        self.host = host
+        self.port = port
+        self.max_messages = max(int(max_messages), 1)
+        self.max_pending = int(max_pending) if max_pending else max((queue_size or 0) // 2, 1000)
+        self.topics: list = []
+        self.pending = 0  # published messages not yet written or acknowledged
+        self.client = make_mqtt_client(ssl, web_path, username, password, max_inflight=max_inflight, queue_size=queue_size)
+        self.client.on_connect = self._on_connect
+        self.client.on_message = self._on_message
+        self.client.on_publish = self._on_publish
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+        self._messages = deque()
+        self._loop = None
+        self._sock = None
+        self._paused = False
+        self._closing = False
+        self._misc = None
+        self._received = None  # asyncio.Events, created on the loop
+        self._drained = None
+
+    async def connect(self):
+        self._loop = asyncio.get_running_loop()
+        self._received = asyncio.Event()
+        self._drained = asyncio.Event()
+        # The TCP (and TLS) handshake blocks, as it does in the threaded runtime.
+        self.client.connect(self.host, self.port)
+        self._misc = self._loop.create_task(self._run_misc())
+
+    def subscribe(self, topic: str):
+        if topic not in self.topics:
+            self.topics.append(topic)
+            if self.client.is_connected():
+                self.client.subscribe(topic)
+
+    def publish(self, topic: str, payload, qos: int = 0, retain: bool = False):
+        info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.pending += 1
+        return info
+
+    async def get(self) -> tuple:
+        """Next received (topic, payload)."""
+        while not self._messages:
+            self._received.clear()
+            await self._received.wait()
+        message = self._messages.popleft()
+        if self._paused and len(self._messages) <= self.max_messages // 2:
+            self._resume()
+        return message
+
+    async def drain(self, limit: int | None = None):
+        """Wait until at most ``limit`` (default max_pending) published messages are outstanding."""
+        limit = self.max_pending if limit is None else limit
+        while self.pending > limit:
+            self._drained.clear()
+            await self._drained.wait()
+
+    async def close(self, timeout: float = 5.0):
+        """Wait (up to ``timeout`` seconds) for what was published, then disconnect."""
+        if self._loop is None:
+            return
+        try:
+            await asyncio.wait_for(self.drain(0), timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.pending} messages to {self.host}:{self.port} were not confirmed")
+        self._closing = True
+        self.client.disconnect()
+        deadline = time.monotonic() + timeout
+        while self._sock is not None and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)  # lets the writer send DISCONNECT
+        if self._misc is not None:
+            self._misc.cancel()
+
+    def _read(self):
+        self.client.loop_read()
+        # TLS and websocket transports can hold data the selector does not see.
+        pending = getattr(self._sock, "pending", None)
+        if pending is not None and not self._paused and pending():
+            self._loop.call_soon(self._read)
+
+    def _write(self):
+        self.client.loop_write()
+
+    def _pause(self):
+        self._paused = True
+        if self._sock is not None:
+            self._loop.remove_reader(self._sock)
+
+    def _resume(self):
+        self._paused = False
+        if self._sock is not None:
+            self._loop.add_reader(self._sock, self._read)
+            self._loop.call_soon(self._read)
+
+    async def _run_misc(self):
+        # Keepalive pings, retries and reconnects, as paho's own loop does.
+        delay = 1.0
+        while not self._closing:
+            if self.client.loop_misc() == mqtt.MQTT_ERR_NO_CONN and not self._closing:
+                try:
+                    self.client.reconnect()
+                    delay = 1.0
+                except OSError as e:
+                    print(f"Reconnecting to {self.host}:{self.port} failed: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60.0)
+                    continue
+            await asyncio.sleep(1.0)
+
+    def _on_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            print(f"Connection to {self.host}:{self.port} refused: {mqtt.connack_string(rc)}")
+            return
+        # Unwritten QoS 0 messages are lost with the old connection; QoS 1/2 ones are resent.
+        self.pending = 0
+        self._drained.set()
+        for topic in self.topics:
+            client.subscribe(topic)
+
+    def _on_message(self, client, userdata, message):
+        self._messages.append((message.topic, message.payload))
+        self._received.set()
+        if len(self._messages) >= self.max_messages and not self._paused:
+            self._pause()
+
+    def _on_publish(self, client, userdata, mid):
+        if self.pending:
+            self.pending -= 1
+        if self.pending <= self.max_pending:
+            self._drained.set()
+
+    def _on_socket_open(self, client, userdata, sock):
+        self._sock = sock
+        if not self._paused:
+            self._loop.add_reader(sock, self._read)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self._loop.remove_reader(sock)
+        self._loop.remove_writer(sock)
+        self._sock = None
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self._loop.add_writer(sock, self._write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self._loop.remove_writer(sock)
+
+
+class LoopPublisher(MqttPublisher):
+    """MqttPublisher whose flush_ms timer is a task on the event loop, like the client it publishes on."""
+
+    def _start_timer(self):
+        self._timer = asyncio.get_running_loop().create_task(self._run_timer_task())
+
+    async def _run_timer_task(self):
+        while not self._stop.is_set():
+            await asyncio.sleep(self.flush_interval)
+            with self._lock:
+                if self._pending and self._interval_elapsed():
+                    self._flush_locked()
+
+
+class Inbox:
+    """
+    asyncio counterpart of runtime.ingest.BoundedQueue: a FIFO of received
+    (topic, payload) pairs with the same overflow policies and stats().
+    With "block", put() waits until the consumer frees a slot.
+    """
+    def __init__(self, maxsize: int | None = None, overflow: str = "block"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.maxsize = int(maxsize) if maxsize else DEFAULT_INBOX_SIZE
+        self.overflow = overflow
+        self._items = deque()
+        self._closed = False
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self.enqueued = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    async def put(self, item) -> bool:
+        """Queue ``item``; returns False if it was dropped or the inbox is closed."""
+        while len(self._items) >= self.maxsize and not self._closed:
+            if self.overflow == "drop_newest":
+                self.dropped_newest += 1
+                return False
+            if self.overflow == "drop_oldest":
+                self._items.popleft()
+                self.dropped_oldest += 1
+                break
+            self._not_full.clear()
+            await self._not_full.wait()
+        if self._closed:
+            return False
+        self._items.append(item)
+        self.enqueued += 1
+        self._not_empty.set()
+        return True
+
+    async def get_batch(self, max_items: int = 1, max_wait: float | None = None) -> list:
+        """
+        Wait for at least one item, then take what is queued, up to
+        ``max_items``; with ``max_wait`` keep collecting for at most that many
+        seconds after the first one. Returns [] once closed and drained.
+        """
+        while not self._items and not self._closed:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        if max_wait and len(self._items) < max_items:
+            deadline = time.monotonic() + max_wait
+            while len(self._items) < max_items and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._not_empty.clear()
+                try:
+                    await asyncio.wait_for(self._not_empty.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+        n = min(max_items, len(self._items))
+        batch = [self._items.popleft() for _ in range(n)]
+        self._not_full.set()
+        return batch
+
+    def close(self):
+        self._closed = True
+        self._not_empty.set()
+        self._not_full.set()
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped_oldest": self.dropped_oldest,
+            "dropped_newest": self.dropped_newest,
+        }
+
+
+async def dispatch(client: AsyncMqttClient, router, on_error=None):
+    """
+    Hand every message of ``client`` to the handlers ``router`` maps its
+    topic to. A handler returning a coroutine (a spec's receive) is awaited,
+    so a full inbox holds back the whole connection.
+    """
+    while True:
+        topic, payload = await client.get()
+        for handle in router.route(topic):
+            try:
+                pending = handle(topic, payload)
+                if pending is not None:
+                    await pending
+            except Exception as e:
+                if on_error is not None:
+                    on_error(e)
+                print(f"Error handling message: {e}")
+
+
+async def _score(pipeline, score, arg):
+    if pipeline.executor is None:
+        return score(arg)
+    return await asyncio.get_running_loop().run_in_executor(pipeline.executor, score, arg)
+
+
+async def _emit(pipeline, results):
+    pipeline.emit_runs(results)
+    for output in pipeline.outputs:
+        await output.drain()
+
+
+async def consume(pipeline, batch_size: int | None = None, max_latency_ms: int | None = None):
+    """Score ``pipeline.inbox`` in groups of up to ``batch_size`` messages until it is closed and empty."""
+    batch_size = max(int(batch_size or DEFAULT_BATCH_SIZE), 1)
+    max_wait = max_latency_ms / 1000.0 if max_latency_ms else None
+    while True:
+        messages = await pipeline.inbox.get_batch(batch_size, max_wait)
+        if not messages:
+            return
+        await _emit(pipeline, await _score(pipeline, pipeline.score_payloads, messages))
+
+
+class AsyncSpecPipeline(SpecPipeline):
+    """
+    SpecPipeline of the asyncio runtime: receive() queues payloads in
+    ``inbox`` and run() scores them with consume(), on the event loop or in
+    ``executor``. ``outputs`` are the clients and Redis sinks consume()
+    drains after every group. Shards are not supported.
+    """
+    publisher_class = LoopPublisher
+    queue_consumer = "the consumer task"
+
+    def __init__(self, spec: dict, resources, metrics=None, print_every: int | None = None, executor=None):
+        super().__init__(spec, resources, metrics, print_every)
+        self.executor = executor
+        outputs = [resources.mqtt_clients[out["broker"]["name"]] for out in (spec["output"], spec["alerts"]) if out["type"] == "mqtt"]
+        self.outputs = list(dict.fromkeys(outputs)) + ([self.redis_sink] if self.redis_sink is not None else [])
+
+    def _build_ingest(self, spec):
+        # Received payloads wait here for this spec's consumer task.
+        queue = spec["queue"] or {}
+        self.inbox = self.ingest_queue = Inbox(maxsize=queue.get("size"), overflow=queue.get("overflow", "block"))
+
+    async def receive(self, topic, payload):
+        if self.metrics is not None:
+            self.m_messages.inc()
+        await self.inbox.put((topic, payload))
+
+    def score_payloads(self, messages):
+        """Decode and score received (topic, payload) pairs; returns (key, vals, scores, flags) per run of one key."""
+        return self.score_runs(self.decode_runs(messages))
+
+    def score_runs(self, runs):
+        """Score (key, values) runs; called on the event loop or in the executor."""
+        results = []
+        for key, values in runs:
+            try:
+                results.append((key, *self.score(values, key)))
+            except Exception as e:
+                self._error(e, "score")
+        return results
+
+    def emit_runs(self, results):
+        """Write scored runs to the outputs; always called on the event loop."""
+        for key, vals, scores, flags in results:
+            try:
+                self.emit_results(vals, scores, flags, key)
+            except Exception as e:
+                self._error(e, "emit")
+
+    async def run(self):
+        """Score the inbox until it is closed; replay goes through ReplayTarget."""
+        ingest = self.spec["ingest"] or {}
+        await consume(self, batch_size=ingest.get("batch_size"), max_latency_ms=ingest.get("max_latency_ms"))
+
+
+class ReplayTarget:
+    """
+    A pipeline as seen by runtime.replay.replay_file running in a worker
+    thread: every chunk is scored and written on the event loop, and the
+    replay waits for it (and for the outputs to drain) before reading on.
+    """
+    def __init__(self, pipeline, loop):
+        self.pipeline = pipeline
+        self.attributes = pipeline.attributes
+        self.loop = loop
+
+    async def _replay(self, values, key):
+        await _emit(self.pipeline, await _score(self.pipeline, self.pipeline.score_runs, [(key, values)]))
+
+    def replay(self, values, key=None):
+        asyncio.run_coroutine_threadsafe(self._replay(values, key), self.loop).result()
@@ -0,0 +1,82 @@
+import os
+import pickle
+import threading
+import time
+
+CHECKPOINT_FORMAT = 1
+
+
+class Checkpointer:
+    """
+    Periodically snapshots the detector state of all pipelines into one file.
+
+    Every pipeline exposes ``state_version`` (a fingerprint of its model
+    configuration), ``snapshot_state()`` -> {key: pickled detector} and
+    ``restore_state(states)``. A snapshot is pickled to a temporary file,
+    fsynced and renamed over ``path``, so the file on disk is always a
+    complete checkpoint. On restore, state is only applied to pipelines
+    whose name and ``state_version`` match, so a changed model starts fresh.
+
+    Checkpoints are pickles: only load files written by this pipeline.
+    """
+    def __init__(self, path: str, interval_s: float, pipelines: dict):
+        self.path = path
+        self.interval = float(interval_s)
+        self.pipelines = pipelines
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def restore(self) -> list:
+        """Load the checkpoint (if any) into the pipelines; returns the restored spec names."""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            data = pickle.load(f)
+        if data.get("format") != CHECKPOINT_FORMAT:
+            print(f"Ignoring checkpoint '{self.path}': unsupported format {data.get('format')}")
+            return []
+        restored = []
+        for name, entry in data.get("specs", {}).items():
+            pipeline = self.pipelines.get(name)
+            if pipeline is None:
+                continue
+            if entry.get("version") != pipeline.state_version:
+                print(f"Checkpoint of '{name}' was taken with a different model configuration; starting fresh.")
+                continue
+            pipeline.restore_state(entry["states"])
+            restored.append(name)
+        return restored
+
+    def save(self):
+        with self._lock:
+            specs = {
+                name: {"version": p.state_version, "states": p.snapshot_state()}
+                for name, p in self.pipelines.items()
+            }
+            data = {"format": CHECKPOINT_FORMAT, "saved_at": time.time(), "specs": specs}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Error writing checkpoint: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="checkpointer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop periodic snapshots; call ``save()`` once the pipelines are drained."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,59 @@
+from time import perf_counter
+
+from adapters.universal_adapter import UniversalAdapter
+from models.CUSTOM_MODEL import CUSTOM_Detector
+
+
+class CustomDetector:
+    """
+    Model state of one stream scored by models/CUSTOM_MODEL.py, fed through
+    a UniversalAdapter (``batch_size`` points per handleBatch call).
+
+    The ``training`` parameter (sync or background) is applied to models that
+    have a ``train_in_background`` attribute, like the LSTM example.
+    set_threshold(q) changes the percentile of the training error used as
+    decision threshold; it applies from the next (re)training of the model.
+    A subclass that sets ``stages`` (see MetricsRegistry.stages) times each
+    handleBatch call as its score stage.
+    """
+    __slots__ = ("cnt", "threshold", "start_index", "preproc_instance", "anomaly_model", "adapter")
+    stages = None
+
+    def __init__(self, config):
+        self.cnt = 0
+        self.threshold = config["threshold"]
+        self.start_index = config["start_index"]
+        self.preproc_instance = None  # CUSTOM detectors scale their input themselves
+        batch_size = config["params"].get("batch_size")
+        if batch_size:
+            self.anomaly_model = CUSTOM_Detector(batch_size=batch_size, start_index=self.start_index, threshold=self.threshold)
+            self.adapter = UniversalAdapter(self.anomaly_model, batch_size=batch_size)
+        else:
+            self.anomaly_model = CUSTOM_Detector(start_index=self.start_index, threshold=self.threshold)
+            self.adapter = UniversalAdapter(self.anomaly_model)
+        if hasattr(self.anomaly_model, "train_in_background"):
+            self.anomaly_model.train_in_background = config["params"].get("training") == "background"
+
+    def set_threshold(self, threshold):
+        self.threshold = threshold
+        self.anomaly_model.threshold_percentile = threshold
+
+    def score_values(self, values):
+        """Score values in arrival order; returns the points that produced output."""
+        out_vals, out_scores, out_flags = [], [], []
+        self.cnt += len(values)
+        for x_val in values:
+            t0 = perf_counter()
+            vals, scores, flags = self.adapter.feed(x_val)
+            if vals is None:
+                continue
+            if self.stages is not None:
+                self.stages.score.observe(perf_counter() - t0)  # one handleBatch call
+            out_vals.extend(vals)
+            out_scores.extend(scores)
+            out_flags.extend(flags)
+        return out_vals, out_scores, out_flags
+
+    def flush(self):
+        """Score whatever the model still buffers."""
+        return self.adapter.flush()
@@ -0,0 +1,101 @@
+"""
+Payload decoders: the ``decoder`` of an AnomalySpec.
+
+    json      one JSON object per message (default), parsed with the standard library
+    fastjson  the same, parsed with orjson when it is installed (no UTF-8 decode step)
+    fields    top-level numeric fields read from the raw JSON bytes by precompiled
+              patterns, without building the payload dict (flat payloads only)
+    float32   packed little-endian float32 samples, many per message
+    msgpack   a MessagePack array of samples, many per message
+
+For several attributes a float32 message holds one float per attribute
+for every sample (sample-major), and a msgpack message holds one array of
+attribute values per sample. publishers/encoders.py writes all formats.
+"""
+import array
+import json
+import re
+import sys
+
+from .fields import compile_extractor
+
+DECODERS = ("json", "fastjson", "fields", "float32", "msgpack")
+# Decoders whose messages carry several samples (decode returns a list).
+BATCHED_DECODERS = ("float32", "msgpack")
+
+try:
+    from orjson import loads as fast_loads
+except ImportError:  # orjson is optional; the standard parser reads bytes as well
+    fast_loads = json.loads
+
+_NUMBER = rb"(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)"
+
+
+def field_pattern(attribute: str):
+    """Compiled pattern capturing the JSON number of the top-level field ``attribute``."""
+    if "." in attribute:
+        raise ValueError(f"decoder 'fields' reads top-level attributes only, not '{attribute}'")
+    return re.compile(rb'"' + re.escape(json.dumps(attribute)[1:-1].encode()) + rb'"\s*:\s*' + _NUMBER)
+
+
+def read_field(pattern, raw) -> float:
+    found = pattern.search(raw)
+    if found is None:
+        raise ValueError(f"no numeric field matching {pattern.pattern!r}")
+    return float(found.group(1))
+
+
+def unpack_float32(raw) -> list:
+    """Floats of a packed little-endian float32 payload."""
+    values = array.array("f")
+    values.frombytes(raw)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def group_features(values, attributes) -> list:
+    """Split sample-major ``values`` into {attribute: float} feature dicts."""
+    width = len(attributes)
+    if len(values) % width:
+        raise ValueError(f"payload holds {len(values)} values, not a multiple of {width} attributes")
+    rows = [iter(values)] * width
+    return [dict(zip(attributes, sample)) for sample in zip(*rows)]
+
+
+def make_decoder(decoder: str, attributes):
+    """
+    Returns (decode, batched). ``decode(raw)`` turns a message payload into
+    one value (a float, or a feature dict for several attributes), or into
+    a list of values when ``batched``.
+    """
+    attributes = tuple(attributes)
+    if decoder in ("json", "fastjson"):
+        extract = compile_extractor(attributes)
+        if decoder == "json":
+            return (lambda raw: extract(json.loads(raw.decode()))), False
+        return (lambda raw: extract(fast_loads(raw))), False
+    if decoder == "fields":
+        patterns = tuple((attribute, field_pattern(attribute)) for attribute in attributes)
+        if len(patterns) == 1:
+            pattern = patterns[0][1]
+            return (lambda raw: read_field(pattern, raw)), False
+        return (lambda raw: {attribute: read_field(pattern, raw) for attribute, pattern in patterns}), False
+    if decoder == "float32":
+        if len(attributes) == 1:
+            return unpack_float32, True
+        return (lambda raw: group_features(unpack_float32(raw), attributes)), True
+    if decoder == "msgpack":
+        try:
+            import msgpack
+        except ImportError:
+            raise ImportError("decoder 'msgpack' needs the msgpack package (pip install msgpack)") from None
+        if len(attributes) == 1:
+            def decode(raw):
+                samples = msgpack.unpackb(raw)
+                return [float(v) for v in samples] if isinstance(samples, list) else [float(samples)]
+        else:
+            def decode(raw):
+                return group_features([float(v) for sample in msgpack.unpackb(raw) for v in sample], attributes)
+        return decode, True
+    raise ValueError(f"unknown decoder '{decoder}' (expected one of {', '.join(DECODERS)})")
@@ -0,0 +1,75 @@
+"""
+Detector classes of the DSL models and their constructor config.
+
+Shared by generate_pipeline.py (generated pipelines import the classes
+named here) and runtime.engine. Importing this module does not load River.
+"""
+import importlib
+
+# Detector class per model, imported on first use (River is only loaded for River models).
+DETECTORS = {
+    "StandardAbsoluteDeviation": ("runtime.river_detectors", "QuantileDetector"),
+    "GaussianScorer": ("runtime.river_detectors", "QuantileDetector"),
+    "OneClassSVM": ("runtime.river_detectors", "FilteredDetector"),
+    "HalfSpaceTrees": ("runtime.river_detectors", "FilteredDetector"),
+    "SNARIMAX": ("runtime.river_detectors", "ForecastDetector"),
+    "CUSTOM": ("runtime.custom_detector", "CustomDetector"),
+}
+# Specs with several attributes score feature dicts (only models in generate_pipeline.MULTIVARIATE_MODELS).
+MULTIVARIATE_DETECTORS = {
+    "OneClassSVM": ("runtime.river_detectors", "FeatureDictDetector"),
+    "HalfSpaceTrees": ("runtime.river_detectors", "FeatureDictDetector"),
+}
+
+
+def detector_path(model_name: str, features: int = 1) -> tuple:
+    """(module, class name) of the detector that scores ``model_name`` over ``features`` attributes."""
+    try:
+        return (DETECTORS if features == 1 else MULTIVARIATE_DETECTORS)[model_name]
+    except KeyError:
+        raise ValueError(f"Unsupported model: {model_name}" + ("" if features == 1 else " with several attributes")) from None
+
+
+def detector_class(model_name: str, features: int = 1):
+    module, name = detector_path(model_name, features)
+    return getattr(importlib.import_module(module), name)
+
+
+def model_params(model) -> dict:
+    """Model parameters of a parsed ``model`` block, with their defaults filled in."""
+    name = type(model).__name__
+    if name == "GaussianScorer":
+        return {"model": name, "window_size": model.window_size if model.window_size is not None else 100}
+    if name == "OneClassSVM":
+        return {"model": name, "nu": model.nu or 0.1}
+    if name == "HalfSpaceTrees":
+        return {
+            "model": name, "n_trees": model.n_trees or 25, "height": model.height or 15,
+            "window_size": model.window_size or 250, "seed": model.seed or 42
+        }
+    if name == "SNARIMAX":
+        return {
+            "model": name, "p": model.p or 1, "d": model.d or 0, "q": model.q or 1, "m": model.m or 1,
+            "sd": model.sd or 0,
+            "learning_rate": model.learning_rate if model.learning_rate is not None else 0.005,
+            "regressor": model.regressor if model.regressor is not None else "LinearRegression"
+        }
+    if name == "CUSTOM":
+        return {"model": name, "batch_size": model.batch_size or None, "training": model.training or "sync"}
+    return {"model": name}
+
+
+def detector_config(spec: dict, retune_threshold: bool = False) -> dict:
+    """
+    Constructor argument of the detector classes for a spec of the
+    generate_pipeline context. With ``retune_threshold`` River detectors keep
+    their warm-up scores so that set_threshold() can be applied later.
+    """
+    return {
+        "model": spec["model_name"],
+        "params": model_params(spec["model"]),
+        "preprocessor": spec["preprocessor_method"],
+        "threshold": spec["profile"]["threshold"],
+        "start_index": spec["profile"]["start_index"],
+        "retune_threshold": retune_threshold,
+    }
@@ -0,0 +1,807 @@
+"""
+Runs an AnomalyDSL specification directly, without generating a script.
+
+The .anomaly file is parsed into the same context generate_pipeline.py
+renders the Jinja template from; every AnomalySpec becomes a SpecPipeline
+built from the runtime classes (detectors, sinks, ingest, keyed state,
+shards). With --watch the file is polled and a changed specification is
+applied in place: detector state is carried over when only outputs,
+thresholds or ingest settings changed, and only specs whose model changed
+start fresh.
+
+    python -m runtime.engine spec.anomaly [--watch 2] [--replay [CSV]] [--topic T]
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from .checkpoint import Checkpointer
+from .evaluation import StreamingEvaluator
+from .decoders import make_decoder
+from .detectors import detector_class, detector_config, model_params
+from .ingest import BoundedQueue, MicroBatcher, ScoringWorker
+from .keyed import KeyedStore, topic_key_extractor
+from .mqtt_publisher import MqttPublisher
+from .routing import TopicRouter, make_mqtt_client
+from .sharding import ShardedScorer
+from .sinks import MqttSink, make_sink
+from .writers import LineWriter
+
+def _digest(value) -> str:
+    return hashlib.sha1(repr(value).encode()).hexdigest()[:16]
+
+
+def state_version(spec: dict) -> str:
+    # Everything that shapes the learned state except the threshold, which
+    # detectors can adopt without relearning (see set_threshold).
+    config = detector_config(spec)
+    attributes = spec["attributes"]
+    return "engine-" + _digest((
+        config["model"], spec["detector"], sorted(config["params"].items()), config["preprocessor"],
+        config["start_index"], attributes[0] if len(attributes) == 1 else tuple(attributes), spec["keyed"] is not None
+    ))
+
+
+def spec_fingerprint(spec: dict) -> str:
+    return _digest((sorted((k, repr(v)) for k, v in spec.items() if k != "model"), model_params(spec["model"])))
+
+
+def load_context(path: str) -> dict:
+    """Parse ``path`` into the context generate_pipeline renders its template from."""
+    # Grammar and parsing rules are shared with the code generator.
+    from generate_pipeline import build_context, get_metamodel
+
+    return build_context(get_metamodel().model_from_file(path))
+
+
+class SpecPipeline:
+    """
+    Decodes the payloads of one AnomalySpec, scores them and writes the
+    results to its sinks, with the ingest, queue, keyed and sharded modes of
+    the DSL. The engine builds one per spec of the parsed context; generated
+    scripts subclass it with the spec as a literal, their ``detector_class``
+    (the detector subclass carrying the spec's config) and ``state_version``.
+    """
+    echo = True  # print every scored value (disabled during replay)
+    detector_class = None
+    publisher_class = MqttPublisher  # of MQTT outputs
+    queue_consumer = "the scoring thread"
+
+    def __init__(self, spec: dict, resources, metrics=None, print_every: int | None = None):
+        self.spec = spec
+        self.name = spec["name"]
+        self.topic = spec["topic"]
+        self.attributes = tuple(spec["attributes"])
+        self.decode_value, self.batched = make_decoder(spec["decoder"], self.attributes)
+        self.keyed = spec["keyed"] is not None
+        if self.detector_class is None:
+            self.config = detector_config(spec, retune_threshold=True)
+            self.state_version = state_version(spec)
+            self.fingerprint = spec_fingerprint(spec)
+            self.make_detector = functools.partial(detector_class(spec["model_name"], len(self.attributes)), self.config)
+        else:
+            self.config = self.detector_class.config
+            self.make_detector = self.detector_class
+        self.state_lock = threading.RLock()
+
+        ingest = spec["ingest"] or {}
+        keyed = spec["keyed"] or {}
+        self.sharder = self.detectors = self.detector = None
+        self.ingest_queue = self.scoring_worker = self.batcher = None
+        if self.keyed:
+            self.topic_key = topic_key_extractor(self.topic)
+        if spec["shards"]:
+            # Models live in worker processes; this process only routes and emits.
+            self.sharder = ShardedScorer(
+                self.make_detector,
+                self.decode_value,
+                self.emit_results,
+                shards=spec["shards"],
+                key_of=self.topic_key if self.keyed else None,
+                batched=self.batched,
+                batch_size=ingest.get("batch_size") or 1,
+                max_latency_ms=ingest.get("max_latency_ms"),
+                max_keys=keyed.get("max_keys"),
+                idle_ttl=keyed.get("idle_ttl")
+            )
+        elif self.keyed:
+            self.detectors = KeyedStore(
+                self.make_detector, max_keys=keyed["max_keys"], idle_ttl=keyed["idle_ttl"], on_evict=self.flush_detector
+            )
+        else:
+            self.detector = self.make_detector()
+
+        self.score_sink = make_sink(
+            spec["output"], "score", self.keyed, resources.file_writers, resources.mqtt_clients, self.publisher_class
+        )
+        self.alert_sink = make_sink(
+            spec["alerts"], "anomaly", self.keyed, resources.file_writers, resources.mqtt_clients, self.publisher_class
+        )
+        self.redis_sink = resources.redis_sinks[spec["redis"]["name"]] if spec["redis"] else None
+        self._build_ingest(spec)
+
+        self.evaluator = None  # StreamingEvaluator, on the spec named by the Evaluation block
+
+        # Without a Metrics block (metrics None) every scored value is printed.
+        self.metrics = metrics
+        self.print_every = print_every if metrics is not None else None
+        self.printed = 0
+        if metrics is not None:
+            self._register_metrics(metrics)
+
+    def _build_ingest(self, spec):
+        # Received payloads wait for a scoring thread, or are grouped by a micro-batcher.
+        ingest = spec["ingest"] or {}
+        if spec["queue"] is not None:
+            self.ingest_queue = BoundedQueue(maxsize=spec["queue"]["size"], overflow=spec["queue"]["overflow"])
+            self.scoring_worker = ScoringWorker(
+                self.ingest_queue, self.process_payloads,
+                batch_size=ingest.get("batch_size") or 1, max_latency_ms=ingest.get("max_latency_ms")
+            )
+        elif spec["ingest"] is not None and not spec["shards"]:
+            self.batcher = MicroBatcher(self.process_payloads, batch_size=ingest["batch_size"], max_latency_ms=ingest["max_latency_ms"])
+
+    def _register_metrics(self, metrics):
+        # Detector-internal stages (preprocess, learn, classify) are only timed by
+        # generated detectors, which then time the score stage themselves.
+        self.time_score = getattr(self.make_detector, "stages", None) is None
+        sinks = {"output": self.spec["output"]["type"], "alerts": self.spec["alerts"]["type"]}
+        if self.redis_sink:
+            sinks["redis"] = "redis"
+        self.stages = metrics.stages(self.name, ["decode", "score"] + list(sinks), sinks=sinks)
+        self.m_messages = metrics.counter("anomaly_messages_total", "Messages received", spec=self.name)
+        self.m_points = metrics.counter("anomaly_points_total", "Scored points written to the outputs", spec=self.name)
+        self.m_alerts = metrics.counter("anomaly_alerts_total", "Points flagged as anomalous", spec=self.name)
+        start_index = self.config["start_index"]
+        metrics.gauge("anomaly_warmup_target", "Warm-up length (start_index)", lambda: start_index, spec=self.name)
+        if self.keyed and self.sharder is None:
+            metrics.gauge("anomaly_keys", "Streams with model state", lambda: len(self.detectors), spec=self.name)
+            metrics.gauge("anomaly_keys_warming", "Streams still in warm-up", self.keys_warming, spec=self.name)
+        elif self.sharder is None:
+            metrics.gauge("anomaly_warmup_seen", "Warm-up points seen so far", lambda: min(self.detector.cnt, start_index), spec=self.name)
+        if self.ingest_queue is not None:
+            metrics.gauge("anomaly_queue_depth", f"Payloads waiting for {self.queue_consumer}", lambda: len(self.ingest_queue), spec=self.name)
+            metrics.gauge(
+                "anomaly_queue_dropped_total", "Payloads dropped by the overflow policy",
+                lambda: self.ingest_queue.dropped_oldest + self.ingest_queue.dropped_newest, kind="counter", spec=self.name
+            )
+        for sink in (self.score_sink, self.alert_sink):
+            if isinstance(sink, MqttSink):
+                metrics.gauge(
+                    "anomaly_publish_failed_total", "Result messages the MQTT client refused (queue full or not connected)",
+                    lambda publisher=sink.publisher: publisher.failed, kind="counter", spec=self.name, topic=sink.publisher.topic
+                )
+
+    def keys_warming(self):
+        with self.state_lock:
+            return sum(1 for _, d in self.detectors.items() if d.cnt < d.start_index)
+
+    def _error(self, e, stage):
+        if self.metrics is not None:
+            self.metrics.count_error(e, spec=self.name, stage=stage)
+        print(f"Error handling message: {e}")
+
+    def bound(self) -> tuple:
+        """Shared output objects this pipeline writes to."""
+        return self.score_sink.target, self.alert_sink.target, self.redis_sink
+
+    def decode(self, raw) -> list:
+        """The values a payload carries (one, unless the decoder is batched)."""
+        t0 = time.perf_counter() if self.metrics is not None else None
+        x_vals = self.decode_value(raw) if self.batched else [self.decode_value(raw)]
+        if t0 is not None:
+            self.stages.decode.observe(time.perf_counter() - t0)
+        return x_vals
+
+    def score(self, values, key=None):
+        # Model state is only touched under state_lock, so checkpoints see a consistent snapshot.
+        with self.state_lock:
+            t0 = time.perf_counter() if self.metrics is not None and self.time_score else None
+            if self.keyed:
+                result = self.detectors.get(key).score_values(values)
+            else:
+                result = self.detector.score_values(values)
+            if t0 is not None:
+                self.stages.score.observe(time.perf_counter() - t0)
+            return result
+
+    def emit_results(self, vals, scores, flags, key=None):
+        if not vals:
+            return
+        timed = self.metrics is not None
+        t0 = time.perf_counter() if timed else None
+        self.score_sink.write(vals, scores, key, flags)
+        if timed:
+            t1 = time.perf_counter()
+            self.stages.output.observe(t1 - t0)
+        self.alert_sink.write(vals, flags, key)
+        if timed:
+            t0 = time.perf_counter()
+            self.stages.alerts.observe(t0 - t1)
+        if self.redis_sink is not None:
+            if self.keyed:
+                scored = [json.dumps({"key": key, "value": v, "score": s}) for v, s in zip(vals, scores)]
+            else:
+                scored = [json.dumps({"value": v, "score": s}) for v, s in zip(vals, scores)]
+            alerted = [p for p, a in zip(scored, flags) if a]
+            self.redis_sink.push(scored, alerted)
+            if timed:
+                self.stages.redis.observe(time.perf_counter() - t0)
+        if timed:
+            self.m_points.inc(len(vals))
+            self.m_alerts.inc(sum(1 for a in flags if a))
+        if self.evaluator is not None:
+            self.evaluator.observe(scores, flags)
+        if not self.echo:
+            return
+        prefix = f"[{key}] " if self.keyed else ""
+        every = self.print_every
+        for v, s, a in zip(vals, scores, flags):
+            # Alerts are always printed; other values every print_every points (0: never).
+            if every is None:
+                print(f"{prefix}Received value: {v}, Score: {s}")
+            elif every:
+                self.printed += 1
+                if self.printed % every == 0:
+                    print(f"{prefix}Received value: {v}, Score: {s}")
+            if a:
+                print(f"{prefix}ALERT: Anomaly detected for value: {v}, Score: {s}")
+
+    def decode_runs(self, messages) -> list:
+        """
+        Decode received (topic, payload) pairs into (key, values) runs:
+        consecutive values of the same key are scored together, and keys
+        keep their arrival order.
+        """
+        runs = []
+        for topic, raw in messages:
+            try:
+                x_vals = self.decode(raw)
+            except Exception as e:
+                self._error(e, "decode")
+                continue
+            key = self.topic_key(topic) if self.keyed else None
+            if runs and runs[-1][0] == key:
+                runs[-1][1].extend(x_vals)
+            else:
+                runs.append((key, x_vals))
+        return runs
+
+    def process_payloads(self, messages):
+        for key, values in self.decode_runs(messages):
+            try:
+                self.emit_results(*self.score(values, key), key=key)
+            except Exception as e:
+                self._error(e, "score")
+
+    def receive(self, topic, payload):
+        if self.metrics is not None:
+            self.m_messages.inc()
+        if self.sharder is not None:
+            self.sharder.submit(topic, payload)
+        elif self.ingest_queue is not None:
+            self.ingest_queue.put((topic, payload))
+        elif self.batcher is not None:
+            self.batcher.add((topic, payload))
+        else:
+            try:
+                x_vals = self.decode(payload)
+                key = self.topic_key(topic) if self.keyed else None
+                self.emit_results(*self.score(x_vals, key), key=key)
+            except Exception as e:
+                self._error(e, "receive")
+
+    def replay(self, values, key=None):
+        """Score already decoded values as one group (offline replay)."""
+        if self.sharder is not None:
+            self.sharder.submit_values(key, values)
+        else:
+            self.emit_results(*self.score(values, key), key=key)
+
+    def queue_stats(self):
+        return self.ingest_queue.stats() if self.ingest_queue is not None else None
+
+    def start(self):
+        if self.sharder is not None:
+            self.sharder.start()
+        elif self.scoring_worker is not None:
+            self.scoring_worker.start()
+        elif self.batcher is not None:
+            self.batcher.start()
+
+    def stop(self, snapshot: bool = False):
+        """Stop scoring and flush the detectors; ``snapshot`` keeps the state of shard workers for snapshot_state()."""
+        if self.sharder is not None:
+            # worker processes flush their own detectors
+            self.sharder.stop(final_snapshot=snapshot)
+        else:
+            if self.scoring_worker is not None:
+                self.scoring_worker.stop()
+            elif self.batcher is not None:
+                self.batcher.stop()
+            if self.spec["queue"] is not None:
+                print(f"Ingest queue ({self.name}): {self.queue_stats()}")
+            with self.state_lock:
+                if self.keyed:
+                    for key, detector in self.detectors.items():
+                        self.flush_detector(key, detector)
+                else:
+                    self.flush_detector(None, self.detector)
+        # Sends the results still packed in MQTT batches.
+        self.score_sink.close()
+        self.alert_sink.close()
+
+    def snapshot_state(self):
+        """Pickled detector state per key (key None for unkeyed specs)."""
+        if self.sharder is not None:
+            return self.sharder.snapshot()
+        with self.state_lock:
+            if self.keyed:
+                return {key: pickle.dumps(d, protocol=pickle.HIGHEST_PROTOCOL) for key, d in self.detectors.items()}
+            return {None: pickle.dumps(self.detector, protocol=pickle.HIGHEST_PROTOCOL)}
+
+    def _adopt(self, blob):
+        detector = pickle.loads(blob)
+        detector.set_threshold(self.config["threshold"])
+        return detector
+
+    def restore_state(self, states):
+        """Install pickled detectors (from a checkpoint or the previous version of the spec)."""
+        if self.sharder is not None:
+            self.sharder.restore({
+                key: pickle.dumps(self._adopt(blob), protocol=pickle.HIGHEST_PROTOCOL) for key, blob in states.items()
+            })
+            return
+        with self.state_lock:
+            if self.keyed:
+                for key, blob in states.items():
+                    self.detectors.put(key, self._adopt(blob))
+            elif None in states:
+                self.detector = self._adopt(states[None])
+
+    def flush_detector(self, key, detector):
+        vals, scores, flags = detector.flush()
+        if vals is not None and scores is not None and flags is not None:
+            print("Processing remaining buffered values...")
+            self.emit_results(vals, scores, flags, key)
+
+
+class Resources:
+    """
+    Outputs shared by the specs: one LineWriter or RecordWriter per file,
+    one MQTT client per broker and one RedisSink per Redis DB. With
+    ``inputs`` set the input brokers are connected as well, and a broker
+    used for both subscribes and publishes on the same client.
+    update() keeps the objects whose configuration did not change, so a
+    reload does not reopen files or reconnect.
+    """
+    def __init__(self):
+        self.file_writers = {}
+        self.mqtt_clients = {}
+        self.redis_sinks = {}
+        self.inputs = False  # set while streaming; replay only needs the output brokers
+        self._configs = {}
+        self._started = False
+
+    def update(self, context) -> list:
+        """Create the outputs ``context`` needs; returns the ones it no longer uses (still open)."""
+        wanted = {}
+        for out in context["file_outputs"]:
+            wanted[("file", out["path"])] = out
+        for broker in context["output_brokers"]:
+            wanted[("mqtt", broker["name"])] = broker
+        if self.inputs:
+            for broker in context["input_brokers"]:
+                wanted.setdefault(("mqtt", broker["name"]), {k: v for k, v in broker.items() if k != "topics"})
+        for r in context["redis_dbs"]:
+            wanted[("redis", r["name"])] = r
+
+        retired = []
+        for key in list(self._configs):
+            if wanted.get(key) != self._configs[key]:
+                retired.append(self._pop(key))
+        for key, config in wanted.items():
+            if key not in self._configs:
+                self._open(key, config)
+        return retired
+
+    def _stores(self):
+        return {"file": self.file_writers, "mqtt": self.mqtt_clients, "redis": self.redis_sinks}
+
+    def _pop(self, key):
+        del self._configs[key]
+        return key[0], self._stores()[key[0]].pop(key[1])
+
+    def _open(self, key, config):
+        kind, name = key
+        if kind == "file":
+            if config.get("format") == "binary":
+                from .records import RecordWriter as writer_class
+            else:
+                writer_class = LineWriter
+            obj = writer_class(
+                config["path"], buffer_lines=config["buffer_lines"],
+                flush_interval_ms=config["flush_ms"], fsync=config["fsync"],
+                **({"features": config["features"]} if config.get("format") == "binary" else {})
+            )
+        elif kind == "mqtt":
+            obj = make_mqtt_client(
+                config["ssl"], config["webPath"], config["username"], config["password"] or None,
+                max_inflight=config["max_inflight"], queue_size=config["queue_size"]
+            )
+            obj.connect(config["host"], config["port"])
+            if self._started:
+                obj.loop_start()
+        else:
+            from .redis_sink import RedisSink, connect as redis_connect
+
+            obj = RedisSink(
+                redis_connect(host=config["host"], port=config["port"], db=config["db"], max_connections=config["pool_size"]),
+                config["key_scores"], config["key_alerts"], flush_size=config["flush_size"],
+                flush_interval_ms=config["flush_ms"], max_len=config["max_len"]
+            )
+        self._configs[key] = config
+        self._stores()[kind][name] = obj
+
+    def bound(self, spec) -> tuple:
+        """Output objects a SpecPipeline for ``spec`` would be built with."""
+        def target(out):
+            return self.file_writers[out["path"]] if out["type"] == "file" else self.mqtt_clients[out["broker"]["name"]]
+        return target(spec["output"]), target(spec["alerts"]), self.redis_sinks[spec["redis"]["name"]] if spec["redis"] else None
+
+    def start(self):
+        self._started = True
+        for client in self.mqtt_clients.values():
+            client.loop_start()
+
+    @staticmethod
+    def close(resources):
+        for kind, obj in resources:
+            if kind == "mqtt":
+                obj.loop_stop()
+                obj.disconnect()
+            else:
+                obj.close()
+
+    def close_all(self):
+        # MQTT clients are left to the network loop, as in generated pipelines.
+        self.close([("file", w) for w in self.file_writers.values()] + [("redis", s) for s in self.redis_sinks.values()])
+
+
+class Engine:
+    """
+    Runs the AnomalySpecs of one .anomaly file.
+
+    reload() re-reads the file and applies it in place. For every spec:
+      - unchanged                      -> the running pipeline is kept as is
+      - same model, start_index, attributes and keying (state_version)
+                                       -> a new pipeline takes over the detector state
+                                          and adopts the new threshold
+      - otherwise, or a new spec       -> a new pipeline starts fresh
+    Specs that disappeared are stopped. Message delivery is paused while the
+    pipelines are swapped, so no value is scored twice or lost.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.resources = Resources()
+        self.pipelines = {}
+        self.routers = {}
+        self.inputs = {}  # broker name -> (client, topics); clients belong to self.resources
+        self.evaluation = None
+        self.evaluator = None
+        self.checkpointer = None
+        self._source = None
+        self._live = False
+        self._lock = threading.RLock()
+        self.metrics = None  # MetricsRegistry, once a Metrics block is seen
+        self.metrics_config = None
+        self._metrics_server = None
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def load(self):
+        """Parse the file and build its pipelines (nothing is started)."""
+        self._source = self._read()
+        context = load_context(self.path)
+        self.resources.update(context)
+        self.pipelines = {spec["name"]: self._pipeline(spec, context) for spec in context["specs"]}
+        self._apply_context(context)
+        return context
+
+    def _pipeline(self, spec, context):
+        config = context["metrics"]
+        if config is None:
+            return SpecPipeline(spec, self.resources)
+        if self.metrics is None:
+            from .metrics import MetricsRegistry
+
+            self.metrics = MetricsRegistry()
+        self.metrics_config = config
+        return SpecPipeline(spec, self.resources, self.metrics, config["print_every"])
+
+    def _serve_metrics(self):
+        # The endpoint is opened once; a later change of host/port needs a restart.
+        if self.metrics is None or self._metrics_server is not None:
+            return
+        from .metrics import serve_metrics
+
+        config = self.metrics_config
+        self._metrics_server = serve_metrics(self.metrics, config["host"], config["port"])
+        print(f"Metrics on http://{config['host']}:{config['port']}/metrics")
+
+    def _apply_context(self, context):
+        evaluation = context["evaluation"]
+        if evaluation != self.evaluation:
+            # A changed Evaluation block starts counting again.
+            self.evaluator = StreamingEvaluator(evaluation) if evaluation else None
+            if self.evaluator is not None and self.metrics is not None:
+                self.evaluator.register(self.metrics)
+            if self._live:
+                self._open_labels()
+        self.evaluation = evaluation
+        routers = {}
+        for spec in context["specs"]:
+            routers.setdefault(spec["broker"]["name"], TopicRouter()).add(spec["topic"], self.pipelines[spec["name"]].receive)
+        if self.evaluator is not None:
+            self.pipelines[evaluation["spec"]].evaluator = self.evaluator
+            if evaluation["labels_topic"]:
+                routers[evaluation["broker"]].add(evaluation["labels_topic"], self.evaluator.receive_label)
+        self.routers = routers
+        checkpoint = context["checkpoint"]
+        old = self.checkpointer
+        if old is not None and checkpoint and (old.path, old.interval) == (checkpoint["path"], float(checkpoint["interval"])):
+            old.pipelines = self.pipelines
+            return
+        if old is not None:
+            old.stop()
+        self.checkpointer = Checkpointer(checkpoint["path"], checkpoint["interval"], self.pipelines) if checkpoint else None
+        if self._live and self.checkpointer is not None:
+            self.checkpointer.start()
+
+    def on_message(self, client, broker_name, message):
+        with self._lock:
+            router = self.routers.get(broker_name)
+            if router is None:
+                return
+            for receive in router.route(message.topic):
+                try:
+                    receive(message.topic, message.payload)
+                except Exception as e:
+                    if self.metrics is not None:
+                        self.metrics.count_error(e, stage="on_message")
+                    print(f"Error handling message: {e}")
+
+    def _sync_inputs(self, context):
+        """Subscribe the broker clients of self.resources to the topics of ``context``."""
+        wanted = {broker["name"]: broker["topics"] for broker in context["input_brokers"]}
+        clients = self.resources.mqtt_clients
+        for name in list(self.inputs):
+            client, topics = self.inputs[name]
+            if clients.get(name) is not client:
+                # Reconnected with a new configuration (or closed) by Resources.update.
+                del self.inputs[name]
+                continue
+            subscribed = wanted.get(name, [])
+            for topic in topics:
+                if topic not in subscribed:
+                    client.unsubscribe(topic)
+            if name not in wanted:
+                client.on_message = None  # still publishing results
+                del self.inputs[name]
+                continue
+            for topic in subscribed:
+                if topic not in topics:
+                    client.subscribe(topic)
+                    print(f"Subscribed to topic '{topic}'")
+            self.inputs[name] = (client, list(subscribed))
+        for name, topics in wanted.items():
+            if name in self.inputs:
+                continue
+            client = clients[name]
+            client.user_data_set(name)
+            client.on_message = self.on_message
+            for topic in topics:
+                client.subscribe(topic)
+                print(f"Subscribed to topic '{topic}'")
+            self.inputs[name] = (client, list(topics))
+
+    def changed(self) -> bool:
+        return self._read() != self._source
+
+    def reload(self) -> dict:
+        """Apply the current content of the file; returns {spec name: what happened}."""
+        try:
+            source = self._read()
+            context = load_context(self.path)
+            self._check_shards(context)
+            retired = self.resources.update(context)
+        except Exception as e:
+            print(f"Not reloading '{self.path}': {e}")
+            return {}
+        self._source = source
+
+        old = self.pipelines
+        new, report = {}, {}
+        for spec in context["specs"]:
+            previous = old.get(spec["name"])
+            if (previous is not None and previous.fingerprint == spec_fingerprint(spec)
+                    and previous.bound() == self.resources.bound(spec)):
+                new[spec["name"]] = previous
+                report[spec["name"]] = "unchanged"
+            else:
+                new[spec["name"]] = self._pipeline(spec, context)
+
+        with self._lock:
+            for name, pipeline in old.items():
+                if new.get(name) is not pipeline:
+                    # The new version only takes over the state of the same model configuration.
+                    pipeline.stop(snapshot=name in new and new[name].state_version == pipeline.state_version)
+                    if name not in new:
+                        report[name] = "removed"
+            Resources.close(retired)
+            for name, pipeline in new.items():
+                previous = old.get(name)
+                if previous is pipeline:
+                    continue
+                if previous is not None and previous.state_version == pipeline.state_version:
+                    pipeline.restore_state(previous.snapshot_state())
+                    report[name] = "state kept"
+                else:
+                    report[name] = "started fresh" if previous is not None else "added"
+                pipeline.start()
+            self.pipelines = new
+            self._apply_context(context)
+        if self._live:
+            self._serve_metrics()
+            self._sync_inputs(context)
+        for name, what in report.items():
+            print(f"Reloaded '{name}': {what}")
+        return report
+
+    def _check_shards(self, context):
+        # Shard workers are forked at startup, while the process has no other
+        # threads; forking new ones from the running engine is not safe.
+        for spec in context["specs"]:
+            previous = self.pipelines.get(spec["name"])
+            if spec["shards"] and (previous is None or previous.fingerprint != spec_fingerprint(spec)):
+                raise ValueError(f"sharded spec '{spec['name']}' is new or changed; restart the engine to apply it")
+
+    def _open_labels(self):
+        if self.evaluator is None:
+            return
+        if self.evaluation["labels_topic"]:
+            self.evaluator.use_labels_topic()
+        else:
+            # Labels are read from the labels file as scores are produced.
+            self.evaluator.open_labels_file()
+
+    def _restore_checkpoint(self):
+        if self.checkpointer is None:
+            return
+        restored = self.checkpointer.restore()
+        if restored:
+            print(f"Restored model state from '{self.checkpointer.path}': {', '.join(restored)}")
+
+    def _start(self, pipelines):
+        for pipeline in pipelines:
+            if pipeline.sharder is not None:
+                # Fork scoring processes while this process is still single-threaded.
+                pipeline.sharder.start_workers()
+        self.resources.start()
+        self._serve_metrics()
+        for pipeline in pipelines:
+            pipeline.start()
+
+    def _stop(self, pipelines):
+        for pipeline in pipelines:
+            pipeline.stop(snapshot=self.checkpointer is not None)
+        self.resources.close_all()
+        if self.checkpointer is not None:
+            self.checkpointer.save()
+            print(f"Model state saved to '{self.checkpointer.path}'")
+
+    def run(self, watch: float | None = None):
+        """Subscribe and score until interrupted; with ``watch`` the file is polled every ``watch`` seconds."""
+        self.resources.inputs = True
+        context = self.load()
+        self._open_labels()
+        self._restore_checkpoint()
+        self._start(self.pipelines.values())
+        if self.checkpointer is not None:
+            self.checkpointer.start()
+        self._live = True
+        self._sync_inputs(context)
+        try:
+            while True:
+                time.sleep(watch or 1.0)
+                if watch and self.changed():
+                    self.reload()
+        finally:
+            for client, _ in self.inputs.values():
+                client.on_message = None  # the network loops keep publishing the last results
+            if self.checkpointer is not None:
+                self.checkpointer.stop()
+            self._stop(self.pipelines.values())
+
+    def replay(self, path: str, chunk_size: int, topic: str | None = None):
+        """Score a CSV of historical values through the pipelines, without MQTT."""
+        from .replay import replay_file
+
+        if topic is None:
+            targets = [(pipeline, None) for pipeline in self.pipelines.values()]
+        else:
+            targets = [
+                (pipeline, pipeline.topic_key(topic) if pipeline.keyed else None)
+                for pipeline in self.pipelines.values()
+                if mqtt.topic_matches_sub(pipeline.topic, topic)
+            ]
+            if not targets:
+                print(f"No AnomalySpec subscribes to topic '{topic}'.")
+                return
+        self._restore_checkpoint()
+        for pipeline, _ in targets:
+            pipeline.echo = False
+        self._start([pipeline for pipeline, _ in targets])
+        started = time.perf_counter()
+        try:
+            rows, _ = replay_file(path, targets, chunk_size, progress_every=100 * chunk_size)
+        finally:
+            self._stop([pipeline for pipeline, _ in targets])
+        # Sharded specs finish scoring in _stop(), so it is part of the time.
+        elapsed = time.perf_counter() - started
+        print(f"Replayed {rows} rows from '{path}' in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run an AnomalyDSL specification without generating code.")
+    parser.add_argument("spec", nargs="?", default="example.anomaly", help="DSL file (default: example.anomaly)")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="poll the DSL file and reload it in place when it changes")
+    parser.add_argument(
+        "--replay", nargs="?", const="", metavar="CSV",
+        help="score a CSV of historical values without MQTT (default: the Evaluation data_file)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows read per replay chunk")
+    parser.add_argument("--topic", help="replay as if the values were received on this topic")
+    args = parser.parse_args(argv)
+
+    engine = Engine(args.spec)
+    if args.replay is not None:
+        engine.load()
+        path = args.replay or (engine.evaluation or {}).get("data_file")
+        if not path:
+            parser.error("--replay needs a CSV path when the DSL has no Evaluation block")
+        evaluation = engine.evaluation
+        labelled = evaluation is not None and path == evaluation["data_file"] and os.path.exists(evaluation["labels_file"])
+        if labelled:
+            engine.evaluator.open_labels_file()
+        engine.replay(path, args.chunk_size, args.topic)
+        if labelled:
+            engine.evaluator.report()
+        return 0
+
+    try:
+        engine.run(args.watch)
+    except KeyboardInterrupt:
+        print("Streaming stopped by user.")
+        if engine.evaluation is None:
+            return 0
+        print(" Do you want to continue with the evaluation so far? (y/n)")
+        if input().strip().lower() == "y":
+            print("Continuing with evaluation...")
+            engine.evaluator.report()
+        else:
+            print("Exiting without evaluation.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,446 @@
+import argparse
+import json
+import threading
+from collections import deque
+
+# Default number of score bins kept by the streaming ROC AUC.
+DEFAULT_ROC_BINS = 16384
+# Rows per chunk when evaluating result files offline.
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def read_column(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, field: str = "score"):
+    """
+    Yield the values of a result or labels file as float64 arrays of at most
+    ``chunk_size`` rows: a headerless one-value-per-line CSV, a ``.npy``
+    array, or the ``field`` of a binary record file (runtime.records); the
+    last two are memory-mapped rather than loaded.
+    """
+    import numpy as np
+
+    from .records import is_record_file, read_records
+
+    if is_record_file(path):
+        for records in read_records(path, chunk_size):
+            yield records[field].astype(np.float64)
+        return
+    if path.endswith(".npy"):
+        with open(path, "rb") as f:
+            if np.lib.format.read_magic(f) == (1, 0):
+                (length,), _, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                (length,), _, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        # One mapping per chunk, released after the copy, so resident memory stays at one chunk.
+        for start in range(0, length, chunk_size):
+            count = min(chunk_size, length - start)
+            mapped = np.memmap(path, dtype=dtype, mode="r", offset=offset + start * dtype.itemsize, shape=(count,))
+            yield np.array(mapped, dtype=np.float64)
+            del mapped
+        return
+    import pandas as pd
+
+    # round_trip: the files hold repr() floats; the default parser may be off by one ulp and reorder ties
+    for chunk in pd.read_csv(path, header=None, usecols=[0], float_precision="round_trip", chunksize=chunk_size):
+        yield chunk.iloc[:, 0].to_numpy(dtype=np.float64)
+
+
+def aligned_chunks(sources, chunk_size: int, lengths: list):
+    """
+    Read ``sources`` ((path, field) pairs, see read_column) side by side and
+    yield tuples of equally long arrays, one per file, until the shortest
+    file ends. ``lengths`` receives the number of rows of every file (the
+    rest of the longer files is counted, not kept).
+    """
+    import numpy as np
+
+    readers = [read_column(path, chunk_size, field) for path, field in sources]
+    buffers = [np.empty(0) for _ in sources]
+    lengths[:] = [0] * len(sources)
+    while True:
+        for i, reader in enumerate(readers):
+            while len(buffers[i]) < chunk_size:
+                chunk = next(reader, None)
+                if chunk is None:
+                    break
+                buffers[i] = np.concatenate([buffers[i], chunk]) if len(buffers[i]) else chunk
+        n = min(len(b) for b in buffers)
+        if not n:
+            break
+        yield tuple(b[:n] for b in buffers)
+        for i in range(len(buffers)):
+            lengths[i] += n
+            buffers[i] = buffers[i][n:]
+    for i, reader in enumerate(readers):
+        lengths[i] += len(buffers[i]) + sum(len(chunk) for chunk in reader)
+
+
+class ConfusionCounts:
+    """Binary confusion counts; the metrics follow scikit-learn (0.0 when undefined)."""
+    __slots__ = ("tp", "fp", "tn", "fn")
+
+    def __init__(self):
+        self.tp = self.fp = self.tn = self.fn = 0
+
+    def update(self, label, flag):
+        if flag:
+            if label:
+                self.tp += 1
+            else:
+                self.fp += 1
+        elif label:
+            self.fn += 1
+        else:
+            self.tn += 1
+
+    def update_many(self, labels, flags):
+        """Add boolean NumPy arrays of labels and flags."""
+        import numpy as np
+
+        tp = int(np.count_nonzero(labels & flags))
+        fp = int(np.count_nonzero(flags)) - tp
+        fn = int(np.count_nonzero(labels)) - tp
+        self.tp += tp
+        self.fp += fp
+        self.fn += fn
+        self.tn += len(labels) - tp - fp - fn
+
+    @property
+    def total(self):
+        return self.tp + self.fp + self.tn + self.fn
+
+    def precision(self):
+        return self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+
+    def recall(self):
+        return self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+
+    def f1(self):
+        denominator = 2 * self.tp + self.fp + self.fn
+        return 2 * self.tp / denominator if denominator else 0.0
+
+    def accuracy(self):
+        return (self.tp + self.tn) / self.total if self.total else 0.0
+
+
+class StreamingAUC:
+    """
+    ROC AUC over a stream in bounded memory.
+
+    Scores are kept in at most ``max_bins`` bins [low, high] with their
+    negative and positive counts, sorted and non-overlapping. While there
+    are no more distinct scores than bins the result equals roc_auc_score;
+    beyond that, neighbouring bins are merged to roughly equal weight and
+    pairs inside one bin count as ties. A later score that falls inside a
+    merged bin splits it, the bin's counts being shared out linearly, so the
+    bins stay fine where the score distribution drifts.
+    """
+    def __init__(self, max_bins: int = DEFAULT_ROC_BINS):
+        self.max_bins = max(int(max_bins), 2)
+        self._bins = None  # (low, high, negatives, positives) arrays
+        self._pending = []  # (score, label) not yet added to _bins
+
+    def update(self, label, score):
+        self._pending.append((score, 1 if label else 0))
+        if len(self._pending) >= self.max_bins:
+            self._flush()
+
+    def update_many(self, labels, scores):
+        """Add NumPy arrays of 0/1 labels and scores."""
+        if self._pending:
+            self._flush()
+        self._add(labels, scores)
+
+    def _flush(self):
+        import numpy as np
+
+        pending = np.array(self._pending, dtype=np.float64)
+        self._pending = []
+        self._add(pending[:, 1], pending[:, 0])
+
+    def _add(self, labels, scores):
+        import numpy as np
+
+        values, inverse = np.unique(scores, return_inverse=True)
+        pos = np.bincount(inverse, weights=labels, minlength=len(values))
+        neg = np.bincount(inverse, minlength=len(values)) - pos
+        if self._bins is None:
+            low, high, n, p = values, values, neg, pos
+        else:
+            low, high, n, p = (a.copy() for a in self._bins)
+            i = np.searchsorted(low, values, side="right") - 1
+            inside = i >= 0
+            inside[inside] = values[inside] <= high[i[inside]]
+            exact = inside & (low[np.maximum(i, 0)] == high[np.maximum(i, 0)])
+            np.add.at(n, i[exact], neg[exact])
+            np.add.at(p, i[exact], pos[exact])
+            split = inside & ~exact
+            if split.any():
+                # Cut every wide bin at the scores that fall inside it.
+                bins = np.unique(i[split])
+                edge_bin = np.concatenate([bins, i[split], bins])
+                edge = np.concatenate([low[bins], values[split], high[bins]])
+                order = np.lexsort((edge, edge_bin))
+                edge_bin, edge = edge_bin[order], edge[order]
+                piece = (edge_bin[1:] == edge_bin[:-1]) & (edge[1:] > edge[:-1])
+                owner = edge_bin[:-1][piece]
+                share = (edge[1:][piece] - edge[:-1][piece]) / (high[owner] - low[owner])
+                keep = np.ones(len(low), dtype=bool)
+                keep[bins] = False
+                low = np.concatenate([low[keep], edge[:-1][piece]])
+                high = np.concatenate([high[keep], edge[1:][piece]])
+                n = np.concatenate([n[keep], n[owner] * share])
+                p = np.concatenate([p[keep], p[owner] * share])
+            fresh = ~exact
+            low = np.concatenate([low, values[fresh]])
+            high = np.concatenate([high, values[fresh]])
+            n = np.concatenate([n, neg[fresh]])
+            p = np.concatenate([p, pos[fresh]])
+            order = np.lexsort((high, low))
+            low, high, n, p = low[order], high[order], n[order], p[order]
+        if len(low) > self.max_bins:
+            weight = n + p
+            group = np.floor((np.cumsum(weight) - weight) / (weight.sum() / self.max_bins))
+            starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+            low, high = low[starts], np.maximum.reduceat(high, starts)
+            n, p = np.add.reduceat(n, starts), np.add.reduceat(p, starts)
+        self._bins = (low, high, n, p)
+
+    def value(self):
+        """ROC AUC so far, or None while only one class has been seen."""
+        import numpy as np
+
+        if self._pending:
+            self._flush()
+        if self._bins is None:
+            return None
+        _, _, n, p = self._bins
+        positives, negatives = p.sum(), n.sum()
+        if not positives or not negatives:
+            return None
+        below = np.cumsum(n) - n
+        return float(np.dot(p, below + n / 2) / (positives * negatives))
+
+
+def compute_metrics(metrics, counts: ConfusionCounts, auc: StreamingAUC | None) -> dict:
+    """Metric name -> value (None for ROCAUC while only one class was seen)."""
+    results = {}
+    for metric in metrics:
+        if metric == "F1Score":
+            results[metric] = counts.f1()
+        elif metric == "Precision":
+            results[metric] = counts.precision()
+        elif metric == "Recall":
+            results[metric] = counts.recall()
+        elif metric == "Accuracy":
+            results[metric] = counts.accuracy()
+        elif metric == "ROCAUC":
+            results[metric] = auc.value()
+    return results
+
+
+def print_metrics(results: dict, labels: int, predictions: int):
+    if labels != predictions:
+        print(f"[Warning] Labels and predictions have different lengths "
+              f"({labels} vs {predictions}). Truncating to shortest.")
+    for metric, value in results.items():
+        if value is None:
+            print("ROCAUC: Cannot compute ROC AUC — only one class present in y_true.")
+        else:
+            print(f"{metric}:", value)
+
+
+def evaluate(eval, chunk_size: int = DEFAULT_CHUNK_SIZE, roc_bins: int | None = None):
+    """
+    Print the metrics of an Evaluation block from its labels, alerts and scores files.
+
+    The files are read once, side by side, in chunks of ``chunk_size`` rows,
+    so memory does not depend on their length. All files are truncated to
+    the shortest one.
+    """
+    metrics = eval["metrics"]
+    sources = [(eval["labels_file"], None), (eval["anomalies_file"], "flag")]
+    if "ROCAUC" in metrics:
+        sources.append((eval["scores_file"], "score"))
+    counts = ConfusionCounts()
+    auc = StreamingAUC(roc_bins or eval.get("roc_bins") or DEFAULT_ROC_BINS) if "ROCAUC" in metrics else None
+    lengths = []
+    for chunk in aligned_chunks(sources, chunk_size, lengths):
+        labels = chunk[0] != 0
+        counts.update_many(labels, chunk[1] != 0)
+        if auc is not None:
+            auc.update_many(labels, chunk[2])
+    if not counts.total:
+        print("Nothing to evaluate: the labels or alerts file is empty.")
+        return
+    print_metrics(compute_metrics(metrics, counts, auc), lengths[0], lengths[1])
+
+
+def _parse_label(text):
+    return int(float(text))
+
+
+class StreamingEvaluator:
+    """
+    Evaluates one spec's output while the pipeline runs.
+
+    Every scored point is paired, in output order, with the next ground-truth
+    label: read from ``labels_file`` as points arrive (open_labels_file), or
+    received on ``labels_topic`` (receive_label). Labels and points that
+    arrive first wait for their counterpart, up to ``max_pending`` each; the
+    oldest are dropped beyond that. Confusion counts and a StreamingAUC are
+    updated per pair, so memory does not grow with the stream. With
+    ``report_every`` the metrics are printed every that many pairs.
+    """
+    def __init__(self, eval: dict, max_pending: int = 100_000):
+        self.metrics = list(eval["metrics"])
+        self.labels_file = eval["labels_file"]
+        self.report_every = eval.get("report_every") or 0
+        self.counts = ConfusionCounts()
+        self.auc = StreamingAUC(eval.get("roc_bins") or DEFAULT_ROC_BINS) if "ROCAUC" in self.metrics else None
+        self._file = None
+        self._topic = False
+        self._points = deque(maxlen=max_pending)
+        self._labels = deque(maxlen=max_pending)
+        self.unlabelled = 0  # points beyond the end of the labels file
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self._file is not None or self._topic
+
+    def open_labels_file(self, path: str | None = None):
+        """Read labels from ``path`` (default: labels_file) alongside the stream; returns False if it is missing."""
+        try:
+            self._file = open(path or self.labels_file, "r", encoding="utf-8")
+        except OSError as e:
+            print(f"Streaming evaluation disabled: {e}")
+            return False
+        return True
+
+    def use_labels_topic(self):
+        self._topic = True
+
+    def receive_label(self, topic, payload):
+        """TopicRouter handler: the payload is a number or a JSON object with a "label" field."""
+        try:
+            label = json.loads(payload)
+            if isinstance(label, dict):
+                label = label.get("label")
+            label = _parse_label(label)
+        except Exception as e:
+            print(f"Error handling label: {e}")
+            return
+        with self._lock:
+            self._labels.append(label)
+            self._pair()
+
+    def _next_file_label(self):
+        for line in self._file:
+            line = line.strip()
+            if line:
+                return _parse_label(line)
+        return None
+
+    def observe(self, scores, flags):
+        """Record the scores and 0/1 flags a spec has just written."""
+        if not self.active:
+            return
+        with self._lock:
+            if self._file is not None:
+                for score, flag in zip(scores, flags):
+                    label = self._next_file_label()
+                    if label is None:
+                        self.unlabelled += 1
+                    else:
+                        self._update(label, score, flag)
+            else:
+                self._points.extend(zip(scores, flags))
+                self._pair()
+
+    def _pair(self):
+        while self._points and self._labels:
+            score, flag = self._points.popleft()
+            self._update(self._labels.popleft(), score, flag)
+
+    def _update(self, label, score, flag):
+        self.counts.update(label, flag)
+        if self.auc is not None:
+            self.auc.update(label, score)
+        if self.report_every and self.counts.total % self.report_every == 0:
+            values = ", ".join(f"{m}={'n/a' if v is None else f'{v:.4f}'}" for m, v in self._results().items())
+            print(f"[Evaluation] {self.counts.total} points: {values}")
+
+    def _results(self):
+        return compute_metrics(self.metrics, self.counts, self.auc)
+
+    def results(self) -> dict:
+        """Metric name -> value so far (None for ROCAUC while only one class was seen)."""
+        with self._lock:
+            return self._results()
+
+    def register(self, registry):
+        """Expose the running metrics on a runtime.metrics.MetricsRegistry."""
+        registry.gauge("anomaly_evaluation_points", "Scored points paired with a label", lambda: self.counts.total)
+        for metric in self.metrics:
+            registry.gauge(
+                "anomaly_evaluation", "Streaming evaluation metrics",
+                lambda metric=metric: self.results().get(metric), metric=metric
+            )
+
+    def report(self):
+        """Print the final metrics in the format of evaluate()."""
+        with self._lock:
+            if self._file is not None:
+                remaining = 0
+                while self._next_file_label() is not None:
+                    remaining += 1
+                self._file.close()
+                self._file = None
+                labels = self.counts.total + remaining
+                predictions = self.counts.total + self.unlabelled
+            else:
+                labels = self.counts.total + len(self._labels)
+                predictions = self.counts.total + len(self._points)
+            if not self.counts.total:
+                print("No scored point has a label yet; nothing to evaluate.")
+                return
+            print_metrics(self._results(), labels, predictions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate result files against labels in one pass with bounded memory (CSV, .npy or binary records)."
+    )
+    parser.add_argument(
+        "spec", nargs="?",
+        help="DSL file with an Evaluation block (default: example.anomaly, unless --labels and --alerts are given)"
+    )
+    parser.add_argument("--labels", help="labels file (default: the Evaluation labels_file)")
+    parser.add_argument("--alerts", help="0/1 flags file (default: the Evaluation anomalies_file)")
+    parser.add_argument("--scores", help="scores file (default: the Evaluation scores_file)")
+    parser.add_argument("--metrics", help="comma-separated metrics (default: the Evaluation metrics)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows read per chunk")
+    parser.add_argument("--roc-bins", type=int, help=f"score bins of the ROC AUC (default: roc_bins or {DEFAULT_ROC_BINS})")
+    args = parser.parse_args(argv)
+
+    from .engine import load_context
+
+    spec = args.spec or (None if args.labels and args.alerts else "example.anomaly")
+    eval = dict(load_context(spec)["evaluation"] or {}) if spec else {"metrics": ["F1Score", "Precision", "Recall", "Accuracy"]}
+    for key, value in (("labels_file", args.labels), ("anomalies_file", args.alerts), ("scores_file", args.scores)):
+        if value:
+            eval[key] = value
+    if args.metrics:
+        eval["metrics"] = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    missing = [key for key in ("labels_file", "anomalies_file", "metrics") if not eval.get(key)]
+    if "ROCAUC" in eval.get("metrics", ()) and not eval.get("scores_file"):
+        missing.append("scores_file")
+    if missing:
+        parser.error(f"no Evaluation block in '{spec}' and no value for: {', '.join(missing)}")
+    evaluate(eval, args.chunk_size, args.roc_bins)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,40 @@
+"""
+Precompiled extraction of the ``attribute`` fields of a decoded JSON payload.
+
+An attribute is a key of the payload, or a dotted path into nested
+objects ("machine.temperature"). compile_extractor() resolves the paths
+once; the returned function only indexes the payload.
+"""
+from operator import itemgetter
+
+
+def field_getter(attribute: str):
+    """Function reading ``attribute`` from a payload dict (a missing top-level key gives None)."""
+    keys = attribute.split(".")
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda payload: payload.get(key)
+    getters = tuple(itemgetter(key) for key in keys)
+    if len(getters) == 2:
+        first, second = getters
+        return lambda payload: second(first(payload))
+
+    def get(payload):
+        for getter in getters:
+            payload = getter(payload)
+        return payload
+    return get
+
+
+def compile_extractor(attributes):
+    """
+    Function turning a payload dict into the scored value: a float for one
+    attribute, a {attribute: float} feature dict in ``attributes`` order for
+    several.
+    """
+    getters = [field_getter(attribute) for attribute in attributes]
+    if len(getters) == 1:
+        get = getters[0]
+        return lambda payload: float(get(payload))
+    features = tuple(zip(attributes, getters))
+    return lambda payload: {name: float(get(payload)) for name, get in features}
@@ -0,0 +1,195 @@
+import threading
+import time
+from collections import deque
+
+
+class MicroBatcher:
+    """
+    Collects incoming items and hands them to ``handler`` as one group.
+
+    A group is released when ``batch_size`` items are pending or, if
+    ``max_latency_ms`` is set, when the oldest pending item has waited that
+    long. ``handler`` always runs under the batcher lock, so groups are
+    processed one at a time and in arrival order.
+
+    API:
+      add(item) -> queue one item (may trigger a flush)
+      flush()   -> process whatever is pending right now
+      start()   -> start the latency timer thread (no-op without max_latency_ms)
+      stop()    -> stop the timer and flush the remainder
+    """
+    def __init__(self, handler, batch_size: int, max_latency_ms: int | None = None):
+        if not batch_size or int(batch_size) < 1:
+            raise ValueError("batch_size must be a positive integer")
+        self.handler = handler
+        self.batch_size = int(batch_size)
+        self.max_latency = max_latency_ms / 1000.0 if max_latency_ms else None
+        self._pending: list = []
+        self._first_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: threading.Thread | None = None
+
+    def add(self, item):
+        with self._lock:
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append(item)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        items = self._pending
+        self._pending = []
+        self.handler(items)
+
+    def _run_timer(self):
+        tick = max(self.max_latency / 4.0, 0.001)
+        while not self._stop.wait(tick):
+            with self._lock:
+                if self._pending and time.monotonic() - self._first_at >= self.max_latency:
+                    self._flush_locked()
+
+    def start(self):
+        if self.max_latency is None or self._timer is not None:
+            return
+        self._timer = threading.Thread(target=self._run_timer, name="micro-batcher", daemon=True)
+        self._timer.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class BoundedQueue:
+    """
+    FIFO queue with a fixed capacity and an explicit overflow policy.
+
+      - block:       put() waits until the consumer frees a slot
+      - drop_oldest: the oldest queued item is discarded to make room
+      - drop_newest: the incoming item is discarded
+
+    Depth and drop counters are available through stats().
+    """
+    def __init__(self, maxsize: int, overflow: str = "block"):
+        if not maxsize or int(maxsize) < 1:
+            raise ValueError("maxsize must be a positive integer")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.maxsize = int(maxsize)
+        self.overflow = overflow
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.dropped_oldest = 0
+        self.dropped_newest = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item) -> bool:
+        """Queue ``item``; returns False if it was dropped or the queue is closed."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.overflow == "drop_newest":
+                    self.dropped_newest += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._items.popleft()
+                    self.dropped_oldest += 1
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._cond.wait()
+                    if self._closed:
+                        return False
+            self._items.append(item)
+            self.enqueued += 1
+            self._cond.notify_all()
+            return True
+
+    def get_batch(self, max_items: int = 1, max_wait: float | None = None) -> list:
+        """
+        Wait for at least one item, then keep collecting until ``max_items``
+        are taken or ``max_wait`` seconds have passed since the first one.
+        Returns an empty list once the queue is closed and drained.
+        """
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return []
+            if max_wait:
+                deadline = time.monotonic() + max_wait
+                while len(self._items) < max_items and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            n = min(max_items, len(self._items))
+            batch = [self._items.popleft() for _ in range(n)]
+            self._cond.notify_all()
+            return batch
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._items),
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "dropped_oldest": self.dropped_oldest,
+            "dropped_newest": self.dropped_newest,
+        }
+
+
+class ScoringWorker:
+    """
+    Dedicated thread that drains a BoundedQueue and passes each group of
+    items to ``handler``. Groups hold up to ``batch_size`` items, gathered
+    for at most ``max_latency_ms`` after the first one arrives.
+
+    stop() closes the queue, lets the worker score what is still queued and
+    waits for it to finish.
+    """
+    def __init__(self, queue: BoundedQueue, handler, batch_size: int = 1, max_latency_ms: int | None = None):
+        self.queue = queue
+        self.handler = handler
+        self.batch_size = max(int(batch_size or 1), 1)
+        self.max_wait = max_latency_ms / 1000.0 if max_latency_ms else None
+        self._thread: threading.Thread | None = None
+
+    def _run(self):
+        while True:
+            items = self.queue.get_batch(self.batch_size, self.max_wait)
+            if not items:
+                return
+            self.handler(items)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="scoring-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.queue.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+
+
+def topic_key_extractor(topic_filter: str):
+    """
+    Build a function that maps a concrete topic to the key captured by the
+    wildcards of ``topic_filter``: the levels matched by each '+' and by a
+    trailing '#', joined with '/'. Filters without wildcards map every topic
+    to itself.
+
+      topic_key_extractor("plant/+/temperature")("plant/p7/temperature") -> "p7"
+    """
+    levels = topic_filter.split("/")
+    plus = tuple(i for i, level in enumerate(levels) if level == "+")
+    tail = len(levels) - 1 if levels[-1] == "#" else None
+
+    if not plus and tail is None:
+        return lambda topic: topic
+
+    def extract(topic: str) -> str:
+        parts = topic.split("/")
+        key = [parts[i] for i in plus]
+        if tail is not None:
+            key.extend(parts[tail:])
+        return "/".join(key)
+
+    return extract
+
+
+class KeyedStore:
+    """
+    Per-key state created on first use by ``factory()``.
+
+    Entries are kept in least-recently-used order. When ``max_keys`` is
+    reached the least recently used entry is evicted, and entries not used
+    for ``idle_ttl`` seconds are evicted on the next access. ``on_evict(key,
+    state)`` is called for every evicted entry, e.g. to flush buffered data.
+    """
+    def __init__(self, factory, max_keys: int | None = None, idle_ttl: float | None = None, on_evict=None):
+        self.factory = factory
+        self.max_keys = int(max_keys) if max_keys else None
+        self.idle_ttl = float(idle_ttl) if idle_ttl else None
+        self.on_evict = on_evict
+        self._entries: OrderedDict = OrderedDict()  # key -> [state, last_used]
+        self.created = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        if self.idle_ttl is not None:
+            self._expire(now)
+        entry = self._entries.get(key)
+        if entry is None:
+            if self.max_keys is not None and len(self._entries) >= self.max_keys:
+                self._evict(next(iter(self._entries)))
+            entry = [self.factory(), now]
+            self._entries[key] = entry
+            self.created += 1
+        else:
+            entry[1] = now
+            self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, state):
+        """Insert (or replace) the state of ``key``, e.g. when restoring a checkpoint."""
+        self._entries[key] = [state, time.monotonic()]
+        self._entries.move_to_end(key)
+        if self.max_keys is not None:
+            while len(self._entries) > self.max_keys:
+                self._evict(next(iter(self._entries)))
+
+    def items(self):
+        return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def _expire(self, now):
+        deadline = now - self.idle_ttl
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[1] > deadline:
+                break
+            self._evict(key)
+
+    def _evict(self, key):
+        state, _ = self._entries.pop(key)
+        self.evicted += 1
+        if self.on_evict is not None:
+            self.on_evict(key, state)
+
+    def stats(self) -> dict:
+        return {"keys": len(self._entries), "created": self.created, "evicted": self.evicted}
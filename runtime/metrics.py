@@ -0,0 +1,152 @@
+import bisect
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; from a few microseconds (one River update) to seconds (a CUSTOM fit or a stalled sink).
+DEFAULT_BUCKETS = (
+    5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. observe() takes no lock: every series
+    is meant to be written by one thread (a pipeline's scoring path), and a
+    scrape may at worst miss an observation that is being recorded.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    Counters, histograms and callback gauges, rendered in the Prometheus
+    text exposition format. Metrics are identified by name and labels;
+    asking twice for the same series returns the same object.
+    """
+    def __init__(self):
+        self._families = {}  # name -> [kind, help, {labels: metric or callback}]
+        self._lock = threading.Lock()
+
+    def _get(self, kind, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, [kind, help_text, {}])
+            if family[0] != kind:
+                raise ValueError(f"metric '{name}' is already registered as a {family[0]}")
+            series = family[2]
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def gauge(self, name: str, help_text: str, fn, kind: str = "gauge", **labels):
+        """Series whose value is read from ``fn()`` at scrape time (kind "counter" for monotonic totals)."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._families.setdefault(name, [kind, help_text, {}])[2][key] = fn
+
+    def stages(self, spec: str, names, sinks=None) -> types.SimpleNamespace:
+        """
+        One ``anomaly_stage_seconds`` histogram per stage of a spec, as
+        attributes. ``sinks`` maps the output stages to the type of sink they
+        write to, exported as a ``sink`` label.
+        """
+        sinks = sinks or {}
+        return types.SimpleNamespace(**{
+            stage: self.histogram(
+                "anomaly_stage_seconds", "Time spent per pipeline stage", spec=spec, stage=stage,
+                **({"sink": sinks[stage]} if stage in sinks else {})
+            )
+            for stage in names
+        })
+
+    def count_error(self, exc: BaseException, **labels):
+        self.counter("anomaly_errors_total", "Errors by stage and exception type", type=type(exc).__name__, **labels).inc()
+
+    def render(self) -> str:
+        with self._lock:
+            families = [(name, kind, help_text, list(series.items())) for name, (kind, help_text, series) in self._families.items()]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if isinstance(metric, Histogram):
+                    cumulative = 0
+                    for bound, count in zip(metric.bounds + (float("inf"),), list(metric.counts)):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        bucket = _labels(labels, f'le="{le}"')
+                        lines.append(f"{name}_bucket{bucket} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {metric.sum}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                elif isinstance(metric, Counter):
+                    lines.append(f"{name}{_labels(labels)} {metric.value}")
+                else:
+                    try:
+                        value = metric()
+                    except Exception:
+                        continue  # e.g. state changing while it is read; skip this scrape
+                    if value is not None:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108):
+    """Serve ``registry`` on http://host:port/metrics from a daemon thread; returns the server (call shutdown() to stop)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
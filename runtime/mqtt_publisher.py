@@ -0,0 +1,99 @@
+import atexit
+import json
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+
+class MqttPublisher:
+    """
+    Publishes result objects ({"value", "score"} and the like) to one topic
+    over a shared paho client.
+
+    With ``batch_size`` 1 every object is its own JSON message. Otherwise
+    objects are packed into JSON arrays of ``batch_size``: full arrays are
+    sent as soon as they are complete, and a partial one once
+    ``flush_interval_ms`` has passed since the last send (or on flush()).
+
+    A message the client refuses (its queue is full, or it is not connected)
+    is dropped and counted in ``failed``; ``failed_points`` counts the
+    objects it carried. close() sends what is left; it is also registered
+    with atexit.
+    """
+    def __init__(self, client, topic: str, qos: int = 0, batch_size: int = 1, flush_interval_ms: int | None = None):
+        self.client = client
+        self.topic = topic
+        self.qos = int(qos or 0)
+        self.batch_size = max(int(batch_size or 1), 1)
+        self.flush_interval = flush_interval_ms / 1000.0 if flush_interval_ms else None
+        self.published = 0
+        self.failed = 0
+        self.failed_points = 0
+        self._reported = 0  # failures already printed by close()
+        self._pending: list = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: threading.Thread | None = None
+        atexit.register(self.close)
+
+    def publish(self, results):
+        """Queue result dicts; they are sent now (batch_size 1) or once a batch fills up."""
+        with self._lock:
+            if self.batch_size == 1:
+                for result in results:
+                    self._send(json.dumps(result), 1)
+                return
+            if self._timer is None and self.flush_interval is not None:
+                self._start_timer()
+            self._pending.extend(results)
+            if self._interval_elapsed():
+                self._flush_locked()
+            elif len(self._pending) >= self.batch_size:
+                self._flush_locked(full_only=True)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _interval_elapsed(self):
+        return self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _flush_locked(self, full_only: bool = False):
+        self._last_flush = time.monotonic()
+        pending = self._pending
+        size = self.batch_size
+        end = len(pending) - len(pending) % size if full_only else len(pending)
+        for start in range(0, end, size):
+            batch = pending[start:start + size]
+            self._send(json.dumps(batch), len(batch))
+        del pending[:end]
+
+    def _send(self, payload: str, points: int):
+        info = self.client.publish(self.topic, payload, qos=self.qos)
+        if info.rc == mqtt.MQTT_ERR_SUCCESS:
+            self.published += 1
+        else:
+            self.failed += 1
+            self.failed_points += points
+
+    def _start_timer(self):
+        # Started on first use rather than in __init__, so that the process
+        # can still fork worker processes before any thread exists.
+        self._timer = threading.Thread(target=self._run_timer, name=f"publisher:{self.topic}", daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                if self._pending and self._interval_elapsed():
+                    self._flush_locked()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._flush_locked()
+        if self.failed > self._reported:
+            self._reported = self.failed
+            print(f"{self.failed} messages to '{self.topic}' could not be published ({self.failed_points} results dropped)")
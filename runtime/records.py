@@ -0,0 +1,164 @@
+"""
+Fixed-width binary score records: the ``format binary`` of an OutputFile.
+
+A file is a 16-byte header followed by packed little-endian records
+(timestamp, value, score, flag). For a spec with several attributes
+``value`` is a vector with one float per attribute, in DSL order; the
+header's record size tells the width. Records are only ever appended, so
+the file can be read while the pipeline writes it, and NumPy memory-maps
+it without parsing::
+
+    records = np.memmap("results.bin", dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE)
+    records["score"], records["flag"]
+
+``python -m runtime.records`` summarises such a file and converts it to CSV.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from .writers import LineWriter
+
+MAGIC = b"ANOMREC\x00"
+VERSION = 1
+
+
+def record_dtype(features: int = 1) -> np.dtype:
+    """Record layout for ``features`` attributes (``value`` is a scalar for one, a vector otherwise)."""
+    value = ("value", "<f8") if features == 1 else ("value", "<f8", (features,))
+    return np.dtype([("timestamp", "<f8"), value, ("score", "<f8"), ("flag", "u1")])
+
+
+def header(dtype: np.dtype) -> bytes:
+    return MAGIC + VERSION.to_bytes(4, "little") + dtype.itemsize.to_bytes(4, "little")
+
+
+RECORD_DTYPE = record_dtype()
+HEADER = header(RECORD_DTYPE)
+HEADER_SIZE = len(HEADER)
+_FIXED_SIZE = RECORD_DTYPE.itemsize - 8  # timestamp, score and flag
+
+
+def is_record_file(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def read_dtype(path: str) -> np.dtype:
+    """Record layout of the file ``path``, from its header."""
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    itemsize = int.from_bytes(data[12:16], "little")
+    features, extra = divmod(itemsize - _FIXED_SIZE, 8)
+    if data[:12] != HEADER[:12] or features < 1 or extra:
+        raise ValueError(f"'{path}' is not a version {VERSION} score record file")
+    return record_dtype(features)
+
+
+def open_records(path: str):
+    """Memory-map the complete records of ``path`` (a record being appended is left out)."""
+    dtype = read_dtype(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if not count:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+
+
+def read_records(path: str, chunk_size: int = 1_000_000):
+    """Yield the records of ``path`` as structured arrays of at most ``chunk_size`` rows, one mapping per chunk."""
+    dtype = read_dtype(path)
+    count = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    for start in range(0, count, chunk_size):
+        n = min(chunk_size, count - start)
+        mapped = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE + start * dtype.itemsize, shape=(n,))
+        yield np.array(mapped)
+        del mapped
+
+
+class RecordWriter(LineWriter):
+    """
+    LineWriter for score records: write_records() appends one record per
+    scored point, with the same buffering, flush interval and fsync options
+    (``buffer_lines`` counts records). With ``features`` > 1 the values are
+    the feature dicts of a multi-attribute spec.
+    """
+    empty = b""
+
+    def __init__(self, path: str, *args, features: int = 1, **kwargs):
+        self.features = features
+        self.dtype = record_dtype(features)
+        super().__init__(path, *args, **kwargs)
+
+    def _open(self, path):
+        f = open(path, "ab")
+        if f.tell() == 0:
+            f.write(header(self.dtype))
+            f.flush()
+        elif read_dtype(path) != self.dtype:
+            f.close()
+            raise ValueError(f"'{path}' holds records of a different number of attributes")
+        return f
+
+    def write_records(self, values, scores, flags, timestamp: float | None = None):
+        """Append the points of one batch; they share ``timestamp`` (default: now)."""
+        rows = np.empty(len(values), dtype=self.dtype)
+        rows["timestamp"] = time.time() if timestamp is None else timestamp
+        rows["value"] = values if self.features == 1 else [tuple(v.values()) for v in values]
+        rows["score"] = scores
+        rows["flag"] = flags
+        self._write([rows.tobytes()], len(rows))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or convert a binary score record file.")
+    parser.add_argument("path", help="record file written by an OutputFile with 'format binary'")
+    parser.add_argument("--csv", metavar="FILE", help="write timestamp,value,score,flag rows with a header (value_1..value_N for several attributes)")
+    parser.add_argument("--scores", metavar="FILE", help="write one score per line (the 'format csv' output layout)")
+    parser.add_argument("--alerts", metavar="FILE", help="write one 0/1 flag per line (the alerts file layout)")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000, help="records read per chunk")
+    args = parser.parse_args(argv)
+
+    outputs = []
+    if args.csv:
+        features = read_dtype(args.path)["value"].shape
+        f = open(args.csv, "w", encoding="utf-8")
+        if features:
+            f.write(f"timestamp,{','.join(f'value_{i + 1}' for i in range(features[0]))},score,flag\n")
+            outputs.append((f, lambda r: "".join(
+                f"{t!r},{','.join(map(repr, v))},{s!r},{a}\n" for t, v, s, a in zip(r["timestamp"].tolist(), r["value"].tolist(), r["score"].tolist(), r["flag"].tolist())
+            )))
+        else:
+            f.write("timestamp,value,score,flag\n")
+            outputs.append((f, lambda r: "".join(
+                f"{t!r},{v!r},{s!r},{a}\n" for t, v, s, a in zip(r["timestamp"].tolist(), r["value"].tolist(), r["score"].tolist(), r["flag"].tolist())
+            )))
+    if args.scores:
+        outputs.append((open(args.scores, "w", encoding="utf-8"), lambda r: "".join(f"{s}\n" for s in r["score"].tolist())))
+    if args.alerts:
+        outputs.append((open(args.alerts, "w", encoding="utf-8"), lambda r: "".join(f"{a}\n" for a in r["flag"].tolist())))
+
+    rows = flagged = 0
+    first = last = None
+    for chunk in read_records(args.path, args.chunk_size):
+        rows += len(chunk)
+        flagged += int(np.count_nonzero(chunk["flag"]))
+        first = chunk["timestamp"][0] if first is None else first
+        last = chunk["timestamp"][-1]
+        for f, render in outputs:
+            f.write(render(chunk))
+    for f, _ in outputs:
+        f.close()
+    print(f"{args.path}: {rows} records, {flagged} flagged")
+    if rows:
+        print(f"from {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))} "
+              f"to {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last))}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+import asyncio
+import atexit
+import threading
+import time
+
+import redis
+
+
+def connect(host: str, port: int, db: int, max_connections: int | None = None):
+    """Redis client backed by an explicit, bounded connection pool."""
+    pool = redis.ConnectionPool(host=host, port=port, db=db, max_connections=max_connections)
+    return redis.Redis(connection_pool=pool)
+
+
+def connect_async(host: str, port: int, db: int, max_connections: int | None = None):
+    """redis.asyncio client backed by an explicit, bounded connection pool."""
+    from redis import asyncio as aioredis
+
+    pool = aioredis.ConnectionPool(host=host, port=port, db=db, max_connections=max_connections)
+    return aioredis.Redis(connection_pool=pool)
+
+
+def _push_commands(pipe, key_scores, key_alerts, scores, alerts, max_len):
+    if scores:
+        pipe.rpush(key_scores, *scores)
+        if max_len:
+            pipe.ltrim(key_scores, -max_len, -1)
+    if alerts:
+        pipe.rpush(key_alerts, *alerts)
+        if max_len:
+            pipe.ltrim(key_alerts, -max_len, -1)
+
+
+class RedisSink:
+    """
+    Buffers score and alert entries and pushes them to Redis in bulk.
+
+    Pending entries are sent once ``flush_size`` scores are buffered or
+    ``flush_interval_ms`` has passed since the last push. A push is a single
+    non-transactional pipeline: one multi-value RPUSH per key and, when
+    ``max_len`` is set, an LTRIM that keeps only the newest ``max_len``
+    entries of each list.
+
+    close() pushes what is left; it is also registered with atexit.
+    """
+    def __init__(self, client, key_scores: str, key_alerts: str, flush_size: int = 1,
+                 flush_interval_ms: int | None = None, max_len: int | None = None):
+        self.client = client
+        self.key_scores = key_scores
+        self.key_alerts = key_alerts
+        self.flush_size = max(int(flush_size or 1), 1)
+        self.flush_interval = flush_interval_ms / 1000.0 if flush_interval_ms else None
+        self.max_len = int(max_len) if max_len else None
+        self._scores: list = []
+        self._alerts: list = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+        self._timer: threading.Thread | None = None
+        atexit.register(self.close)
+
+    def push(self, scores, alerts=()):
+        """Queue serialized score entries and, separately, the alert entries."""
+        with self._lock:
+            if self._timer is None and self.flush_interval is not None:
+                self._start_timer()
+            self._scores.extend(scores)
+            self._alerts.extend(alerts)
+            if len(self._scores) >= self.flush_size or self._interval_elapsed():
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _interval_elapsed(self):
+        return self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._scores and not self._alerts:
+            return
+        # Buffers are released before the round trip so a Redis outage
+        # cannot make them grow without limit.
+        scores, self._scores = self._scores, []
+        alerts, self._alerts = self._alerts, []
+        pipe = self.client.pipeline(transaction=False)
+        _push_commands(pipe, self.key_scores, self.key_alerts, scores, alerts, self.max_len)
+        pipe.execute()
+
+    def _start_timer(self):
+        # Started on first use rather than in __init__, so that the process
+        # can still fork worker processes before any thread exists.
+        self._timer = threading.Thread(target=self._run_timer, name="redis-sink", daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                if self._interval_elapsed():
+                    try:
+                        self._flush_locked()
+                    except Exception as e:
+                        print(f"Error writing to Redis: {e}")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_locked()
+
+
+class AsyncRedisSink:
+    """
+    RedisSink for the asyncio runtime, over a connect_async() client.
+
+    push() only buffers; a task on the event loop sends the entries with the
+    same pipeline, once ``flush_size`` scores are buffered or every
+    ``flush_interval_ms``. Entries buffered during a round trip go out
+    together in the next one. drain() waits while more than ``max_pending``
+    scores are buffered, so a slow Redis holds back the consumers that write
+    to it. start() and close() are called on the loop.
+    """
+    def __init__(self, client, key_scores: str, key_alerts: str, flush_size: int = 1,
+                 flush_interval_ms: int | None = None, max_len: int | None = None, max_pending: int | None = None):
+        self.client = client
+        self.key_scores = key_scores
+        self.key_alerts = key_alerts
+        self.flush_size = max(int(flush_size or 1), 1)
+        self.flush_interval = flush_interval_ms / 1000.0 if flush_interval_ms else None
+        self.max_len = int(max_len) if max_len else None
+        self.max_pending = int(max_pending) if max_pending else max(10 * self.flush_size, 1000)
+        self._scores: list = []
+        self._alerts: list = []
+        self._wake: asyncio.Event | None = None
+        self._flushed: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._flushed = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def push(self, scores, alerts=()):
+        """Queue serialized score entries and, separately, the alert entries."""
+        self._scores.extend(scores)
+        self._alerts.extend(alerts)
+        if len(self._scores) >= self.flush_size and self._wake is not None:
+            self._wake.set()
+
+    async def drain(self):
+        while len(self._scores) > self.max_pending and self._task is not None and not self._task.done():
+            self._flushed.clear()
+            self._wake.set()
+            await self._flushed.wait()
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"Error writing to Redis: {e}")
+            self._flushed.set()
+
+    async def _flush(self):
+        if not self._scores and not self._alerts:
+            return
+        scores, self._scores = self._scores, []
+        alerts, self._alerts = self._alerts, []
+        pipe = self.client.pipeline(transaction=False)
+        _push_commands(pipe, self.key_scores, self.key_alerts, scores, alerts, self.max_len)
+        await pipe.execute()
+
+    async def close(self):
+        self._closing = True
+        if self._task is not None:
+            self._wake.set()
+            await self._task  # finishes the push in progress
+            self._task = None
+        await self._flush()
+        await self.client.aclose()
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _has_header(path: str) -> bool:
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline().split(",")[0].strip()
+    try:
+        float(first)
+    except ValueError:
+        return bool(first)
+    return False
+
+
+def read_chunks(path: str, columns, chunk_size: int = 10_000, positions=None):
+    """
+    Stream a CSV of historical values in chunks of ``chunk_size`` rows.
+
+    Yields (rows, {column: float64 array}) for every requested column. A
+    column is looked up by name when the file has a header row that contains
+    it, otherwise the column at ``positions[column]`` is used (default: the
+    first, as in the headerless one-value-per-line format of
+    publishers/data.csv). Unparseable cells become NaN.
+    """
+    positions = positions or {}
+    header = _has_header(path)
+    names = list(pd.read_csv(path, nrows=0).columns) if header else []
+    sources = {c: c if c in names else (names[positions.get(c, 0)] if names else positions.get(c, 0)) for c in columns}
+    usecols = sorted(set(sources.values()), key=str)
+    reader = pd.read_csv(
+        path,
+        header=0 if header else None,
+        usecols=usecols,
+        chunksize=max(int(chunk_size), 1),
+    )
+    for chunk in reader:
+        arrays = {}
+        for column in columns:
+            arrays[column] = pd.to_numeric(chunk[sources[column]], errors="coerce").to_numpy(dtype=np.float64)
+        yield len(chunk), arrays
+
+
+def replay_file(path: str, targets, chunk_size: int = 10_000, progress_every: int = 0):
+    """
+    Feed the values of ``path`` to ``targets`` without a broker.
+
+    ``targets`` is a list of (pipeline, key) pairs; every pipeline receives
+    the columns named after its ``attributes`` through ``pipeline.replay``,
+    one chunk at a time, so scores and alerts are written in bulk: floats
+    for one attribute, {attribute: float} dicts for several (in a file
+    without a header, the i-th attribute is read from the i-th column).
+    Rows that do not hold a number in every column are skipped. Returns
+    (rows, seconds spent reading and handing over the values); scoring that
+    a pipeline finishes later, such as in shard workers, is not included.
+    """
+    columns = sorted({attribute for pipeline, _ in targets for attribute in pipeline.attributes})
+    positions = {}
+    for pipeline, _ in targets:
+        if len(pipeline.attributes) > 1:
+            for i, attribute in enumerate(pipeline.attributes):
+                positions.setdefault(attribute, i)
+    rows = 0
+    started = time.perf_counter()
+    for n, arrays in read_chunks(path, columns, chunk_size, positions):
+        for pipeline, key in targets:
+            if len(pipeline.attributes) == 1:
+                values = arrays[pipeline.attributes[0]]
+                values = values[~np.isnan(values)].tolist()
+            else:
+                matrix = np.column_stack([arrays[attribute] for attribute in pipeline.attributes])
+                matrix = matrix[~np.isnan(matrix).any(axis=1)]
+                names = pipeline.attributes
+                values = [dict(zip(names, row)) for row in matrix.tolist()]
+            if len(values):
+                pipeline.replay(values, key)
+        rows += n
+        if progress_every and rows // progress_every != (rows - n) // progress_every:
+            elapsed = time.perf_counter() - started
+            print(f"Replayed {rows} rows ({rows / elapsed:.0f} rows/s)")
+    return rows, time.perf_counter() - started
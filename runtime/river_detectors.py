@@ -0,0 +1,216 @@
+import math
+from time import perf_counter
+
+from river import anomaly, linear_model, optim, preprocessing, stats, time_series
+
+
+def _make_preprocessor(method):
+    if method == "StandardScaler":
+        return preprocessing.StandardScaler()
+    if method == "MinMaxScaler":
+        return preprocessing.MinMaxScaler()
+    return None
+
+
+class WarmupQuantile(stats.Quantile):
+    """stats.Quantile that keeps the scores it was updated with (detectors only update it during warm-up)."""
+
+    def __init__(self, q):
+        super().__init__(q=q)
+        self.scores = []
+
+    def update(self, x):
+        self.scores.append(x)
+        super().update(x)
+
+
+class RiverDetector:
+    """
+    Model state of one stream scored by a River model.
+
+    ``config`` is the dict built by ``runtime.detectors.detector_config``:
+    model name, resolved model parameters, preprocessor method, threshold
+    (quantile level), start_index (warm-up length) and retune_threshold.
+    Generated pipelines subclass these classes with their spec's config;
+    runtime.engine uses them directly.
+
+    Every value is prepared (preprocessor), learned during the warm-up and
+    scored and classified after it. A subclass that sets ``stages`` (see
+    MetricsRegistry.stages) times each phase in its histogram.
+
+    With retune_threshold the scores that fed the QuantileFilter during
+    warm-up are kept, so ``set_threshold(q)`` can rebuild the quantile for a
+    new level without touching the learned model.
+    """
+    __slots__ = ("cnt", "threshold", "start_index", "preproc_instance", "anomaly_model", "quantile_filter")
+    stages = None
+
+    def __init__(self, config):
+        self.cnt = 0
+        self.threshold = config["threshold"]
+        self.start_index = config["start_index"]
+        self.preproc_instance = _make_preprocessor(config["preprocessor"])
+        self.anomaly_model, self.quantile_filter = self.build(config["params"])
+        if config.get("retune_threshold"):
+            self.quantile_filter.quantile = WarmupQuantile(self.threshold)
+
+    def build(self, params):
+        """Returns (anomaly_model, quantile_filter)."""
+        raise NotImplementedError
+
+    def prepare(self, x_val):
+        """Update the preprocessor with ``x_val``; returns the value the model sees."""
+        if self.preproc_instance:
+            self.preproc_instance.learn_one({'x': x_val})
+            return self.preproc_instance.transform_one({'x': x_val})['x']
+        return x_val
+
+    def learn(self, x):
+        raise NotImplementedError
+
+    def score(self, x):
+        """Anomaly score of ``x``, or None when the model cannot score it."""
+        raise NotImplementedError
+
+    def classify(self, score):
+        return self.quantile_filter.classify(score)
+
+    def handle(self, x_val):
+        self.cnt += 1
+        x = self.prepare(x_val)
+        if self.cnt <= self.start_index:
+            self.learn(x)
+            return 0.0, 0  # No detection yet
+        score = self.score(x)
+        if score is None:
+            return 0.0, 0
+        return score, self.classify(score)
+
+    def handle_timed(self, x_val):
+        stages = self.stages
+        self.cnt += 1
+        t0 = perf_counter()
+        x = self.prepare(x_val)
+        t1 = perf_counter()
+        stages.preprocess.observe(t1 - t0)
+        if self.cnt <= self.start_index:
+            self.learn(x)
+            stages.learn.observe(perf_counter() - t1)
+            return 0.0, 0
+        score = self.score(x)
+        t2 = perf_counter()
+        stages.score.observe(t2 - t1)
+        if score is None:
+            return 0.0, 0
+        is_anomaly = self.classify(score)
+        stages.classify.observe(perf_counter() - t2)
+        return score, is_anomaly
+
+    def set_threshold(self, threshold):
+        if threshold == self.threshold:
+            return
+        self.threshold = threshold
+        quantile = WarmupQuantile(threshold)
+        for score in self.quantile_filter.quantile.scores:
+            quantile.update(score)
+        self.quantile_filter.quantile = quantile
+
+    def score_values(self, values):
+        """Score values in arrival order; returns the points that produced output."""
+        handle = self.handle if self.stages is None else self.handle_timed
+        scores, flags = [], []
+        for x_val in values:
+            score, is_anomaly = handle(x_val)
+            scores.append(score)
+            flags.append(is_anomaly)
+        return list(values), scores, flags
+
+    def flush(self):
+        return None, None, None
+
+
+class QuantileDetector(RiverDetector):
+    """StandardAbsoluteDeviation / GaussianScorer with a QuantileFilter on their scores."""
+    __slots__ = ()
+
+    def build(self, params):
+        if params["model"] == "GaussianScorer":
+            model = anomaly.GaussianScorer(window_size=params["window_size"], grace_period=20)
+        else:
+            model = anomaly.StandardAbsoluteDeviation()
+        return model, anomaly.QuantileFilter(model, q=self.threshold)
+
+    def learn(self, x):
+        self.anomaly_model.learn_one(None, x)
+        self.quantile_filter.learn_one(None, self.anomaly_model.score_one(None, x))
+
+    def score(self, x):
+        return self.anomaly_model.score_one(None, x)
+
+
+class FilteredDetector(RiverDetector):
+    """OneClassSVM / HalfSpaceTrees wrapped in a QuantileFilter."""
+    __slots__ = ()
+
+    def build(self, params):
+        if params["model"] == "OneClassSVM":
+            base_model = anomaly.OneClassSVM(nu=params["nu"])
+        else:
+            base_model = anomaly.HalfSpaceTrees(
+                n_trees=params["n_trees"], height=params["height"],
+                window_size=params["window_size"], seed=params["seed"]
+            )
+        model = anomaly.QuantileFilter(base_model, q=self.threshold)
+        return model, model
+
+    def prepare(self, x_val):
+        # Wrap input for consistency with River format
+        x_dict = {'x': x_val}
+        if self.preproc_instance:
+            self.preproc_instance.learn_one(x_dict)
+            return {'x': self.preproc_instance.transform_one(x_dict)['x']}
+        return x_dict
+
+    def learn(self, x_dict):
+        self.anomaly_model.learn_one(x_dict)
+
+    def score(self, x_dict):
+        return self.anomaly_model.score_one(x_dict)
+
+
+class FeatureDictDetector(FilteredDetector):
+    """OneClassSVM / HalfSpaceTrees of a spec with several attributes: values are feature dicts."""
+    __slots__ = ()
+
+    def prepare(self, x_val):
+        if self.preproc_instance:
+            self.preproc_instance.learn_one(x_val)
+            return self.preproc_instance.transform_one(x_val)
+        return x_val
+
+
+class ForecastDetector(RiverDetector):
+    """SNARIMAX forecaster scored by PredictiveAnomalyDetection, with a QuantileFilter."""
+    __slots__ = ()
+
+    def build(self, params):
+        regressor = None
+        if params["regressor"] == "LinearRegression":
+            regressor = linear_model.LinearRegression(optimizer=optim.SGD(params["learning_rate"]))
+            if self.preproc_instance:
+                regressor = self.preproc_instance | regressor
+        snarimax_model = time_series.SNARIMAX(
+            p=params["p"], d=params["d"], q=params["q"], m=params["m"], sd=params["sd"], regressor=regressor
+        )
+        base_model = anomaly.PredictiveAnomalyDetection(snarimax_model, horizon=1, n_std=3.5, warmup_period=0)
+        model = anomaly.QuantileFilter(base_model, q=self.threshold)
+        return model, model
+
+    def learn(self, x):
+        self.anomaly_model.learn_one(None, x)
+
+    def score(self, x):
+        score = self.anomaly_model.score_one(None, x)
+        if score is None or math.isnan(score) or math.isinf(score):
+            return None
+        return min(max(score, -1e6), 1e6)
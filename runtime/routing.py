@@ -0,0 +1,54 @@
+import paho.mqtt.client as mqtt
+
+
+class TopicRouter:
+    """
+    Maps MQTT topics to the handlers subscribed to them.
+
+    Filters may use the MQTT wildcards '+' and '#'. Exact filters are
+    resolved with a dict lookup; the result for every concrete topic is
+    cached, so wildcard matching runs once per distinct topic.
+    """
+    def __init__(self, max_cached_topics: int = 100_000):
+        self.max_cached_topics = max_cached_topics
+        self._exact: dict[str, list] = {}
+        self._wildcard: list[tuple[str, object]] = []
+        self._cache: dict[str, tuple] = {}
+
+    def add(self, topic_filter: str, handler):
+        if "+" in topic_filter or "#" in topic_filter:
+            self._wildcard.append((topic_filter, handler))
+        else:
+            self._exact.setdefault(topic_filter, []).append(handler)
+        self._cache.clear()
+
+    def route(self, topic: str) -> tuple:
+        handlers = self._cache.get(topic)
+        if handlers is None:
+            handlers = tuple(self._exact.get(topic, ())) + tuple(
+                h for f, h in self._wildcard if mqtt.topic_matches_sub(f, topic)
+            )
+            if len(self._cache) >= self.max_cached_topics:
+                self._cache.clear()
+            self._cache[topic] = handlers
+        return handlers
+
+
+def make_mqtt_client(ssl: bool, web_path: str, username: str, password: str | None,
+                     max_inflight: int | None = None, queue_size: int | None = None):
+    """paho client for a Broker<MQTT> block (websockets when webPath is set)."""
+    if web_path:
+        client = mqtt.Client(transport="websockets")
+    else:
+        client = mqtt.Client()
+    if ssl:
+        client.tls_set()
+        client.tls_insecure_set(True)
+    if username or password:
+        client.username_pw_set(username, password)
+    if max_inflight:
+        client.max_inflight_messages_set(max_inflight)
+    if queue_size:
+        # publish() fails once this many messages wait for the network loop
+        client.max_queued_messages_set(queue_size)
+    return client
@@ -0,0 +1,242 @@
+import multiprocessing
+import pickle
+import queue
+import signal
+import threading
+import zlib
+
+from .ingest import MicroBatcher
+from .keyed import KeyedStore
+
+# Inbox marker asking a worker to send a pickled copy of its detectors.
+SNAPSHOT = "snapshot"
+# Inbox marker ending a worker like None, after it sends a last snapshot.
+STOP_WITH_SNAPSHOT = "stop_with_snapshot"
+
+
+def shard_of(key, shards: int) -> int:
+    """Stable shard index of a stream key (None for unkeyed streams -> shard 0)."""
+    if key is None or shards <= 1:
+        return 0
+    return zlib.crc32(str(key).encode()) % shards
+
+
+def _score_runs(detectors, decode_value, items, batched=False):
+    """Score (key, payload) items in order; consecutive items of a key form one run."""
+    runs = []
+    for key, raw in items:
+        try:
+            # Replayed values arrive already decoded (floats, or feature dicts).
+            if not isinstance(raw, (bytes, bytearray)):
+                x_vals = [raw]
+            elif batched:
+                x_vals = decode_value(raw)
+            else:
+                x_vals = [decode_value(raw)]
+        except Exception as e:
+            print(f"Error handling message: {e}")
+            continue
+        if runs and runs[-1][0] == key:
+            runs[-1][1].extend(x_vals)
+        else:
+            runs.append((key, x_vals))
+    results = []
+    for key, values in runs:
+        try:
+            vals, scores, flags = detectors.get(key).score_values(values)
+        except Exception as e:
+            print(f"Error handling message: {e}")
+            continue
+        if vals:
+            results.append((key, vals, scores, flags))
+    return results
+
+
+def _snapshot(detectors):
+    return (SNAPSHOT, {key: pickle.dumps(d, protocol=pickle.HIGHEST_PROTOCOL) for key, d in detectors.items()})
+
+
+def _run_shard(make_detector, decode_value, batched, max_keys, idle_ttl, initial_states, inbox, outbox):
+    # Ctrl+C in a terminal reaches the whole process group; the receiving
+    # process stops the workers itself, through their inboxes.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    evicted = []
+
+    def flush(key, detector):
+        vals, scores, flags = detector.flush()
+        if vals:
+            evicted.append((key, vals, scores, flags))
+
+    try:
+        detectors = KeyedStore(make_detector, max_keys=max_keys, idle_ttl=idle_ttl, on_evict=flush)
+        for key, blob in initial_states.items():
+            detectors.put(key, pickle.loads(blob))
+        while True:
+            items = inbox.get()
+            if items is None or items == STOP_WITH_SNAPSHOT:
+                break
+            if items == SNAPSHOT:
+                outbox.put(_snapshot(detectors))
+                continue
+            results = _score_runs(detectors, decode_value, items, batched)
+            if evicted:
+                results = evicted + results
+                evicted.clear()
+            if results:
+                outbox.put(results)
+        for key, detector in detectors.items():
+            flush(key, detector)
+        outbox.put(evicted)
+        if items == STOP_WITH_SNAPSHOT:
+            outbox.put(_snapshot(detectors))
+    finally:
+        # Always tell the merger this worker is done, even if it failed.
+        outbox.put(None)
+
+
+class ShardedScorer:
+    """
+    Scores a stream in ``shards`` worker processes.
+
+    The receiving process only derives the stream key of each message and
+    hash-partitions (key, payload) pairs across the shards, in groups of
+    ``batch_size`` (or after ``max_latency_ms``). Every worker owns the
+    detectors of its keys, so all messages of a key are scored by the same
+    process in arrival order. Results are sent back to the receiving process
+    and handed to ``emit(vals, scores, flags, key)`` by a single merger
+    thread, which keeps the configured sinks single-writer.
+
+    With ``batched`` decode_value returns the list of samples a payload
+    carries (the float32 / msgpack decoders).
+
+    Workers are forked (POSIX only): start_workers() should run before the
+    process starts other threads.
+
+    A worker that dies is reported and no longer waited for; its keys are
+    not scored from then on.
+
+    snapshot() / restore() exchange detector state as {key: pickled detector};
+    restored keys are re-partitioned, so the shard count may change between
+    runs. After stop(final_snapshot=True), snapshot() returns the state the
+    workers ended with; without it the workers exit without pickling their
+    detectors.
+    """
+    def __init__(self, make_detector, decode_value, emit, shards: int, key_of=None, batched: bool = False,
+                 batch_size: int = 1, max_latency_ms: int | None = None,
+                 max_keys: int | None = None, idle_ttl: float | None = None, inbox_size: int = 64):
+        if not shards or int(shards) < 1:
+            raise ValueError("shards must be a positive integer")
+        self.shards = int(shards)
+        self.emit = emit
+        self.key_of = key_of
+        ctx = multiprocessing.get_context("fork")
+        self.outbox = ctx.Queue()
+        self.inboxes = [ctx.Queue(maxsize=inbox_size) for _ in range(self.shards)]
+        self.batchers = [MicroBatcher(inbox.put, batch_size, max_latency_ms) for inbox in self.inboxes]
+        self._initial_states = [{} for _ in range(self.shards)]
+        self.workers = [
+            ctx.Process(
+                target=_run_shard,
+                args=(make_detector, decode_value, batched, max_keys, idle_ttl, initial, inbox, self.outbox),
+                name=f"shard-{i}",
+                daemon=True,
+            )
+            for i, (initial, inbox) in enumerate(zip(self._initial_states, self.inboxes))
+        ]
+        self._merger: threading.Thread | None = None
+        self._snap_lock = threading.Lock()
+        self._snap_done = threading.Event()
+        self._snap_states: dict = {}
+        self._snap_count = 0
+        self._final_states: dict | None = None
+        self._stopped = False
+
+    def submit(self, topic, payload):
+        key = self.key_of(topic) if self.key_of is not None else None
+        self.batchers[shard_of(key, self.shards)].add((key, payload))
+
+    def submit_values(self, key, values):
+        """Send already decoded values of one key to its shard as a single group (replay)."""
+        shard = shard_of(key, self.shards)
+        self.batchers[shard].flush()
+        self.inboxes[shard].put([(key, v) for v in values])
+
+    def _merge(self):
+        done = 0
+        while done < self.shards:
+            try:
+                results = self.outbox.get(timeout=1.0)
+            except queue.Empty:
+                if not any(worker.is_alive() for worker in self.workers):
+                    print(f"{self.shards - done} shard worker(s) exited without finishing")
+                    return
+                continue
+            if results is None:
+                done += 1
+                continue
+            if isinstance(results, tuple) and results[0] == SNAPSHOT:
+                self._snap_states.update(results[1])
+                self._snap_count += 1
+                if self._snap_count == self.shards:
+                    self._snap_done.set()
+                continue
+            for key, vals, scores, flags in results:
+                try:
+                    self.emit(vals, scores, flags, key)
+                except Exception as e:
+                    print(f"Error handling message: {e}")
+
+    def restore(self, states: dict):
+        """Hand checkpointed detectors to the shards that own their keys (before start_workers)."""
+        for key, blob in states.items():
+            self._initial_states[shard_of(key, self.shards)][key] = blob
+
+    def snapshot(self, timeout: float = 60.0) -> dict:
+        if self._final_states is not None:
+            return dict(self._final_states)
+        if self._stopped:
+            raise RuntimeError("shard workers were stopped without a final snapshot")
+        with self._snap_lock:
+            self._snap_states, self._snap_count = {}, 0
+            self._snap_done.clear()
+            for batcher, inbox in zip(self.batchers, self.inboxes):
+                batcher.flush()
+                inbox.put(SNAPSHOT)
+            if not self._snap_done.wait(timeout):
+                raise TimeoutError("shard workers did not answer the snapshot request")
+            return dict(self._snap_states)
+
+    def start_workers(self):
+        for worker in self.workers:
+            if worker.pid is None:
+                worker.start()
+
+    def start(self):
+        self.start_workers()
+        if self._merger is None:
+            self._merger = threading.Thread(target=self._merge, name="shard-merger", daemon=True)
+            self._merger.start()
+        for batcher in self.batchers:
+            batcher.start()
+
+    def stop(self, final_snapshot: bool = False):
+        """
+        Flush pending groups, let every worker finish and emit its last
+        results; with ``final_snapshot`` the workers also send their detectors.
+        """
+        with self._snap_lock:
+            self._snap_states, self._snap_count = {}, 0
+            for batcher, inbox, worker in zip(self.batchers, self.inboxes, self.workers):
+                if worker.is_alive():
+                    batcher.stop()
+                    inbox.put(STOP_WITH_SNAPSHOT if final_snapshot else None)
+                elif worker.pid is not None:
+                    print(f"{worker.name} is not running (exit code {worker.exitcode})")
+            if self._merger is not None:
+                self._merger.join()
+                self._merger = None
+            self._stopped = True
+            if final_snapshot:
+                self._final_states = dict(self._snap_states)
+        for worker in self.workers:
+            worker.join(timeout=10)
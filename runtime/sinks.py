@@ -0,0 +1,83 @@
+from .mqtt_publisher import MqttPublisher
+
+
+class FileSink:
+    """Writes one line per scored point (the score, or the 0/1 anomaly flag) to a shared LineWriter."""
+    def __init__(self, writer, field: str):
+        self.writer = writer
+        self.field = field
+
+    @property
+    def target(self):
+        return self.writer
+
+    def write(self, vals, items, key=None, flags=None):
+        if self.field == "anomaly":
+            self.writer.write_lines([f"{int(a)}\n" for a in items])
+        else:
+            self.writer.write_lines([f"{s}\n" for s in items])
+
+    def close(self):
+        pass  # the shared writer is closed with the other resources
+
+
+class MqttSink:
+    """
+    Publishes the scored points through a runtime.mqtt_publisher.MqttPublisher: one JSON
+    object per point, {"value", "score"} or {"value", "anomaly"} plus "key" for keyed specs,
+    or arrays of them when the topic block sets a batch.
+    """
+    def __init__(self, client, output: dict, field: str, keyed: bool = False, publisher_class=MqttPublisher):
+        self.client = client
+        self.field = field
+        self.keyed = keyed
+        self.publisher = publisher_class(
+            client, output["topic"], qos=output["qos"], batch_size=output["batch_size"], flush_interval_ms=output["flush_ms"]
+        )
+
+    @property
+    def target(self):
+        return self.client
+
+    def write(self, vals, items, key=None, flags=None):
+        field = self.field
+        if field == "anomaly":
+            items = [int(a) for a in items]
+        if self.keyed:
+            self.publisher.publish([{"key": key, "value": v, field: s} for v, s in zip(vals, items)])
+        else:
+            self.publisher.publish([{"value": v, field: s} for v, s in zip(vals, items)])
+
+    def close(self):
+        self.publisher.close()
+
+
+class RecordSink:
+    """Appends (timestamp, value, score, flag) records to a shared runtime.records.RecordWriter."""
+    def __init__(self, writer):
+        self.writer = writer
+
+    @property
+    def target(self):
+        return self.writer
+
+    def write(self, vals, items, key=None, flags=None):
+        self.writer.write_records(vals, items, flags)
+
+    def close(self):
+        pass  # the shared writer is closed with the other resources
+
+
+def make_sink(output: dict, field: str, keyed: bool, file_writers: dict, output_clients: dict, publisher_class=MqttPublisher):
+    """
+    Sink for an ``output`` / ``alerts`` block as parsed by generate_pipeline.parse_output.
+    write(vals, items, key, flags) takes the scores or the flags as ``items``; ``flags``
+    is only used by record files. MQTT outputs publish through ``publisher_class``.
+    """
+    if output["type"] == "file" and output.get("format") == "binary":
+        return RecordSink(file_writers[output["path"]])
+    if output["type"] == "file":
+        return FileSink(file_writers[output["path"]], field)
+    if output["type"] == "mqtt":
+        return MqttSink(output_clients[output["broker"]["name"]], output, field, keyed, publisher_class)
+    raise ValueError(f"unsupported output type '{output['type']}'")
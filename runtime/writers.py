@@ -0,0 +1,89 @@
+import atexit
+import os
+import threading
+import time
+
+
+class LineWriter:
+    """
+    Append-only text writer that keeps its file open between writes.
+
+    Lines are collected in memory and written out once ``buffer_lines`` are
+    pending or ``flush_interval_ms`` has passed since the last flush. With
+    ``fsync=True`` every flush is also forced to disk (durability), otherwise
+    the OS decides when to persist the data (throughput).
+
+    close() flushes what is left; it is also registered with atexit so that
+    buffered lines are not lost when the process exits.
+    """
+    def __init__(self, path: str, buffer_lines: int = 1, flush_interval_ms: int | None = None, fsync: bool = False):
+        self.path = path
+        self.buffer_lines = max(int(buffer_lines or 1), 1)
+        self.flush_interval = flush_interval_ms / 1000.0 if flush_interval_ms else None
+        self.fsync = bool(fsync)
+        self._file = self._open(path)
+        self._pending: list = []
+        self._pending_count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: threading.Thread | None = None
+        atexit.register(self.close)
+
+    empty = ""  # joins the pending chunks
+
+    def _open(self, path):
+        return open(path, "a", encoding="utf-8")
+
+    def write_lines(self, lines):
+        self._write(lines, len(lines))
+
+    def _write(self, chunks, count: int):
+        with self._lock:
+            if self._file is None:
+                raise ValueError(f"writer for '{self.path}' is closed")
+            if self._timer is None and self.flush_interval is not None:
+                self._start_timer()
+            self._pending.extend(chunks)
+            self._pending_count += count
+            if self._pending_count >= self.buffer_lines or self._interval_elapsed():
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _interval_elapsed(self):
+        return self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending or self._file is None:
+            return
+        self._file.write(self.empty.join(self._pending))
+        self._pending.clear()
+        self._pending_count = 0
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _start_timer(self):
+        # Started on first use rather than in __init__, so that the process
+        # can still fork worker processes before any thread exists.
+        self._timer = threading.Thread(target=self._run_timer, name=f"writer:{self.path}", daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._lock:
+                if self._interval_elapsed():
+                    self._flush_locked()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,138 @@
+"""
+Training modes of the LSTM CUSTOM_Detector: points that arrive while the
+model is fitted in the background are scored once it is installed, so the
+output matches synchronous training. The fit is replaced by a small random
+NumpyLSTM, so TensorFlow is not needed.
+
+    python -m pytest tests/test_custom_detector.py
+"""
+import os
+import pickle
+import sys
+import threading
+
+import numpy as np
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from adapters.universal_adapter import UniversalAdapter  # noqa: E402
+from models.LSTM_MODEL import CUSTOM_Detector  # noqa: E402
+from models.numpy_lstm import NumpyLSTM  # noqa: E402
+
+BATCH = 50
+START = 200
+
+
+def small_lstm(units=4):
+    rng = np.random.default_rng(0)
+    return NumpyLSTM([
+        ("lstm", {"units": units, "return_sequences": False, "activation": "tanh", "recurrent_activation": "sigmoid"},
+         [rng.normal(0, 0.5, (1, 4 * units)).astype(np.float32),
+          rng.normal(0, 0.5, (units, 4 * units)).astype(np.float32),
+          np.zeros(4 * units, dtype=np.float32)]),
+        ("dense", {"activation": "linear"}, [rng.normal(0, 0.5, (units, 1)).astype(np.float32), np.zeros(1, dtype=np.float32)]),
+    ])
+
+
+class Detector(CUSTOM_Detector):
+    """CUSTOM_Detector with a NumPy model in place of the Keras fit; ``gate`` holds the fit back."""
+    gate = None
+
+    def _fit(self, train_data):
+        if self.gate is not None:
+            self.gate.wait()
+        scaler = StandardScaler().fit(train_data.reshape(-1, 1))
+        buffer = scaler.transform(train_data[-self.time_step:].reshape(-1, 1))
+        return small_lstm(), scaler, 0.5, buffer
+
+
+def stream(n=1000):
+    t = np.arange(n)
+    return (20 + 3 * np.sin(2 * np.pi * t / 96) + np.random.default_rng(1).normal(0, 0.3, n)).tolist()
+
+
+def run(adapter, values):
+    out = [[], [], []]
+    for x in values:
+        vals, scores, flags = adapter.feed(x)
+        if vals is not None:
+            for col, part in zip(out, (vals, scores, flags)):
+                col.extend(part)
+    return out
+
+
+@pytest.fixture
+def gate(monkeypatch):
+    # on the class, so that detectors still pickle
+    gate = threading.Event()
+    monkeypatch.setattr(Detector, "gate", gate)
+    return gate
+
+
+def make(background):
+    detector = Detector(batch_size=BATCH, start_index=START, threshold=0.99)
+    detector.train_in_background = background
+    if not background:
+        detector.gate = None
+    return detector, UniversalAdapter(detector, batch_size=BATCH)
+
+
+def synchronous(values):
+    detector, adapter = make(False)
+    out = run(adapter, values)
+    tail = adapter.flush()
+    if tail[0] is not None:
+        out = [a + b for a, b in zip(out, tail)]
+    return out
+
+
+def test_points_held_during_training_are_scored_like_synchronous_training(gate):
+    values = stream()
+    detector, adapter = make(True)
+    out = run(adapter, values[:600])  # the fit starts after 250 points and is still blocked
+    assert detector._training and len(out[0]) == 250
+    gate.set()
+    detector._worker.join()
+    rest = run(adapter, values[600:])
+    out = [a + b for a, b in zip(out, rest)]
+    assert out == synchronous(values)
+    assert detector.unscored == 0 and any(out[1][250:])
+
+
+def test_flush_waits_for_the_fit_and_returns_the_held_points(gate):
+    values = stream(580)
+    detector, adapter = make(True)
+    out = run(adapter, values)
+    threading.Timer(0.05, gate.set).start()
+    tail = adapter.flush()
+    out = [a + b for a, b in zip(out, tail)]
+    assert out[0] == values
+    assert out == synchronous(values)
+
+
+def test_snapshot_during_training_keeps_the_held_points(gate):
+    values = stream()
+    detector, adapter = make(True)
+    out = run(adapter, values[:400])
+    threading.Timer(0.05, gate.set).start()
+    restored = pickle.loads(pickle.dumps(adapter))  # waits for the fit
+    rest = run(restored, values[400:])
+    out = [a + b for a, b in zip(out, rest)]
+    assert out == synchronous(values)
+    assert restored.model.model is not None and restored.model._held == []
+
+
+def test_failed_fit_releases_the_held_points_unscored(gate):
+    def failing_fit(train_data):
+        gate.wait()
+        raise ValueError("no model")
+
+    values = stream(400)
+    detector, adapter = make(True)
+    detector._fit = failing_fit
+    out = run(adapter, values)
+    gate.set()
+    vals, scores, flags = adapter.flush()
+    assert out[0] + vals == values
+    assert detector.unscored == 150 and scores == [0.0] * 150 and flags == [0] * 150
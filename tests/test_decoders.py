@@ -0,0 +1,86 @@
+"""
+runtime.decoders against the payloads of publishers/encoders.py: every
+decoder, for one and for several attributes, and malformed payloads.
+
+    python -m pytest tests/test_decoders.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from publishers.encoders import encode  # noqa: E402
+from runtime.decoders import DECODERS, make_decoder  # noqa: E402
+
+SAMPLES = [0.5, -2.25, 1e-3, 1234.5]
+PAIRS = [(0.5, 20.0), (-2.25, 21.5), (3.0, -4.0)]
+
+
+def decoded(decoder, samples, attributes):
+    decode, batched = make_decoder(decoder, attributes)
+    values = []
+    for message in encode(decoder, samples, attributes):
+        if batched:
+            values.extend(decode(message))
+        else:
+            values.append(decode(message))
+    return values
+
+
+def needs(decoder):
+    if decoder == "msgpack":
+        pytest.importorskip("msgpack")
+
+
+@pytest.mark.parametrize("decoder", DECODERS)
+def test_single_attribute(decoder):
+    needs(decoder)
+    values = decoded(decoder, SAMPLES, ("value",))
+    # float32 keeps single precision
+    assert values == (pytest.approx(SAMPLES, rel=1e-6) if decoder == "float32" else SAMPLES)
+    assert all(isinstance(v, float) for v in values)
+
+
+@pytest.mark.parametrize("decoder", DECODERS)
+def test_several_attributes(decoder):
+    needs(decoder)
+    values = decoded(decoder, PAIRS, ("rms", "temp"))
+    assert values == [{"rms": rms, "temp": temp} for rms, temp in PAIRS]
+    assert all(list(v) == ["rms", "temp"] for v in values)
+
+
+@pytest.mark.parametrize("decoder", ["json", "fastjson"])
+def test_nested_attribute(decoder):
+    assert decoded(decoder, SAMPLES[:2], ("machine.rms",)) == SAMPLES[:2]
+
+
+def test_batched_flags():
+    assert make_decoder("float32", ("value",))[1] and not make_decoder("json", ("value",))[1]
+
+
+def test_fields_reads_top_level_numbers_only():
+    decode, _ = make_decoder("fields", ("value",))
+    assert decode(b'{"id": "s1", "value": -1.5e2, "other": 3}') == -150.0
+    with pytest.raises(ValueError):
+        decode(b'{"value": "hot"}')
+    with pytest.raises(ValueError):
+        make_decoder("fields", ("machine.rms",))
+
+
+def test_fields_key_is_matched_exactly():
+    decode, _ = make_decoder("fields", ("value",))
+    assert decode(b'{"old_value": 1, "value": 2}') == 2.0
+
+
+def test_float32_rejects_a_partial_sample():
+    decode, _ = make_decoder("float32", ("rms", "temp"))
+    with pytest.raises(ValueError):
+        decode(encode("float32", [1.0, 2.0, 3.0])[0])
+    with pytest.raises(ValueError):
+        make_decoder("float32", ("value",))[0](b"\x00\x00\x80")
+
+
+def test_unknown_decoder():
+    with pytest.raises(ValueError):
+        make_decoder("xml", ("value",))
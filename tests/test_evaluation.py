@@ -0,0 +1,106 @@
+"""
+Streaming evaluation against sklearn.metrics: a labelled replay of
+publishers/data.csv through the engine, and StreamingAUC on its own.
+F1, Precision, Recall and Accuracy must match exactly; ROC AUC within the
+error of the score bins.
+
+    python -m pytest tests/test_evaluation.py
+"""
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from runtime.engine import Engine  # noqa: E402
+from runtime.evaluation import StreamingAUC  # noqa: E402
+
+DATA = os.path.abspath(os.path.join(ROOT, "publishers", "data.csv"))
+LABELS = os.path.abspath(os.path.join(ROOT, "labels.csv"))
+SPEC = """
+Preprocessing standard
+    method: StandardScaler
+end
+Profile default
+    start_index 1000
+    threshold 0.80
+end
+Broker<MQTT> local
+    host: "localhost"
+    port: 1883
+end
+Evaluation Eval
+    data_file "{data}"
+    scores_file "results.csv"
+    labels_file "{labels}"
+    anomalies_file "alerts.csv"
+    metrics F1Score, Precision, Recall, Accuracy, ROCAUC
+    {roc_bins}
+end
+AnomalySpec detectTemp
+    broker local
+    topic "machine/temperature"
+    attribute "value"
+    preprocessor standard
+    model {model}
+    profile default
+    output "results.csv"
+    alerts "alerts.csv"
+end
+"""
+
+
+def replay(tmp_path, monkeypatch, model, roc_bins=None):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "s.anomaly").write_text(SPEC.format(
+        data=DATA, labels=LABELS, model=model, roc_bins=f"roc_bins {roc_bins}" if roc_bins else ""
+    ))
+    engine = Engine("s.anomaly")
+    engine.load()
+    assert engine.evaluator.open_labels_file()
+    engine.replay(DATA, 5000)
+    return engine.evaluator.results()
+
+
+def offline(tmp_path):
+    labels = np.loadtxt(LABELS)
+    flags = np.loadtxt(tmp_path / "alerts.csv")
+    scores = np.loadtxt(tmp_path / "results.csv")
+    assert len(labels) == len(flags) == len(scores)
+    return labels, flags, scores
+
+
+@pytest.mark.parametrize("model, roc_bins, tolerance", [
+    ("StandardAbsoluteDeviation", None, 1e-5),
+    ("GaussianScorer", None, 1e-5),
+    ("StandardAbsoluteDeviation", 256, 2e-3),
+])
+def test_replay_metrics_match_sklearn(tmp_path, monkeypatch, model, roc_bins, tolerance):
+    streaming = replay(tmp_path, monkeypatch, model, roc_bins)
+    labels, flags, scores = offline(tmp_path)
+    assert flags.any() and labels.any()
+    assert streaming["F1Score"] == f1_score(labels, flags)
+    assert streaming["Precision"] == precision_score(labels, flags)
+    assert streaming["Recall"] == recall_score(labels, flags)
+    assert streaming["Accuracy"] == accuracy_score(labels, flags)
+    assert streaming["ROCAUC"] == pytest.approx(roc_auc_score(labels, scores), abs=tolerance)
+
+
+def test_auc_is_exact_with_fewer_distinct_scores_than_bins():
+    rnd = random.Random(3)
+    labels = [int(rnd.random() < 0.2) for _ in range(5000)]
+    scores = [round(rnd.gauss(label, 1.0), 2) for label in labels]  # a few hundred distinct scores, with ties
+    auc = StreamingAUC(max_bins=2048)
+    for start in range(0, len(labels), 700):
+        auc.update_many(np.array(labels[start:start + 700]) != 0, np.array(scores[start:start + 700]))
+    assert auc.value() == pytest.approx(roc_auc_score(labels, scores), abs=1e-12)
+
+
+def test_auc_needs_both_classes():
+    auc = StreamingAUC()
+    auc.update_many(np.zeros(10, dtype=bool), np.arange(10.0))
+    assert auc.value() is None
@@ -0,0 +1,35 @@
+"""
+The committed anomaly_pipeline.py is the generator's output for
+example.anomaly, byte for byte, and the example specs render to valid
+scripts for both runtimes, with nothing of the asyncio runtime left in the
+threaded one.
+
+    python -m pytest tests/test_generated_script.py
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from generate_pipeline import render  # noqa: E402
+
+
+def read(name):
+    with open(os.path.join(ROOT, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_committed_script_is_generated_from_example():
+    path = os.path.join(ROOT, "example.anomaly")
+    assert render(read("example.anomaly"), file_name=path) == read("anomaly_pipeline.py")
+
+
+@pytest.mark.parametrize("name", ["example.anomaly", "examples/example2.anomaly", "examples/example3.anomaly"])
+def test_examples_render_for_both_runtimes(name):
+    path = os.path.join(ROOT, name)
+    threaded = render(read(name), file_name=path)
+    compile(threaded, name, "exec")
+    assert "asyncio" not in threaded and "async " not in threaded
+    compile(render(read(name), file_name=path, runtime="asyncio"), name, "exec")
@@ -0,0 +1,157 @@
+"""
+runtime.ingest: MicroBatcher grouping and its latency timer, the overflow
+policies of BoundedQueue and ScoringWorker draining it.
+
+    python -m pytest tests/test_ingest.py
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from generate_pipeline import DEFAULT_MAX_LATENCY_MS, build_context, get_metamodel  # noqa: E402
+from runtime.ingest import BoundedQueue, MicroBatcher, ScoringWorker  # noqa: E402
+
+SPEC = """
+Profile default
+    start_index 10
+    threshold 0.9
+end
+Broker<MQTT> local
+    host: "localhost"
+    port: 1883
+end
+AnomalySpec s
+    broker local
+    topic "t"
+    attribute "value"
+    model StandardAbsoluteDeviation
+    profile default
+    output "results.csv"
+    alerts "alerts.csv"
+    {ingest}
+end
+"""
+
+
+class Groups:
+    """MicroBatcher handler that records the groups and signals each one."""
+
+    def __init__(self):
+        self.groups = []
+        self.received = threading.Event()
+
+    def __call__(self, items):
+        self.groups.append(list(items))
+        self.received.set()
+
+
+def ingest_of(line):
+    model = get_metamodel().model_from_str(SPEC.format(ingest=line))
+    return build_context(model)["specs"][0]["ingest"]
+
+
+def test_groups_of_batch_size_in_arrival_order():
+    handler = Groups()
+    batcher = MicroBatcher(handler, batch_size=3)
+    for i in range(7):
+        batcher.add(i)
+    assert handler.groups == [[0, 1, 2], [3, 4, 5]]
+    batcher.stop()
+    assert handler.groups == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_timer_releases_a_partial_group():
+    handler = Groups()
+    batcher = MicroBatcher(handler, batch_size=100, max_latency_ms=20)
+    batcher.start()
+    try:
+        started = time.monotonic()
+        batcher.add("a")
+        batcher.add("b")
+        assert handler.received.wait(2.0)
+        assert time.monotonic() - started >= 0.02
+        assert handler.groups == [["a", "b"]]
+    finally:
+        batcher.stop()
+    assert handler.groups == [["a", "b"]]
+
+
+def test_ingest_without_max_latency_gets_the_default():
+    assert ingest_of("ingest batch_size 64") == {"batch_size": 64, "max_latency_ms": DEFAULT_MAX_LATENCY_MS}
+    assert ingest_of("ingest batch_size 64 max_latency_ms 5") == {"batch_size": 64, "max_latency_ms": 5}
+
+
+def test_queue_rejects_unknown_policy_and_size():
+    with pytest.raises(ValueError):
+        BoundedQueue(4, overflow="drop_random")
+    with pytest.raises(ValueError):
+        BoundedQueue(0)
+
+
+def test_drop_newest_keeps_the_queued_items():
+    q = BoundedQueue(3, overflow="drop_newest")
+    assert [q.put(i) for i in range(5)] == [True, True, True, False, False]
+    assert q.get_batch(10) == [0, 1, 2]
+    assert q.stats() == {"depth": 0, "capacity": 3, "enqueued": 3, "dropped_oldest": 0, "dropped_newest": 2}
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    q = BoundedQueue(3, overflow="drop_oldest")
+    assert all(q.put(i) for i in range(5))
+    assert q.get_batch(10) == [2, 3, 4]
+    assert q.stats()["dropped_oldest"] == 2 and q.stats()["enqueued"] == 5
+
+
+def test_block_waits_for_a_free_slot():
+    q = BoundedQueue(2, overflow="block")
+    q.put(0)
+    q.put(1)
+    done = threading.Event()
+    producer = threading.Thread(target=lambda: done.set() if q.put(2) else None)
+    producer.start()
+    assert not done.wait(0.05)
+    assert q.get_batch(1) == [0]
+    assert done.wait(2.0)
+    producer.join()
+    assert q.get_batch(10) == [1, 2]
+    assert q.stats()["dropped_oldest"] == q.stats()["dropped_newest"] == 0
+
+
+def test_close_releases_a_blocked_producer_and_drains():
+    q = BoundedQueue(1, overflow="block")
+    q.put("a")
+    results = []
+    producer = threading.Thread(target=lambda: results.append(q.put("b")))
+    producer.start()
+    time.sleep(0.02)
+    q.close()
+    producer.join(2.0)
+    assert results == [False]
+    assert q.put("c") is False
+    assert q.get_batch(10) == ["a"]
+    assert q.get_batch(10) == []
+
+
+def test_get_batch_collects_until_max_wait():
+    q = BoundedQueue(10)
+    q.put(1)
+    threading.Timer(0.01, q.put, args=(2,)).start()
+    started = time.monotonic()
+    assert q.get_batch(5, max_wait=0.1) == [1, 2]
+    assert time.monotonic() - started >= 0.1
+
+
+def test_scoring_worker_scores_everything_queued_before_stop():
+    q = BoundedQueue(1000)
+    handler = Groups()
+    worker = ScoringWorker(q, handler, batch_size=4)
+    for i in range(10):
+        q.put(i)
+    worker.start()
+    worker.stop()
+    assert [item for group in handler.groups for item in group] == list(range(10))
+    assert all(len(group) <= 4 for group in handler.groups)
@@ -0,0 +1,104 @@
+"""
+runtime.keyed: stream keys of wildcard topics, and KeyedStore's LRU
+(max_keys) and idle_ttl eviction.
+
+    python -m pytest tests/test_keyed.py
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runtime import keyed  # noqa: E402
+from runtime.keyed import KeyedStore, topic_key_extractor  # noqa: E402
+
+
+class Clock:
+    """Stands in for time.monotonic in runtime.keyed."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(keyed.time, "monotonic", clock)
+    return clock
+
+
+def make_store(**kwargs):
+    evicted = []
+    store = KeyedStore(dict, on_evict=lambda key, state: evicted.append(key), **kwargs)
+    return store, evicted
+
+
+@pytest.mark.parametrize("topic_filter, topic, key", [
+    ("plant/+/temperature", "plant/p7/temperature", "p7"),
+    ("plant/+/line/+/rms", "plant/p1/line/l2/rms", "p1/l2"),
+    ("plant/#", "plant/p1/line/l2", "p1/line/l2"),
+    ("+/sensors/#", "site9/sensors/a/b", "site9/a/b"),
+    ("machine/temperature", "machine/temperature", "machine/temperature"),
+])
+def test_topic_key_extractor(topic_filter, topic, key):
+    assert topic_key_extractor(topic_filter)(topic) == key
+
+
+def test_get_creates_once_per_key():
+    store, evicted = make_store()
+    first = store.get("a")
+    assert store.get("a") is first
+    store.get("b")
+    assert store.stats() == {"keys": 2, "created": 2, "evicted": 0}
+    assert evicted == []
+
+
+def test_max_keys_evicts_the_least_recently_used(clock):
+    store, evicted = make_store(max_keys=3)
+    for key in "abc":
+        store.get(key)
+    store.get("a")  # b is now the least recently used
+    store.get("d")
+    assert evicted == ["b"]
+    assert [key for key, _ in store.items()] == ["c", "a", "d"]
+    store.get("e")
+    assert evicted == ["b", "c"]
+    assert store.stats() == {"keys": 3, "created": 5, "evicted": 2}
+
+
+def test_put_over_max_keys_evicts(clock):
+    store, evicted = make_store(max_keys=2)
+    for key in "abcd":
+        store.put(key, {"restored": key})
+    assert evicted == ["a", "b"]
+    assert dict(store.items()) == {"c": {"restored": "c"}, "d": {"restored": "d"}}
+
+
+def test_idle_ttl_evicts_idle_keys_on_the_next_access(clock):
+    store, evicted = make_store(idle_ttl=60)
+    store.get("a")
+    clock.now += 30
+    store.get("b")
+    clock.now += 40  # a idle for 70 s, b for 40 s
+    assert evicted == []
+    store.get("b")
+    assert evicted == ["a"]
+    clock.now += 59
+    state = store.get("c")
+    assert evicted == ["a"]
+    clock.now += 61  # b idle for 120 s, c for 61 s: c expires before it is looked up
+    assert store.get("c") is not state
+    assert evicted == ["a", "b", "c"]
+    assert store.stats() == {"keys": 1, "created": 4, "evicted": 3}
+
+
+def test_on_evict_receives_the_state():
+    flushed = {}
+    store = KeyedStore(list, max_keys=1, on_evict=lambda key, state: flushed.setdefault(key, state))
+    store.get("a").append(1)
+    store.get("b")
+    assert flushed == {"a": [1]}
@@ -0,0 +1,84 @@
+"""
+models.numpy_lstm: predictions of NumpyLSTM against the Keras model it was
+exported from (skipped without TensorFlow) and the .npz save/load round trip.
+
+    python -m pytest tests/test_numpy_lstm.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from models.numpy_lstm import NumpyLSTM  # noqa: E402
+
+TIME_STEP = 10
+
+
+def windows(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 1, (n, TIME_STEP, 1)).astype(np.float32)
+
+
+def random_lstm(units=(6, 3), seed=0):
+    rng = np.random.default_rng(seed)
+    layers, inputs = [], 1
+    for n, size in enumerate(units):
+        layers.append(("lstm", {
+            "units": size, "return_sequences": n < len(units) - 1,
+            "activation": "tanh", "recurrent_activation": "sigmoid",
+        }, [rng.normal(0, 0.5, (inputs, 4 * size)).astype(np.float32),
+            rng.normal(0, 0.5, (size, 4 * size)).astype(np.float32),
+            rng.normal(0, 0.1, 4 * size).astype(np.float32)]))
+        inputs = size
+    layers.append(("dense", {"activation": "linear"}, [
+        rng.normal(0, 0.5, (inputs, 1)).astype(np.float32), rng.normal(0, 0.1, 1).astype(np.float32)
+    ]))
+    return NumpyLSTM(layers)
+
+
+def test_matches_keras():
+    tf = pytest.importorskip("tensorflow")
+    keras = tf.keras
+    tf.random.set_seed(0)
+    model = keras.Sequential([
+        keras.Input(shape=(TIME_STEP, 1)),
+        keras.layers.LSTM(16, return_sequences=True),
+        keras.layers.Dropout(0.2),
+        keras.layers.LSTM(8),
+        keras.layers.Dense(1),
+    ])
+    X = windows()
+    exported = NumpyLSTM.from_keras(model, check=X[:32])
+    np.testing.assert_allclose(exported.predict(X, verbose=0), model.predict(X, verbose=0), atol=1e-4)
+
+
+def test_predict_in_chunks_matches_one_pass():
+    model = random_lstm()
+    X = windows()
+    whole = model.predict(X)
+    model.batch_size = 64
+    np.testing.assert_array_equal(model.predict(X), whole)
+    assert whole.shape == (len(X), 1) and whole.dtype == np.float32
+
+
+def test_save_load_round_trip(tmp_path):
+    model = random_lstm()
+    path = tmp_path / "lstm.npz"
+    model.save(str(path), scaler_mean=np.array([20.5]), threshold=np.float64(0.75))
+    loaded, extra = NumpyLSTM.load(str(path))
+    assert [(kind, config) for kind, config, _ in loaded.layers] == [(kind, config) for kind, config, _ in model.layers]
+    for (_, _, saved), (_, _, restored) in zip(model.layers, loaded.layers):
+        assert all(np.array_equal(a, b) for a, b in zip(saved, restored))
+    X = windows(50, seed=1)
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(X))
+    assert sorted(extra) == ["scaler_mean", "threshold"]
+    assert extra["scaler_mean"].tolist() == [20.5] and float(extra["threshold"]) == 0.75
+
+
+def test_unsupported_activation():
+    model = random_lstm()
+    model.layers[-1][1]["activation"] = "softmax"
+    with pytest.raises(ValueError):
+        model.predict(windows(2))
@@ -0,0 +1,86 @@
+"""
+runtime.records: the binary score record file (header, one- and
+multi-attribute layouts, a record cut off mid-write) and its CSV export.
+
+    python -m pytest tests/test_records.py
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runtime import records  # noqa: E402
+from runtime.records import HEADER_SIZE, RecordWriter, open_records, read_dtype, read_records  # noqa: E402
+
+
+def write(path, values, scores, flags, features=1, timestamp=1.5):
+    writer = RecordWriter(str(path), buffer_lines=1000, features=features)
+    writer.write_records(values, scores, flags, timestamp=timestamp)
+    writer.close()
+
+
+def test_header_and_single_value_records(tmp_path):
+    path = tmp_path / "results.bin"
+    write(path, [1.0, 2.5, -3.0], [0.1, 0.9, 0.2], [0, 1, 0])
+    data = path.read_bytes()
+    assert data[:8] == records.MAGIC
+    assert int.from_bytes(data[8:12], "little") == records.VERSION
+    assert int.from_bytes(data[12:16], "little") == records.RECORD_DTYPE.itemsize == 25
+    assert len(data) == HEADER_SIZE + 3 * 25
+    rows = open_records(str(path))
+    assert rows["value"].tolist() == [1.0, 2.5, -3.0]
+    assert rows["score"].tolist() == [0.1, 0.9, 0.2]
+    assert rows["flag"].tolist() == [0, 1, 0]
+    assert rows["timestamp"].tolist() == [1.5] * 3
+
+
+def test_feature_dict_records(tmp_path):
+    path = tmp_path / "results.bin"
+    values = [{"rms": 1.0, "temp": 20.0}, {"rms": 2.0, "temp": 21.0}]
+    write(path, values, [0.3, 0.4], [0, 0], features=2)
+    assert read_dtype(str(path))["value"].shape == (2,)
+    assert open_records(str(path))["value"].tolist() == [[1.0, 20.0], [2.0, 21.0]]
+
+
+def test_appending_checks_the_width(tmp_path):
+    path = tmp_path / "results.bin"
+    write(path, [1.0], [0.1], [0])
+    write(path, [2.0], [0.2], [1])
+    assert open_records(str(path))["value"].tolist() == [1.0, 2.0]
+    with pytest.raises(ValueError):
+        RecordWriter(str(path), features=3)
+
+
+def test_truncated_record_is_left_out(tmp_path):
+    path = tmp_path / "results.bin"
+    write(path, [float(i) for i in range(10)], [0.0] * 10, [0] * 10)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 7)  # the last record is being appended
+    assert open_records(str(path))["value"].tolist() == [float(i) for i in range(9)]
+    chunks = list(read_records(str(path), chunk_size=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 1]
+    assert np.concatenate(chunks)["value"].tolist() == [float(i) for i in range(9)]
+
+
+def test_header_only_and_foreign_files(tmp_path):
+    path = tmp_path / "results.bin"
+    write(path, [], [], [])
+    assert len(open_records(str(path))) == 0
+    other = tmp_path / "results.csv"
+    other.write_text("0.1\n0.2\n" * 10)
+    assert not records.is_record_file(str(other))
+    with pytest.raises(ValueError):
+        read_dtype(str(other))
+
+
+def test_csv_export(tmp_path, capsys):
+    path = tmp_path / "results.bin"
+    write(path, [1.0, 2.0], [0.25, 0.75], [0, 1], timestamp=2.0)
+    out, scores, alerts = tmp_path / "all.csv", tmp_path / "scores.csv", tmp_path / "alerts.csv"
+    assert records.main([str(path), "--csv", str(out), "--scores", str(scores), "--alerts", str(alerts)]) == 0
+    assert out.read_text() == "timestamp,value,score,flag\n2.0,1.0,0.25,0\n2.0,2.0,0.75,1\n"
+    assert scores.read_text() == "0.25\n0.75\n"
+    assert alerts.read_text() == "0\n1\n"
+    assert "2 records, 1 flagged" in capsys.readouterr().out
@@ -0,0 +1,80 @@
+"""
+RedisSink against an in-memory fakeredis server: flush_size batching, RPUSH
+order and the LTRIM to max_len.
+
+    python -m pytest tests/test_redis_sink.py   # pip install -r requirements-dev.txt
+"""
+import os
+import sys
+
+import fakeredis
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runtime.redis_sink import RedisSink  # noqa: E402
+
+
+class CountingRedis(fakeredis.FakeRedis):
+    """FakeRedis that counts the pipelines RedisSink executes (one per push)."""
+    pushes = 0
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        self.pushes += 1
+        return super().pipeline(transaction=transaction, shard_hint=shard_hint)
+
+
+def entries(client, key):
+    return [item.decode() for item in client.lrange(key, 0, -1)]
+
+
+def make_sink(**kwargs):
+    client = CountingRedis()
+    return client, RedisSink(client, "scores", "alerts", **kwargs)
+
+
+def test_push_waits_for_flush_size():
+    client, sink = make_sink(flush_size=3)
+    sink.push(["s0", "s1"], ["s1"])
+    assert client.pushes == 0
+    assert entries(client, "scores") == []
+
+    sink.push(["s2"])
+    assert client.pushes == 1
+    assert entries(client, "scores") == ["s0", "s1", "s2"]
+    assert entries(client, "alerts") == ["s1"]
+
+    sink.push(["s3"], ["s3"])
+    assert entries(client, "scores") == ["s0", "s1", "s2"]
+    sink.close()
+    assert client.pushes == 2
+    assert entries(client, "scores") == ["s0", "s1", "s2", "s3"]
+    assert entries(client, "alerts") == ["s1", "s3"]
+
+
+def test_rpush_keeps_arrival_order():
+    client, sink = make_sink(flush_size=4)
+    expected = []
+    for batch in range(10):
+        scores = [f"{batch}-{i}" for i in range(batch % 3 + 1)]
+        expected.extend(scores)
+        sink.push(scores)
+    sink.close()
+    assert entries(client, "scores") == expected
+
+
+def test_max_len_keeps_the_newest_entries():
+    client, sink = make_sink(flush_size=5, max_len=7)
+    scores = [str(i) for i in range(23)]
+    for i in range(0, len(scores), 2):
+        sink.push(scores[i:i + 2], scores[i:i + 1])
+    sink.close()
+    assert entries(client, "scores") == scores[-7:]
+    assert entries(client, "alerts") == scores[0::2][-7:]
+
+
+def test_close_is_idempotent():
+    client, sink = make_sink(flush_size=10)
+    sink.push(["a"])
+    sink.close()
+    sink.close()
+    assert client.pushes == 1
+    assert entries(client, "scores") == ["a"]
@@ -0,0 +1,86 @@
+"""
+The queue, ingest, keyed and sharded modes of an AnomalySpec score every
+message as the plain path does: the engine receives the same payloads in
+each mode and the sorted result and alert files must match.
+
+    python -m pytest tests/test_scoring_modes.py
+"""
+import json
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runtime.engine import Engine  # noqa: E402
+
+SPEC = """
+Profile default
+    start_index 100
+    threshold 0.95
+end
+Broker<MQTT> local
+    host: "localhost"
+    port: 1883
+end
+AnomalySpec s
+    broker local
+    topic "plant/+/temperature"
+    attribute "value"
+    model GaussianScorer
+    profile default
+    output "results.csv"
+    alerts "alerts.csv"
+    {mode}
+end
+"""
+DEVICES = ("d1", "d2", "d3")
+
+
+def messages():
+    rnd = random.Random(7)
+    out = []
+    for i in range(400):
+        for device in DEVICES:
+            value = rnd.gauss(20.0, 1.0) + (15.0 if i % 97 == 50 else 0.0)
+            out.append((f"plant/{device}/temperature", json.dumps({"value": value}).encode()))
+    return out
+
+
+def score(tmp_path, monkeypatch, mode):
+    workdir = tmp_path / (mode.replace(" ", "_") or "plain")
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    (workdir / "s.anomaly").write_text(SPEC.format(mode=mode))
+    engine = Engine("s.anomaly")
+    engine.load()
+    pipelines = list(engine.pipelines.values())
+    pipelines[0].echo = False
+    engine._start(pipelines)
+    try:
+        for topic, payload in messages():
+            pipelines[0].receive(topic, payload)
+    finally:
+        engine._stop(pipelines)
+    return {name: sorted((workdir / name).read_text().splitlines()) for name in ("results.csv", "alerts.csv")}
+
+
+@pytest.mark.parametrize("mode", [
+    "queue size 64 overflow block",
+    "ingest batch_size 16 max_latency_ms 5",
+    "ingest batch_size 16 queue size 64 overflow block",
+])
+def test_unkeyed_modes_match_the_plain_path(tmp_path, monkeypatch, mode):
+    assert score(tmp_path, monkeypatch, mode) == score(tmp_path, monkeypatch, "")
+
+
+@pytest.mark.parametrize("mode", [
+    "queue size 64 overflow block key_by_topic",
+    "ingest batch_size 16 key_by_topic max_keys 10",
+    "ingest batch_size 16 key_by_topic shards 2",
+])
+def test_keyed_modes_match_the_plain_keyed_path(tmp_path, monkeypatch, mode):
+    if "shards" in mode and not hasattr(os, "fork"):
+        pytest.skip("shard workers are forked")
+    assert score(tmp_path, monkeypatch, mode) == score(tmp_path, monkeypatch, "key_by_topic")
@@ -0,0 +1,73 @@
+"""
+runtime.sharding.ShardedScorer with a trivial detector: per-key order
+across worker processes, and the final snapshot only when stop() asks for it.
+
+    python -m pytest tests/test_sharding.py
+"""
+import os
+import pickle
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from runtime.sharding import ShardedScorer  # noqa: E402
+
+if not hasattr(os, "fork"):
+    pytest.skip("shard workers are forked", allow_module_level=True)
+
+
+class RunningSum:
+    """Scores every value with the sum of the values of its key so far."""
+
+    def __init__(self):
+        self.total = 0.0
+
+    def score_values(self, values):
+        scores = []
+        for value in values:
+            self.total += value
+            scores.append(self.total)
+        return list(values), scores, [0] * len(values)
+
+    def flush(self):
+        return None, None, None
+
+
+def run(states=None, final_snapshot=False, keys=("a", "b", "c", "d"), values=range(1, 6)):
+    emitted = {}
+    lock = threading.Lock()
+
+    def emit(vals, scores, flags, key):
+        with lock:
+            emitted.setdefault(key, []).extend(scores)
+
+    scorer = ShardedScorer(RunningSum, float, emit, shards=2, key_of=lambda topic: topic, batch_size=2)
+    if states:
+        scorer.restore(states)
+    scorer.start()
+    for value in values:
+        for key in keys:
+            scorer.submit(key, str(value).encode())
+    scorer.stop(final_snapshot=final_snapshot)
+    return scorer, emitted
+
+
+def test_each_key_is_scored_in_arrival_order():
+    _, emitted = run()
+    assert emitted == {key: [1.0, 3.0, 6.0, 10.0, 15.0] for key in "abcd"}
+
+
+def test_no_final_snapshot_unless_requested():
+    scorer, _ = run()
+    with pytest.raises(RuntimeError):
+        scorer.snapshot()
+
+
+def test_final_snapshot_restores_into_new_workers():
+    scorer, _ = run(final_snapshot=True)
+    states = scorer.snapshot()
+    assert {key: pickle.loads(blob).total for key, blob in states.items()} == {key: 15.0 for key in "abcd"}
+    _, emitted = run(states=states, values=[1])
+    assert emitted == {key: [16.0] for key in "abcd"}